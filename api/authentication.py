@@ -0,0 +1,195 @@
+from copy import copy
+
+from api.utils.cache import LRUCache
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import salted_hmac
+from django.utils.deprecation import CallableFalse, CallableTrue
+from django.utils.functional import cached_property
+from rest_framework.authentication import (
+    BasicAuthentication,
+    TokenAuthentication,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.utils import (
+    jwt_payload_handler as default_jwt_payload_handler,
+)
+from reviews.models import User
+
+
+# Users whose credentials were recently verified, by credential digest:
+basic_credentials_cache = LRUCache(
+    max_size=settings.AUTHENTICATION_CACHE['BASIC_MAX_SIZE'],
+    ttl=settings.AUTHENTICATION_CACHE['BASIC_TTL'],
+)
+
+# Recently used API tokens along with their users, by token key:
+token_cache = LRUCache(
+    max_size=settings.AUTHENTICATION_CACHE['TOKEN_MAX_SIZE'],
+    ttl=settings.AUTHENTICATION_CACHE['TOKEN_TTL'],
+)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    '''
+    HTTP Basic authentication that remembers successfully verified credentials
+    for a while, so that passwords aren't hashed again on every request.
+    Credentials are never stored in plain text: cache entries are keyed by a
+    keyed hash of the username and password.  Failed attempts aren't cached.
+    '''
+
+    @staticmethod
+    def credentials_digest(userid, password):
+        # Basic authentication user IDs can't contain colons, so this is
+        # unambiguous:
+        return salted_hmac(
+            key_salt='api.authentication.CachedBasicAuthentication',
+            value=f'{userid}:{password}',
+        ).digest()
+
+    def authenticate_credentials(self, userid, password):
+        digest = self.credentials_digest(userid, password)
+
+        user = basic_credentials_cache.get(digest)
+        if user is not None:
+            return (copy(user), None)
+
+        user, auth = super().authenticate_credentials(userid, password)
+        basic_credentials_cache.set(digest, copy(user))
+        return (user, auth)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''
+    API token authentication that remembers the owners of recently used tokens
+    for a while, so that tokens aren't looked up in the database on every
+    request.  Unknown tokens aren't cached.
+    '''
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return (copy(token.user), token)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token)
+        return (copy(user), token)
+
+
+# User attributes carried as claims in JSON Web Tokens:
+user_claims = ('user_id', 'username', 'is_staff', 'is_superuser')
+
+
+def jwt_payload_handler(user):
+    '''
+    Build JSON Web Token payloads that carry the user attributes needed for
+    permission checks and queryset filtering, in addition to the default ones.
+    '''
+    payload = default_jwt_payload_handler(user)
+    payload['is_staff'] = user.is_staff
+    payload['is_superuser'] = user.is_superuser
+    return payload
+
+
+class TokenUser:
+    '''
+    Lightweight stand-in for an authenticated user, built from the claims in a
+    JSON Web Token without querying the database.  It carries enough for
+    permission checks and queryset filtering; any other attribute is read from
+    the corresponding User, which is loaded when first needed.
+    '''
+
+    is_active = True
+    is_anonymous = CallableFalse
+    is_authenticated = CallableTrue
+
+    def __init__(self, payload):
+        self.pk = self.id = payload['user_id']
+        self.username = payload['username']
+        self.is_staff = payload['is_staff']
+        self.is_superuser = payload['is_superuser']
+
+    def __str__(self):
+        return self.username
+
+    def __eq__(self, other):
+        return isinstance(other, (TokenUser, User)) and self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    @cached_property
+    def user(self):
+        try:
+            return User.objects.get(pk=self.pk, is_active=True)
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+def get_user(user):
+    '''
+    Get the User for an authenticated request user, which may be a TokenUser.
+    This is needed wherever a User instance is required, e.g. to set foreign
+    keys.
+    '''
+    return user.user if isinstance(user, TokenUser) else user
+
+
+class ClaimsJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    '''
+    JSON Web Token authentication that, if the JWT_USER_CLAIMS setting is
+    enabled, authenticates requests as a TokenUser built from the claims in the
+    token instead of loading the User from the database.  Changes to users
+    then only apply to tokens issued afterwards, so e.g. deactivated users may
+    still read through the API until their tokens expire.  Tokens claiming
+    administrator status are always checked against the database, so that
+    revoking it or deleting the user applies right away, and tokens issued
+    without the required claims are authenticated as usual.
+    '''
+
+    def authenticate_credentials(self, payload):
+        if (
+            settings.JWT_USER_CLAIMS
+            and all(claim in payload for claim in user_claims)
+            and not payload['is_staff']
+            and not payload['is_superuser']
+        ):
+            return TokenUser(payload)
+
+        return super().authenticate_credentials(payload)
+
+
+# Discard cached tokens as they're revoked or replaced:
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def discard_cached_token(sender, instance=None, **kwargs):
+    token_cache.discard(instance.key)
+
+
+# Discard cached credentials for users as they change.  Updates of the last login
+# time alone don't affect authentication, so they're ignored.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_cached_credentials(
+    sender,
+    instance=None,
+    update_fields=None,
+    **kwargs
+):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+
+    basic_credentials_cache.discard_where(
+        lambda key, user: user.pk == instance.pk,
+    )
+    token_cache.discard_where(
+        lambda key, token: token.user_id == instance.pk,
+    )
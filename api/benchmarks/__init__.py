@@ -0,0 +1,167 @@
+'''
+Performance benchmarks for the API.  Each module in this package defines a run
+function that writes its results to an output stream; run them with e.g.
+`manage.py benchmark serializers`.  Benchmarks seed their own data inside a
+transaction that is rolled back when they finish.  Benchmarks may also return
+their results as measurements by case, which can be compared with a baseline
+of earlier results; see compare.
+'''
+
+from contextlib import contextmanager
+from statistics import median
+from time import perf_counter
+
+from django.db.transaction import atomic
+from django.utils.timezone import now
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+# Factor applied to the volumes of data seeded by benchmarks that support it;
+# set by the --scale option of the benchmark command:
+scale = 1.0
+
+
+class Rollback(Exception):
+    pass
+
+
+class Regression(Exception):
+    '''
+    Raised by benchmarks that detect performance regressions by themselves.
+    '''
+
+
+@contextmanager
+def rollback():
+    '''
+    Run a block inside a transaction and roll back every change it makes.
+    '''
+    try:
+        with atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def seed(companies=0, reviewers=0, reviews=0, submitter=None):
+    '''
+    Quickly populate the database with synthetic companies, reviewers and
+    reviews, bypassing model signals.  Reviews are spread evenly over the
+    seeded companies and reviewers.
+    '''
+
+    if submitter is None:
+        submitter = User.objects.create(
+            username='benchmark',
+            is_staff=True,
+        )
+
+    timestamp = now()
+
+    companies = Company.objects.bulk_create([
+        Company(
+            name=f'Company {index}',
+            url=f'http://company{index}.example.com/',
+            created=timestamp,
+            modified=timestamp,
+        )
+        for index in range(companies)
+    ])
+
+    reviewers = Reviewer.objects.bulk_create([
+        Reviewer(
+            email=f'reviewer{index}@example.com',
+            name=f'Reviewer {index}',
+            created=timestamp,
+            modified=timestamp,
+        )
+        for index in range(reviewers)
+    ])
+
+    Review.objects.bulk_create(
+        [
+            Review(
+                submitter=submitter,
+                company=companies[index % len(companies)],
+                reviewer=reviewers[index % len(reviewers)],
+                rating=1 + index % 5,
+                title=f'Review {index}',
+                summary='Lorem ipsum dolor sit amet. ' * 20,
+                ip_address='192.0.2.1',
+                created=timestamp,
+                modified=timestamp,
+            )
+            for index in range(reviews)
+        ],
+        batch_size=1000,
+    )
+
+    return submitter
+
+
+def measure(function, repeat=10):
+    '''
+    Call a function repeatedly and return the median duration in seconds.
+    '''
+    durations = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        durations.append(perf_counter() - start)
+    return median(durations)
+
+
+def report(stream, headers, rows):
+    '''
+    Write a table of results to an output stream.
+    '''
+    rows = [headers] + [[str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(headers))]
+    for row in rows:
+        stream.write('  '.join(
+            value.rjust(width)
+            for value, width in zip(row, widths)
+        ))
+
+
+def compare(results, baseline, threshold, margin):
+    '''
+    Compare benchmark results with a baseline of earlier results, both given
+    as dictionaries of measurements by case with the response status, number
+    of queries and median duration in milliseconds of the case, and return
+    descriptions of the regressions found: changed statuses, more queries, or
+    durations longer than in the baseline by a fraction over the threshold,
+    as long as that's also longer by over a margin in milliseconds, so that
+    noise in very short durations isn't taken for regressions.
+    '''
+
+    regressions = []
+    for case, result in results.items():
+        previous = baseline.get(case)
+        if previous is None:
+            continue
+        if result['status'] != previous['status']:
+            regressions.append(
+                f'{case}: status {result["status"]}, '
+                f'was {previous["status"]}'
+            )
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{case}: {result["queries"]} queries, '
+                f'was {previous["queries"]}'
+            )
+        if (
+            result['ms'] > previous['ms'] * (1 + threshold) and
+            result['ms'] - previous['ms'] > margin
+        ):
+            regressions.append(
+                f'{case}: {result["ms"]} ms, was {previous["ms"]} ms'
+            )
+    return regressions
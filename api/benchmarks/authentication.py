@@ -0,0 +1,83 @@
+'''
+Compare the throughput of authenticated review list requests with JSON Web
+Tokens when users are loaded from the database and when they're built from the
+claims in the tokens (see the JWT_USER_CLAIMS setting), for staff and regular
+users.  Tokens of staff users are always checked against the database, so only
+regular users are expected to benefit.
+'''
+
+from api.benchmarks import (
+    measure,
+    report,
+    rollback,
+    seed,
+)
+
+from django.db import connection, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_jwt.settings import api_settings
+
+from reviews.models import User
+
+
+requests = 200
+
+
+def run(stream):
+
+    client = Client()
+
+    with rollback():
+
+        users = [
+            User.objects.create(
+                username='benchmark-staff',
+                is_staff=True,
+            ),
+            seed(
+                companies=10,
+                reviewers=10,
+                reviews=100,
+                submitter=User.objects.create(username='benchmark-regular'),
+            ),
+        ]
+
+        results = []
+
+        for user in users:
+            token = api_settings.JWT_ENCODE_HANDLER(
+                api_settings.JWT_PAYLOAD_HANDLER(user),
+            )
+
+            def get():
+                response = client.get(
+                    '/v1/review',
+                    HTTP_ACCEPT='application/json',
+                    HTTP_AUTHORIZATION=f'JWT {token}',
+                )
+                assert response.status_code == 200, response.status_code
+
+            for claims in [False, True]:
+                with override_settings(JWT_USER_CLAIMS=claims):
+                    # Requests reset the query log as they start, so count
+                    # queries starting from an empty log:
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as queries:
+                        get()
+                    query_count = len(queries)
+                    duration = measure(get, repeat=requests)
+
+                results.append([
+                    'staff' if user.is_staff else 'regular',
+                    'claims' if claims else 'database',
+                    query_count,
+                    f'{duration * 1000:.2f}',
+                    f'{1 / duration:.0f}',
+                ])
+
+        report(
+            stream,
+            ['user', 'jwt users', 'queries', 'median ms', 'requests/s'],
+            results,
+        )
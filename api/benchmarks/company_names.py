@@ -0,0 +1,106 @@
+'''
+Measure the latency of company name lookups, both with ?name= on the company
+collection and with company autocompletion, among millions of companies.  The
+response cache is disabled so that every request is served by the database.
+'''
+
+from api.benchmarks import (
+    measure,
+    report,
+    rollback,
+)
+
+from django.db import connection
+from django.test import Client, override_settings
+
+from reviews.models import (
+    Company,
+    User,
+)
+
+
+companies = 2000000
+requests = 100
+
+# Common leading words for company names, so that short prefixes match many
+# companies each:
+words = [
+    'Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark', 'Wayne',
+    'Wonka', 'Cyberdyne', 'Soylent', 'Tyrell', 'Vandelay', 'Gringotts',
+    'Oscorp', 'Aperture', 'Monarch', 'Duff', 'Nakatomi', 'Pied', 'Massive',
+]
+
+lookups = [
+    ('autocomplete', 'prefix=a'),
+    ('autocomplete', 'prefix=acme'),
+    ('autocomplete', 'prefix=acme 1f'),
+    ('autocomplete', 'prefix=nonexistent'),
+    ('list', 'name=acme'),
+    ('list', 'name=initech 3c'),
+]
+
+
+def run(stream):
+
+    client = Client()
+
+    with rollback(), override_settings(
+        RESPONSE_CACHE={
+            'ALIAS': 'responses',
+            'ENABLED': False,
+        },
+    ):
+
+        # Insert companies with SQL, as creating them through the ORM would
+        # take far longer than the benchmark itself:
+        cursor = connection.cursor()
+        cursor.execute(
+            f'''
+                insert into "{Company._meta.db_table}" (
+                    "created",
+                    "modified",
+                    "name",
+                    "url"
+                )
+                select
+                    now(),
+                    now(),
+                    (%s::text[])[1 + i %% %s] || ' ' || md5(i::text),
+                    ''
+                from generate_series(1, %s) as i
+            ''',
+            [words, len(words), companies],
+        )
+        cursor.execute(f'analyze "{Company._meta.db_table}"')
+
+        client.force_login(User.objects.create(
+            username='benchmark',
+        ))
+
+        results = []
+        for action, query in lookups:
+            path = '/v1/company' + (
+                '/autocomplete' if action == 'autocomplete' else ''
+            )
+
+            def get():
+                response = client.get(
+                    f'{path}?{query}',
+                    HTTP_ACCEPT='application/json',
+                )
+                assert response.status_code == 200, response.status_code
+                return response
+
+            data = get().json()
+            results.append([
+                action,
+                query,
+                len(data['results'] if action == 'list' else data),
+                f'{measure(get, repeat=requests) * 1000:.2f}',
+            ])
+
+        report(
+            stream,
+            ['action', 'query', 'results', 'median ms'],
+            results,
+        )
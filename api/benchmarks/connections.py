@@ -0,0 +1,58 @@
+'''
+Compare the cost of the database connection cycle of a request, i.e. connecting
+to the database, running a trivial query, and closing the connection at the end
+of the request, with and without connection pooling (see
+reviews.backends.postgresql_pool).  No data is written.
+'''
+
+from api.benchmarks import (
+    measure,
+    report,
+)
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+requests = 200
+
+
+def run(stream):
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    results = []
+
+    for max_size in [0, connection.settings_dict['POOL']['MAX_SIZE']]:
+
+        database = connection.__class__(
+            {
+                **connection.settings_dict,
+                'POOL': {
+                    **connection.settings_dict['POOL'],
+                    'MAX_SIZE': max_size,
+                },
+            },
+            alias=connection.alias,
+        )
+
+        def cycle():
+            with database.cursor() as cursor:
+                cursor.execute('select 1')
+            database.close()
+
+        cycle()
+        duration = measure(cycle, repeat=requests)
+        pool = database.pool
+        results.append([
+            max_size or 'disabled',
+            f'{duration * 1000:.3f}',
+            '' if pool is None else pool.opened,
+            '' if pool is None else pool.reused,
+        ])
+        if pool is not None:
+            pool.clear()
+
+    report(
+        stream,
+        ['pool size', 'median ms', 'opened', 'reused'],
+        results,
+    )
@@ -0,0 +1,136 @@
+'''
+Compare ways of setting up and tearing down test data (see api.utils.database):
+loading the test_admin and test_nonadmin fixtures with the loaddata command or
+with load_fixtures, seeding 100 companies, 100 reviewers and 1000 reviews with
+the ORM or restoring a snapshot of them, and emptying the tables of users,
+tokens, companies, their statistics, reviewers and reviews with a DELETE for
+each table, as tests used to, or with a single TRUNCATE, both for fixtures and
+for seeded data, and for 100000 reviews restored from a snapshot.
+'''
+
+from statistics import median
+from time import perf_counter
+
+from api.benchmarks import (
+    report,
+    rollback,
+    seed,
+)
+from api.utils.database import (
+    Snapshot,
+    delete_all,
+    load_fixtures,
+    truncate,
+)
+from django.core.management import call_command
+from django.db import connection
+from django.db.transaction import atomic
+from rest_framework.authtoken.models import Token
+
+from reviews.models import (
+    Company,
+    CompanyStats,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+repeat = 20
+fixtures = ['test_admin', 'test_nonadmin']
+models = [User, Token, Company, CompanyStats, Reviewer, Review]
+
+
+def delete_tables():
+    for model in [Review, CompanyStats, Company, Reviewer, Token, User]:
+        delete_all(model)
+
+
+def truncate_tables():
+    truncate(*models)
+
+
+def time(setup, function, repeat=repeat):
+    '''
+    Get the median duration in seconds of a function called after a setup
+    function, each time within a savepoint rolled back afterwards.  Foreign
+    key checks deferred by the setup are made before timing the function.
+    '''
+    durations = []
+    for _ in range(repeat):
+        with rollback():
+            setup()
+            with connection.cursor() as cursor:
+                cursor.execute('set constraints all immediate')
+                cursor.execute('set constraints all deferred')
+            start = perf_counter()
+            function()
+            durations.append(perf_counter() - start)
+    return median(durations)
+
+
+def run(stream):
+
+    results = []
+
+    def compare(case, old, new):
+        results.extend([
+            [case, old[0], f'{old[1] * 1000:.3f}', ''],
+            [case, new[0], f'{new[1] * 1000:.3f}', f'{old[1] / new[1]:.1f}x'],
+        ])
+
+    with rollback():
+        truncate(*models)
+
+        compare(
+            'load fixtures',
+            ('loaddata', time(
+                lambda: None,
+                lambda: call_command('loaddata', *fixtures, verbosity=0),
+            )),
+            ('load_fixtures', time(
+                lambda: None,
+                lambda: load_fixtures(*fixtures),
+            )),
+        )
+
+        def load():
+            load_fixtures(*fixtures)
+
+        compare(
+            'empty fixtures',
+            ('delete', time(load, delete_tables)),
+            ('truncate', time(load, truncate_tables)),
+        )
+
+        def populate(reviews=1000):
+            with atomic():
+                seed(companies=100, reviewers=100, reviews=reviews)
+
+        with rollback():
+            populate()
+            snapshot = Snapshot(*models)
+
+        compare(
+            'seed 1000 reviews',
+            ('ORM', time(lambda: None, populate)),
+            ('snapshot', time(lambda: None, snapshot.restore)),
+        )
+
+        compare(
+            'empty 1000 reviews',
+            ('delete', time(snapshot.restore, delete_tables)),
+            ('truncate', time(snapshot.restore, truncate_tables)),
+        )
+
+        with rollback():
+            populate(reviews=100000)
+            snapshot = Snapshot(*models)
+
+        compare(
+            'empty 100000 reviews',
+            ('delete', time(snapshot.restore, delete_tables, repeat=5)),
+            ('truncate', time(snapshot.restore, truncate_tables, repeat=5)),
+        )
+
+    report(stream, ['case', 'method', 'median ms', 'speedup'], results)
@@ -0,0 +1,84 @@
+'''
+Compare the duration of token-authenticated API requests served through the
+full middleware chain and through the shorter chain for stateless API requests
+(see API_MIDDLEWARE in reviews/settings.py and api.handlers.WSGIHandler).
+Requests are served in-process by the WSGI handlers, without a server, so the
+difference is the per-request overhead of the skipped middleware.
+'''
+
+from api.benchmarks import (
+    measure,
+    report,
+    rollback,
+    seed,
+)
+from api.handlers import WSGIHandler
+
+from django.core.handlers.wsgi import WSGIHandler as DjangoWSGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import RequestFactory
+
+from reviews.models import Company
+
+
+requests = 500
+
+
+def run(stream):
+
+    # Keep the connection open across requests so that they see the seeded
+    # data in the benchmark transaction:
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+
+    try:
+        with rollback():
+            user = seed(companies=10, reviewers=10, reviews=100)
+            company = Company.objects.first()
+
+            handlers = [
+                ('full', DjangoWSGIHandler()),
+                ('lean', WSGIHandler()),
+            ]
+
+            results = []
+
+            for path in ['/v1/review', f'/v1/company/{company.pk}']:
+                environ = RequestFactory().get(
+                    path,
+                    HTTP_ACCEPT='application/json',
+                    HTTP_AUTHORIZATION=f'Token {user.auth_token.key}',
+                ).environ
+
+                durations = {}
+
+                for name, handler in handlers:
+
+                    def get():
+                        status = []
+                        b''.join(handler(
+                            dict(environ),
+                            lambda *response: status.append(response[0]),
+                        ))
+                        assert status == ['200 OK'], status
+
+                    get()
+                    durations[name] = measure(get, repeat=requests)
+
+                results.append([
+                    path,
+                    f'{durations["full"] * 1000:.3f}',
+                    f'{durations["lean"] * 1000:.3f}',
+                    f'{(durations["full"] - durations["lean"]) * 1000:.3f}',
+                ])
+
+            report(
+                stream,
+                ['path', 'full ms', 'lean ms', 'saved ms'],
+                results,
+            )
+
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
@@ -0,0 +1,91 @@
+'''
+Compare the latency of list pages served by regular serializers and by compiled
+serializers (see api.compiled) for companies, reviewers and reviews, at several
+page sizes.
+'''
+
+from api.benchmarks import (
+    measure,
+    report,
+    rollback,
+    seed,
+)
+
+from api.pagination import CursorPagination
+from django.test import override_settings
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import (
+    CompanyViewSet,
+    ReviewViewSet,
+    ReviewerViewSet,
+)
+
+
+page_sizes = [10, 100, 1000]
+
+viewsets = [
+    (CompanyViewSet, '/v1/company'),
+    (ReviewerViewSet, '/v1/reviewer'),
+    (ReviewViewSet, '/v1/review'),
+]
+
+
+def run(stream):
+
+    factory = APIRequestFactory()
+
+    with rollback():
+
+        user = seed(
+            companies=max(page_sizes),
+            reviewers=max(page_sizes),
+            reviews=max(page_sizes),
+        )
+
+        results = []
+
+        for viewset, path in viewsets:
+            for page_size in page_sizes:
+
+                view = viewset.as_view(
+                    {'get': 'list'},
+                    pagination_class=type(
+                        'CursorPagination',
+                        (CursorPagination, ),
+                        {'page_size': page_size},
+                    ),
+                )
+
+                def get():
+                    request = factory.get(
+                        path,
+                        HTTP_ACCEPT='application/json',
+                    )
+                    request.resolver_match = resolve(path)
+                    force_authenticate(request, user=user)
+                    return view(request).render().content
+
+                durations = []
+                contents = []
+                for compiled in [False, True]:
+                    with override_settings(COMPILED_SERIALIZERS=compiled):
+                        contents.append(get())
+                        durations.append(measure(get))
+
+                regular, compiled = durations
+                results.append([
+                    viewset.__name__,
+                    page_size,
+                    f'{regular * 1000:.1f}',
+                    f'{compiled * 1000:.1f}',
+                    f'{regular / compiled:.1f}x',
+                    'yes' if contents[0] == contents[1] else 'NO',
+                ])
+
+        report(
+            stream,
+            ['viewset', 'rows', 'regular ms', 'compiled ms', 'speedup', 'same'],
+            results,
+        )
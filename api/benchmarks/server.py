@@ -0,0 +1,138 @@
+'''
+Compare the throughput and latency of the application server under concurrent
+load with several gunicorn profiles: the previous single synchronous worker,
+one synchronous worker per core, and threaded workers with several thread
+counts (see config/gunicorn.py).  Each profile is started as a separate server
+on a local port and loaded with concurrent clients requesting review lists and
+companies over keep-alive connections for a fixed duration.  Like the server
+itself, this needs its data committed, so it's deleted when it finishes.
+'''
+
+from os import sched_getaffinity
+
+from api.benchmarks import report
+from api.utils.load import (
+    Request,
+    generate,
+    percentile,
+    serve,
+)
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+address = ('127.0.0.1', 8901)
+clients = 16
+duration = 10
+
+cores = len(sched_getaffinity(0))
+
+# Worker class, workers and threads:
+profiles = [
+    ('sync', 1, 1),
+    ('sync', 2 * cores + 1, 1),
+    ('gthread', 2 * cores + 1, 2),
+    ('gthread', 2 * cores + 1, 4),
+    ('gthread', 2 * cores + 1, 8),
+]
+
+
+def run(stream):
+
+    user = User.objects.create(
+        username='benchmark',
+    )
+    companies = [
+        Company.objects.create(name=f'Benchmark company {index}')
+        for index in range(10)
+    ]
+    reviewer = Reviewer.objects.create(
+        email='benchmark@example.com',
+    )
+
+    try:
+        for index in range(100):
+            Review.objects.create(
+                submitter=user,
+                company=companies[index % len(companies)],
+                reviewer=reviewer,
+                rating=1 + index % 5,
+                title=f'Review {index}',
+                summary='Lorem ipsum dolor sit amet. ' * 20,
+                ip_address='192.0.2.1',
+            )
+
+        paths = ['/v1/review'] + [
+            f'/v1/company/{company.pk}'
+            for company in companies[:3]
+        ]
+
+        headers = {
+            'Accept': 'application/json',
+            'Authorization': f'Token {user.auth_token.key}',
+        }
+
+        # Each client requests the paths in turn, starting from a different
+        # one:
+        def requests(index):
+            while True:
+                yield Request(
+                    'get',
+                    'GET',
+                    paths[index % len(paths)],
+                    headers,
+                    None,
+                )
+                index += 1
+
+        results = []
+
+        for worker_class, workers, threads in profiles:
+            with serve(
+                address,
+                GUNICORN_WORKER_CLASS=worker_class,
+                GUNICORN_WORKERS=str(workers),
+                GUNICORN_THREADS=str(threads),
+            ):
+                samples = generate(address, clients, duration, requests)
+
+            latencies = sorted(
+                sample.latency
+                for sample in samples
+                if sample.status == 200
+            )
+            results.append([
+                worker_class,
+                workers,
+                threads,
+                f'{len(latencies) / duration:.0f}',
+                f'{percentile(latencies, 0.5) * 1000:.1f}',
+                f'{percentile(latencies, 0.99) * 1000:.1f}',
+                len(samples) - len(latencies),
+            ])
+
+        report(
+            stream,
+            [
+                'worker class',
+                'workers',
+                'threads',
+                'requests/s',
+                'median ms',
+                'p99 ms',
+                'failures',
+            ],
+            results,
+        )
+
+    finally:
+        Review.objects.filter(submitter=user).delete()
+        user.delete()
+        for company in companies:
+            company.delete()
+        reviewer.delete()
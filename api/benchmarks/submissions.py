@@ -0,0 +1,134 @@
+'''
+Compare the sustained rate of review submissions, one review per request from
+several concurrent clients, when reviews are stored synchronously and when
+they're queued for asynchronous submission (see the REVIEW_SUBMISSIONS
+setting), along with the rate at which queued submissions are then stored in
+batches by the flusher.  Submissions go to a few companies, so synchronous
+submissions contend for the same company statistics, as they do during traffic
+spikes.  Unlike other benchmarks, this one needs every request to commit as it
+does in production, so its data is deleted when it finishes instead of being
+rolled back.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps
+from time import perf_counter
+
+from api.benchmarks import report
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+
+from reviews.models import (
+    Company,
+    Review,
+    ReviewSubmission,
+    Reviewer,
+    User,
+)
+
+
+clients = 8
+submissions = 2000
+batch_size = settings.REVIEW_SUBMISSIONS['BATCH_SIZE']
+
+
+def submit(user, payloads, status):
+    client = Client()
+    client.force_login(user)
+    try:
+        for payload in payloads:
+            response = client.post(
+                '/v1/review',
+                payload,
+                content_type='application/json',
+                HTTP_ACCEPT='application/json',
+            )
+            assert response.status_code == status, response.status_code
+    finally:
+        # Each client thread has a database connection of its own:
+        connection.close()
+
+
+def run(stream):
+
+    user = User.objects.create(
+        username='benchmark',
+    )
+    companies = [
+        Company.objects.create(name=f'Benchmark company {index}')
+        for index in range(5)
+    ]
+    reviewers = [
+        Reviewer.objects.create(email=f'benchmark{index}@example.com')
+        for index in range(50)
+    ]
+
+    try:
+        payloads = [
+            dumps({
+                'company': f'/v1/company/{companies[index % 5].pk}',
+                'reviewer': f'/v1/reviewer/{reviewers[index % 50].email}',
+                'rating': 1 + index % 5,
+                'title': f'Review {index}',
+                'summary': 'Lorem ipsum dolor sit amet. ' * 20,
+            })
+            for index in range(submissions)
+        ]
+
+        results = []
+
+        for asynchronous in [False, True]:
+            with override_settings(REVIEW_SUBMISSIONS={
+                **settings.REVIEW_SUBMISSIONS,
+                'ASYNC': asynchronous,
+            }), ThreadPoolExecutor(clients) as executor:
+                start = perf_counter()
+                for future in [
+                    executor.submit(
+                        submit,
+                        user,
+                        payloads[index::clients],
+                        202 if asynchronous else 201,
+                    )
+                    for index in range(clients)
+                ]:
+                    future.result()
+                elapsed = perf_counter() - start
+
+            flushed = ''
+            if asynchronous:
+                start = perf_counter()
+                while ReviewSubmission.flush(batch_size):
+                    pass
+                flushed = f'{submissions / (perf_counter() - start):.0f}'
+
+            results.append([
+                'async' if asynchronous else 'sync',
+                clients,
+                f'{elapsed / submissions * clients * 1000:.2f}',
+                f'{submissions / elapsed:.0f}',
+                flushed,
+            ])
+
+        report(
+            stream,
+            [
+                'mode',
+                'clients',
+                'mean ms',
+                'submissions/s',
+                'flushed reviews/s',
+            ],
+            results,
+        )
+
+    finally:
+        # Submissions are deleted along with their reviews and submitter:
+        Review.objects.filter(submitter=user).delete()
+        user.delete()
+        for company in companies:
+            company.delete()
+        for reviewer in reviewers:
+            reviewer.delete()
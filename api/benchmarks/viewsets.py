@@ -0,0 +1,437 @@
+'''
+Measure the latency and the number of queries of list, detail, create, update
+and delete requests to the user, company, reviewer and review viewsets, for a
+staff user and a regular user, against realistic volumes of data: 10000
+companies, 100000 reviewers and 1000000 reviews, scaled by the --scale option
+of the benchmark command.  List pages are also requested with ten times as
+many objects per page, and the benchmark fails if that takes more queries.
+Responses are served from the database rather than the response cache.
+
+Results can be saved as a baseline with the --save-baseline option of the
+benchmark command, and later runs compared with it to catch regressions; see
+api.benchmarks.compare.
+'''
+
+from json import dumps
+from time import perf_counter
+from unittest.mock import patch
+
+import api.benchmarks
+from api.benchmarks import (
+    Regression,
+    report,
+    rollback,
+)
+from api.pagination import CursorPagination
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils.timezone import now
+
+from reviews.models import (
+    Company,
+    CompanyStats,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+companies = 10000
+reviewers = 100000
+reviews = 1000000
+users = 1000
+
+# Every hundredth review is submitted by the regular user:
+regular_share = 100
+
+reads = 20
+writes = 10
+page_size = CursorPagination.page_size
+large_page_size = 10 * page_size
+
+
+def populate(scale):
+    '''
+    Seed companies with their statistics, reviewers, users and reviews with
+    set-based statements, bypassing the ORM, and return the numbers of seeded
+    objects, the primary keys of the seeded companies, and the regular user.
+    The search documents of reviews are filled in by their database trigger.
+    '''
+
+    # The regular user needs enough reviews of its own to update, delete and
+    # read in its cases, whatever the scale:
+    counts = {
+        'companies': max(1, int(companies * scale)),
+        'reviewers': max(1, int(reviewers * scale)),
+        'reviews': max(
+            regular_share * (2 * writes + reads),
+            int(reviews * scale),
+        ),
+        'users': max(1, int(users * scale)),
+    }
+    timestamp = now()
+
+    User.objects.create(
+        username='benchmark-staff',
+        is_staff=True,
+    )
+    regular = User.objects.create(
+        username='benchmark-regular',
+    )
+
+    with connection.cursor() as cursor:
+
+        cursor.execute(
+            f'''
+                insert into "{Company._meta.db_table}"
+                    ("created", "modified", "name", "url")
+                select
+                    %(timestamp)s - n * interval '1 second',
+                    %(timestamp)s - n * interval '1 second',
+                    'Company ' || n,
+                    'http://company' || n || '.example.com/'
+                from generate_series(1, %(companies)s) as n
+                returning "id"
+            ''',
+            {'timestamp': timestamp, **counts},
+        )
+        company_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            f'''
+                insert into "{Reviewer._meta.db_table}"
+                    ("email", "name", "created", "modified")
+                select
+                    'reviewer' || n || '@example.com',
+                    'Reviewer ' || n,
+                    %(timestamp)s - n * interval '1 second',
+                    %(timestamp)s - n * interval '1 second'
+                from generate_series(1, %(reviewers)s) as n
+            ''',
+            {'timestamp': timestamp, **counts},
+        )
+
+        cursor.execute(
+            f'''
+                insert into "{User._meta.db_table}" (
+                    "username", "password", "first_name", "last_name",
+                    "email", "is_superuser", "is_staff", "is_active",
+                    "date_joined", "created", "modified"
+                )
+                select
+                    'benchmark-user-' || n, '', '', '',
+                    'user' || n || '@example.com', false, false, true,
+                    %(timestamp)s, %(timestamp)s, %(timestamp)s
+                from generate_series(1, %(users)s) as n
+                returning "id"
+            ''',
+            {'timestamp': timestamp, **counts},
+        )
+        user_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            f'''
+                insert into "{Review._meta.db_table}" (
+                    "created", "modified", "submitter_id", "rating", "title",
+                    "summary", "ip_address", "company_id", "reviewer_id"
+                )
+                select
+                    %(timestamp)s - n * interval '1 second',
+                    %(timestamp)s - n * interval '1 second',
+                    case
+                        when n %% %(regular_share)s = 0 then %(regular)s
+                        else (%(user_ids)s::integer[])[1 + n %% %(users)s]
+                    end,
+                    1 + n %% 5,
+                    'Review ' || n,
+                    repeat('Lorem ipsum dolor sit amet. ', 20),
+                    '192.0.2.1',
+                    (%(company_ids)s::integer[])[1 + n %% %(companies)s],
+                    'reviewer' || 1 + n %% %(reviewers)s || '@example.com'
+                from generate_series(1, %(reviews)s) as n
+            ''',
+            {
+                'timestamp': timestamp,
+                'regular_share': regular_share,
+                'regular': regular.pk,
+                'user_ids': user_ids,
+                'company_ids': company_ids,
+                **counts,
+            },
+        )
+
+        cursor.execute(
+            f'''
+                insert into "{CompanyStats._meta.db_table}" (
+                    "company_id", "created", "modified", "count", "total",
+                    {', '.join(
+                        f'"rating_{rating}"'
+                        for rating in CompanyStats.ratings
+                    )},
+                    "last_review"
+                )
+                select
+                    "company"."id", %(timestamp)s, %(timestamp)s,
+                    count("review"."id"), coalesce(sum("review"."rating"), 0),
+                    {', '.join(
+                        f'count(*) filter (where "review"."rating" = {rating})'
+                        for rating in CompanyStats.ratings
+                    )},
+                    max("review"."created")
+                from unnest(%(company_ids)s::integer[]) as "company" ("id")
+                left join "{Review._meta.db_table}" as "review"
+                    on "review"."company_id" = "company"."id"
+                group by "company"."id"
+            ''',
+            {'timestamp': timestamp, 'company_ids': company_ids},
+        )
+
+        for model in [Company, CompanyStats, Reviewer, User, Review]:
+            cursor.execute(f'analyze "{model._meta.db_table}"')
+
+    return counts, company_ids, regular
+
+
+def cases(counts, company_ids, regular):
+    '''
+    Generate the name, requesting user and request factory of each case.
+    Request factories take the index of each request in the case, and return
+    its method, path and JSON payload, if any.
+    '''
+
+    staff = User.objects.get(username='benchmark-staff')
+    own_reviews = list(
+        Review.objects
+        .filter(submitter=regular)
+        .order_by('-created')
+        .values_list('pk', flat=True)
+        [:2 * writes + reads]
+    )
+
+    def company(index):
+        return f'/v1/company/{company_ids[index % len(company_ids)]}'
+
+    def reviewer(index):
+        return (
+            f'/v1/reviewer/reviewer{1 + index % counts["reviewers"]}'
+            '@example.com'
+        )
+
+    def seeded_user(index):
+        return f'/v1/user/benchmark-user-{1 + index % counts["users"]}'
+
+    for role, user in [('staff', staff), ('regular', regular)]:
+
+        # Objects to delete are created for each case beforehand:
+        doomed = {
+            'user': [
+                User.objects.create(username=f'doomed-{role}-{index}')
+                .username
+                for index in range(writes)
+            ],
+            'company': [
+                Company.objects.create(name=f'Doomed {role} {index}').pk
+                for index in range(writes)
+            ],
+            'reviewer': [
+                Reviewer.objects.create(
+                    email=f'doomed-{role}-{index}@example.com',
+                ).email
+                for index in range(writes)
+            ],
+            'review': (
+                own_reviews[:writes]
+                if role == 'staff'
+                else own_reviews[writes:2 * writes]
+            ),
+        }
+
+        requests = {
+            'user': {
+                'detail': lambda index, user=user: (
+                    'get',
+                    seeded_user(index)
+                    if user.is_staff
+                    else f'/v1/user/{user.username}',
+                    None,
+                ),
+                'create': lambda index, role=role: (
+                    'post',
+                    '/v1/user',
+                    {
+                        'username': f'created-{role}-{index}',
+                        'password': 'benchmark',
+                        'email': f'created-{role}-{index}@example.com',
+                    },
+                ),
+                'update': lambda index: (
+                    'patch',
+                    seeded_user(index),
+                    {'email': f'updated{index}@example.com'},
+                ),
+            },
+            'company': {
+                'detail': lambda index: ('get', company(index), None),
+                'create': lambda index, role=role: (
+                    'post',
+                    '/v1/company',
+                    {'name': f'Created {role} {index}'},
+                ),
+                'update': lambda index: (
+                    'patch',
+                    company(index),
+                    {'name': f'Updated {index}'},
+                ),
+            },
+            'reviewer': {
+                'detail': lambda index: ('get', reviewer(index), None),
+                'create': lambda index, role=role: (
+                    'post',
+                    '/v1/reviewer',
+                    {'email': f'created-{role}-{index}@example.com'},
+                ),
+                'update': lambda index: (
+                    'patch',
+                    reviewer(index),
+                    {'name': f'Updated {index}'},
+                ),
+            },
+            'review': {
+                'detail': lambda index: (
+                    'get',
+                    f'/v1/review/{own_reviews[2 * writes + index]}',
+                    None,
+                ),
+                'create': lambda index: (
+                    'post',
+                    '/v1/review',
+                    {
+                        'company': company(index),
+                        'reviewer': reviewer(index),
+                        'rating': 1 + index % 5,
+                        'title': f'Created {index}',
+                        'summary': 'Lorem ipsum dolor sit amet. ' * 20,
+                    },
+                ),
+                'update': lambda index: (
+                    'patch',
+                    f'/v1/review/{own_reviews[2 * writes + index]}',
+                    {'rating': 1 + index % 5},
+                ),
+            },
+        }
+
+        for resource, factories in requests.items():
+            yield f'{resource} list {role}', user, reads, (
+                lambda index, resource=resource: (
+                    'get',
+                    f'/v1/{resource}',
+                    None,
+                )
+            )
+            yield f'{resource} detail {role}', user, reads, factories['detail']
+            yield f'{resource} create {role}', user, writes, factories['create']
+            yield f'{resource} update {role}', user, writes, factories['update']
+            yield f'{resource} delete {role}', user, writes, (
+                lambda index, resource=resource, doomed=doomed[resource]: (
+                    'delete',
+                    f'/v1/{resource}/{doomed[index]}',
+                    None,
+                )
+            )
+
+
+def measure_case(name, client, user, repeat, request):
+    '''
+    Make the requests of a case and return their response status, number of
+    queries and median duration in milliseconds.  Every request in a case must
+    have the same response status.  The number of queries is the least taken
+    by any request, as the first requests of a case may fill caches.
+    '''
+
+    statuses = set()
+    queries = []
+    durations = []
+
+    for index in range(repeat):
+        method, path, payload = request(index)
+        executed = connection.query_count
+        start = perf_counter()
+        response = getattr(client, method)(
+            path,
+            **(
+                {}
+                if payload is None
+                else {
+                    'data': dumps(payload),
+                    'content_type': 'application/json',
+                }
+            ),
+            HTTP_ACCEPT='application/json',
+            HTTP_AUTHORIZATION=f'Token {user.auth_token.key}'
+        )
+        durations.append(perf_counter() - start)
+        queries.append(connection.query_count - executed)
+        statuses.add(response.status_code)
+
+    if len(statuses) > 1:
+        raise Regression(
+            f'Inconsistent response statuses in {name}: {statuses}',
+        )
+
+    durations.sort()
+    return {
+        'status': statuses.pop(),
+        'queries': min(queries),
+        'ms': round(durations[len(durations) // 2] * 1000, 3),
+    }
+
+
+def run(stream):
+
+    client = Client()
+    results = {}
+
+    with rollback(), override_settings(
+        RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': False},
+    ):
+        seeded = populate(api.benchmarks.scale)
+
+        for name, user, repeat, request in cases(*seeded):
+            results[name] = measure_case(name, client, user, repeat, request)
+
+            # Lists must take as many queries regardless of their page size:
+            if ' list ' in name:
+                with patch.object(
+                    CursorPagination,
+                    'page_size',
+                    large_page_size,
+                ):
+                    large = measure_case(name, client, user, repeat, request)
+                results[f'{name} x{large_page_size}'] = large
+
+    report(
+        stream,
+        ['case', 'status', 'queries', 'median ms'],
+        [
+            [name, result['status'], result['queries'], result['ms']]
+            for name, result in results.items()
+        ],
+    )
+
+    growing = [
+        name
+        for name, result in results.items()
+        if ' list ' in name
+        and not name.endswith(f' x{large_page_size}')
+        and results[f'{name} x{large_page_size}']['queries'] >
+        result['queries']
+    ]
+    if growing:
+        raise Regression(
+            f'Query counts grow with page size in: {", ".join(growing)}',
+        )
+
+    return results
@@ -1,4 +1,20 @@
+from api.utils.database import Collate, has_extension
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, IntegerField, Q
+from django.db.models.functions import Cast, Upper
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 from dry_rest_permissions.generics import DRYPermissionFiltersBase
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from django_filters import (
+    BaseInFilter,
+    CharFilter,
+    Filter,
+)
+
+from reviews.models import Review
 
 
 class UserFilterBackend(DRYPermissionFiltersBase):
@@ -30,5 +46,138 @@ class ReviewFilterBackend(DRYPermissionFiltersBase):
             return queryset
 
         return queryset.filter(
-            submitter=request.user,
+            submitter_id=request.user.pk,
+        )
+
+
+class ReviewSearchFilterBackend(BaseFilterBackend):
+    '''
+    Search reviews by title and summary with the q query parameter, e.g.
+    /v1/review?q=great+service, using the full-text search index of reviews.
+    Search results are ranked by relevance, best matches first, and ties are
+    listed latest first.  Rankings are scaled to integers so that pagination
+    cursors compare them exactly.
+    '''
+
+    search_param = 'q'
+    rank_scale = 1000000
+
+    def get_search_query(self, request):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return None
+        return SearchQuery(terms, config=Review.search_config)
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        return queryset.filter(search=query).annotate(
+            search_rank=Cast(
+                SearchRank(F('search'), query) * self.rank_scale,
+                IntegerField(),
+            ),
         )
+
+    # Cursor pagination takes its ordering from the first filter backend of a
+    # view that provides one:
+    def get_ordering(self, request, queryset, view):
+        if self.get_search_query(request) is None:
+            return view.pagination_class.ordering
+        return ('-search_rank', '-created')
+
+
+class CompanyNameFilterBackend(BaseFilterBackend):
+    '''
+    Look up companies by name with the name query parameter, e.g.
+    /v1/company?name=acme, matching names that start with the given text
+    regardless of case, and if the database supports trigram matching, names
+    similar to it as well.
+    '''
+
+    name_param = 'name'
+
+    @staticmethod
+    def annotate_name_key(queryset):
+        '''
+        Annotate companies with the name_key expression of the company name
+        prefix index, for looking up and ordering companies by name prefix with
+        the upper-cased prefix.
+        '''
+        return queryset.annotate(
+            name_key=Collate(Upper('name'), 'C'),
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.name_param, '').strip()
+        if not name:
+            return queryset
+
+        matches = Q(name_key__startswith=name.upper())
+        if has_extension('pg_trgm'):
+            matches |= Q(name__trigram_similar=name)
+        return self.annotate_name_key(queryset).filter(matches)
+
+
+class ValidatingFilterBackend(DjangoFilterBackend):
+    '''
+    Filter lists with the FilterSet of their views, rejecting requests with
+    invalid filter values with a 400 Bad Request response that describes the
+    errors, rather than silently listing nothing.
+    '''
+
+    def filter_queryset(self, request, queryset, view):
+        filter_class = self.get_filter_class(view, queryset)
+        if filter_class is None:
+            return queryset
+
+        filterset = filter_class(
+            request.query_params,
+            queryset=queryset,
+            request=request,
+        )
+        if not filterset.form.is_valid():
+            raise ValidationError(filterset.form.errors)
+        return filterset.qs
+
+
+class IntegerFilter(Filter):
+    field_class = forms.IntegerField
+
+
+class IntegerInFilter(BaseInFilter, IntegerFilter):
+    pass
+
+
+class CharInFilter(BaseInFilter, CharFilter):
+    pass
+
+
+class ReviewFilterSet(FilterSet):
+    '''
+    Filter reviews by company, reviewer, rating, and ranges of creation and
+    modification times; e.g. /v1/review?company__in=1,2&rating__gte=4.
+    Companies are given by identifier and reviewers by e-mail address, and
+    __in lookups take comma-separated lists of values.  Filtered lists are
+    read from the indexes of reviews by company, reviewer and submitter in
+    creation order, or from those by creation or modification time.
+    '''
+
+    company = IntegerFilter(name='company')
+    company__in = IntegerInFilter(name='company', lookup_expr='in')
+
+    reviewer = CharFilter(name='reviewer')
+    reviewer__in = CharInFilter(name='reviewer', lookup_expr='in')
+
+    rating = IntegerFilter(name='rating')
+    rating__in = IntegerInFilter(name='rating', lookup_expr='in')
+    rating__gte = IntegerFilter(name='rating', lookup_expr='gte')
+    rating__lte = IntegerFilter(name='rating', lookup_expr='lte')
+
+    class Meta:
+        model = Review
+        fields = {
+            'created': ['gt', 'gte', 'lt', 'lte'],
+            'modified': ['gt', 'gte', 'lt', 'lte'],
+        }
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler as DjangoWSGIHandler
+from django.utils.module_loading import import_string
+
+
+class LeanWSGIHandler(DjangoWSGIHandler):
+    '''
+    WSGI handler that runs requests through the API_MIDDLEWARE middleware
+    instead of MIDDLEWARE.
+    '''
+
+    def load_middleware(self):
+        # This follows BaseHandler.load_middleware for settings.MIDDLEWARE:
+        self._request_middleware = []
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for middleware_path in reversed(settings.API_MIDDLEWARE):
+            try:
+                middleware = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+
+            if hasattr(middleware, 'process_view'):
+                self._view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self._template_response_middleware.append(
+                    middleware.process_template_response,
+                )
+            if hasattr(middleware, 'process_exception'):
+                self._exception_middleware.append(middleware.process_exception)
+
+            handler = convert_exception_to_response(middleware)
+
+        self._middleware_chain = handler
+
+
+class WSGIHandler(DjangoWSGIHandler):
+    '''
+    WSGI handler that routes stateless API requests through a short chain of
+    middleware, and every other request through the full chain.  Stateless API
+    requests are those for paths starting with any of API_MIDDLEWARE_PATHS
+    that carry credentials in an Authorization header, such as tokens, so they
+    need no sessions, messages, CSRF protection or debugging toolbar; requests
+    authenticated with sessions, like those of the browsable API, still go
+    through the full chain.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lean_handler = (
+            LeanWSGIHandler()
+            if settings.API_MIDDLEWARE is not None
+            else None
+        )
+        self.lean_paths = tuple(settings.API_MIDDLEWARE_PATHS)
+
+    def is_stateless(self, environ):
+        return (
+            'HTTP_AUTHORIZATION' in environ and
+            environ.get('PATH_INFO', '').startswith(self.lean_paths)
+        )
+
+    def __call__(self, environ, start_response):
+        if self.lean_handler is not None and self.is_stateless(environ):
+            return self.lean_handler(environ, start_response)
+        return super().__call__(environ, start_response)
@@ -0,0 +1,117 @@
+from importlib import import_module
+from json import dump, load
+from pkgutil import iter_modules
+
+from django.core.management.base import BaseCommand, CommandError
+
+import api.benchmarks
+from api.benchmarks import Regression, compare
+
+
+class Command(BaseCommand):
+
+    help = '''
+        Run performance benchmarks for the API against the configured database.
+        Benchmark data is rolled back when each benchmark finishes.  Results of
+        benchmarks that return them can be saved to a baseline file, or
+        compared with one, in which case the command fails on regressions.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks',
+            nargs='+',
+            choices=[
+                name
+                for _, name, _ in iter_modules(api.benchmarks.__path__)
+            ],
+            help='Names of benchmark modules in api.benchmarks to run',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON file of earlier results to compare results with',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Save results to the baseline file instead of comparing them',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='''
+                Fraction by which durations may exceed those in the baseline
+                before they're taken for regressions
+            ''',
+        )
+        parser.add_argument(
+            '--margin',
+            type=float,
+            default=2.0,
+            help='''
+                Milliseconds by which durations may exceed those in the
+                baseline regardless of the threshold, to allow for noise
+            ''',
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='''
+                Factor applied to the volumes of data seeded by benchmarks that
+                support it
+            ''',
+        )
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline requires --baseline')
+
+        api.benchmarks.scale = options['scale']
+
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = load(file)
+            except FileNotFoundError:
+                if not options['save_baseline']:
+                    raise CommandError(
+                        f'Baseline file {options["baseline"]} not found',
+                    )
+
+        regressions = []
+        for name in options['benchmarks']:
+            self.stdout.write(f'Running benchmark: {name}')
+            try:
+                results = import_module(f'api.benchmarks.{name}').run(
+                    self.stdout,
+                )
+            except Regression as regression:
+                regressions.append(f'{name}: {regression}')
+                continue
+
+            if results is None:
+                continue
+            if options['save_baseline']:
+                baseline[name] = results
+            elif name in baseline:
+                regressions.extend(
+                    f'{name}: {regression}'
+                    for regression in compare(
+                        results,
+                        baseline[name],
+                        options['threshold'],
+                        options['margin'],
+                    )
+                )
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as file:
+                dump(baseline, file, indent=4, sort_keys=True)
+
+        if regressions:
+            raise CommandError(
+                'Performance regressions:\n' + '\n'.join(regressions),
+            )
@@ -0,0 +1,85 @@
+from sys import stdout
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import ReviewViewSet
+from reviews.models import User
+
+
+class Command(BaseCommand):
+
+    help = '''
+        Export every review visible to a user, just like the review export API
+        resource does, but outside of the request path, so that exports of any
+        size can be produced without running into server request timeouts.
+        The export keeps a database transaction open until it finishes, and
+        is ended if writing its output stalls for longer than the export idle
+        timeout (EXPORT_IDLE_TIMEOUT).
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'username',
+            help='User whose visible reviews are exported; administrators see '
+                 'every review',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--base-url',
+            default='http://localhost/',
+            help='Base address of the API for hyperlinks in the export',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write the export to; - for standard output',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["username"]} does not exist')
+
+        base_url = urlsplit(options['base_url'])
+        path = reverse('v1:review-export')
+
+        request = APIRequestFactory().get(
+            path,
+            {'format': options['format']},
+            HTTP_HOST=base_url.netloc,
+            secure=base_url.scheme == 'https',
+        )
+        request.resolver_match = resolve(path)
+        force_authenticate(request, user=user)
+
+        # Set up the view with the same options as the export route:
+        view = ReviewViewSet.as_view(
+            {'get': 'export'},
+            **ReviewViewSet.export.kwargs
+        )
+        response = view(request)
+        if response.status_code != 200:
+            raise CommandError(
+                f'Export failed with status {response.status_code}',
+            )
+
+        output = (
+            stdout.buffer
+            if options['output'] == '-'
+            else open(options['output'], 'wb')
+        )
+        try:
+            for chunk in response.streaming_content:
+                output.write(chunk)
+        finally:
+            response.close()
+            if output is not stdout.buffer:
+                output.close()
@@ -0,0 +1,58 @@
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.models import ReviewSubmission
+
+
+class Command(BaseCommand):
+
+    help = '''
+        Store queued asynchronous review submissions as reviews in batches, \
+        polling the queue until interrupted, and purge stored submissions after \
+        their retention period.  Any number of these may run at once; each \
+        batch is only flushed by one of them.  See the REVIEW_SUBMISSIONS \
+        setting.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.REVIEW_SUBMISSIONS['BATCH_SIZE'],
+            help='Maximum number of reviews stored with each bulk insertion',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling it',
+        )
+
+    def handle(self, *args, **options):
+        interval = settings.REVIEW_SUBMISSIONS['INTERVAL'].total_seconds()
+        retention = settings.REVIEW_SUBMISSIONS['RETENTION']
+
+        while True:
+            stored = self.flush(options['batch_size'])
+            purged = ReviewSubmission.purge(retention)
+            if stored or purged:
+                self.stdout.write(
+                    f'Stored {stored} reviews; purged {purged} submissions',
+                )
+            if options['once']:
+                return
+            sleep(interval)
+
+    def flush(self, batch_size):
+        '''
+        Flush batches until the queue is drained, and return the number of
+        reviews stored.
+        '''
+
+        stored = 0
+        while True:
+            flushed = ReviewSubmission.flush(batch_size)
+            stored += flushed
+            if flushed < batch_size:
+                return stored
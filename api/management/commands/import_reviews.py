@@ -0,0 +1,394 @@
+from csv import DictReader
+from functools import lru_cache
+from io import TextIOWrapper
+from ipaddress import ip_address
+from json import loads
+from sys import stdin
+from time import perf_counter
+from urllib.parse import unquote, urlsplit
+
+from api.utils.database import copy_rows
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import connection
+from django.db.transaction import atomic, on_commit
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from api.views import response_cache
+from reviews.models import (
+    Company,
+    CompanyStats,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+staging_table = 'import_reviews_staging'
+
+# Columns loaded into the staging table from each input record:
+record_columns = (
+    'submitter',
+    'company',
+    'reviewer',
+    'reviewer_name',
+    'rating',
+    'title',
+    'summary',
+    'ip_address',
+    'created',
+)
+
+
+class Command(BaseCommand):
+
+    help = '''
+        Import reviews from NDJSON or CSV records, such as those produced by \
+        the export_reviews command.  Records are streamed into a staging table \
+        with COPY, validated there all at once, and merged into the reviews \
+        table in a single transaction, so an import either adds every valid \
+        record or nothing at all.  Unknown reviewers are registered by e-mail \
+        address.  References to submitters, companies and reviewers may be \
+        given as API hyperlinks or as usernames, identifiers and e-mail \
+        addresses respectively.  Rejected records are reported by line number.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            default='-',
+            help='File to read records from; - for standard input',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--submitter',
+            help='Username of the submitter of records that specify none',
+        )
+
+    def handle(self, *args, **options):
+        if options['submitter'] is not None and not User.objects.filter(
+            username=options['submitter'],
+        ).exists():
+            raise CommandError(f'User {options["submitter"]} does not exist')
+
+        self.rejected = 0
+        self.total = 0
+        start = perf_counter()
+
+        input = (
+            TextIOWrapper(stdin.buffer, encoding='utf-8', newline='')
+            if options['input'] == '-'
+            else open(options['input'], encoding='utf-8', newline='')
+        )
+        try:
+            imported, registered = self.load(
+                self.rows(
+                    self.records(input, options['format']),
+                    options['submitter'],
+                ),
+            )
+        finally:
+            if options['input'] != '-':
+                input.close()
+
+        elapsed = perf_counter() - start
+        self.stdout.write(
+            f'Imported {imported} reviews and registered {registered} '
+            f'reviewers; rejected {self.rejected} of {self.total} records in '
+            f'{elapsed:.1f}s ({self.total / elapsed:.0f} records/s)',
+        )
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        self.stderr.write(f'Line {line}: {reason}')
+
+    def records(self, input, format):
+        '''
+        Iterate over the records in the input as (line, dictionary) tuples, or
+        (line, None) for records that can't be decoded.
+        '''
+
+        if format == 'ndjson':
+            for line, text in enumerate(input, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    record = loads(text)
+                except ValueError:
+                    record = None
+                yield line, record if isinstance(record, dict) else None
+
+        else:
+            reader = DictReader(input)
+            for record in reader:
+                yield reader.line_num, {
+                    field: value
+                    for field, value in record.items()
+                    if value != '' or field in ('title', 'summary')
+                }
+
+    def rows(self, records, default_submitter):
+        '''
+        Turn records into staging table rows, rejecting those that can't be
+        stored in it.  Everything else is validated in the staging table.
+        '''
+
+        for line, record in records:
+            self.total += 1
+            try:
+                yield [line] + self.row(record, default_submitter)
+            except ValueError as error:
+                self.reject(line, error)
+
+    def row(self, record, default_submitter):
+        if record is None:
+            raise ValueError('Malformed record')
+
+        row = []
+        for column in record_columns:
+            value = record.get(column)
+            if value is not None:
+                if isinstance(value, (dict, list)):
+                    raise ValueError(f'Malformed {column}')
+                value = str(value)
+                if '\0' in value:
+                    raise ValueError(f'Malformed {column}')
+            row.append(value)
+
+        submitter, company, reviewer = (unlink(value) for value in row[:3])
+        row[:3] = submitter or default_submitter, company, reviewer
+
+        # Reviewer e-mail addresses follow the rules of the API's EmailField:
+        if reviewer is not None and not is_email_address(reviewer):
+            raise ValueError('Invalid reviewer e-mail address')
+
+        ip, created = row[7:9]
+        if not is_ip_address(ip):
+            raise ValueError(f'Invalid IP address {ip}')
+
+        if created is not None:
+            timestamp = parse_datetime(created)
+            if timestamp is None:
+                raise ValueError(f'Invalid creation time {created}')
+            if is_naive(timestamp):
+                timestamp = make_aware(timestamp)
+            row[8] = timestamp.isoformat()
+
+        return row
+
+    @atomic
+    def load(self, rows):
+        cursor = connection.cursor()
+
+        cursor.execute(f'''
+            create temporary table "{staging_table}" (
+                "line" bigint primary key,
+                "submitter" text,
+                "company" text,
+                "reviewer" text,
+                "reviewer_name" text,
+                "rating" text,
+                "title" text,
+                "summary" text,
+                "ip_address" inet,
+                "created" timestamp with time zone,
+                "submitter_id" integer,
+                "company_id" integer,
+                "error" text
+            ) on commit drop
+        ''')
+
+        copy_rows(staging_table, ('line',) + record_columns, rows)
+
+        # Resolve references to submitters and companies:
+        cursor.execute(f'''
+            update "{staging_table}" as s
+            set "submitter_id" = u."id"
+            from "{User._meta.db_table}" as u
+            where u."username" = s."submitter"
+        ''')
+        cursor.execute(f'''
+            update "{staging_table}" as s
+            set "company_id" = c."id"
+            from "{Company._meta.db_table}" as c
+            where c."id" = case
+                when s."company" ~ '^[0-9]{{1,9}}$' then s."company"::integer
+            end
+        ''')
+
+        # Validate every row at once, keeping the first problem found in each:
+        cursor.execute(
+            f'''
+                update "{staging_table}"
+                set "error" = case
+                    when "submitter_id" is null
+                        then 'Unknown submitter ' || coalesce("submitter", '')
+                    when "company_id" is null
+                        then 'Unknown company ' || coalesce("company", '')
+                    when "rating" is null or "rating" !~ '^[1-5]$'
+                        then 'Rating must be an integer between 1 and 5'
+                    when "reviewer" is null
+                        or length("reviewer") > %(email_max_length)s
+                        then 'Invalid reviewer e-mail address'
+                    when length("reviewer_name") > %(name_max_length)s
+                        then 'Reviewer name too long'
+                    when length("title") > %(title_max_length)s
+                        then 'Title too long'
+                    when length("summary") > %(summary_max_length)s
+                        then 'Summary too long'
+                end
+            ''',
+            {
+                'email_max_length': Reviewer._meta.get_field('email').max_length,
+                'name_max_length': Reviewer._meta.get_field('name').max_length,
+                'title_max_length': Review.title_max_length,
+                'summary_max_length': Review.summary_max_length,
+            },
+        )
+
+        cursor.execute(f'''
+            select "line", "error"
+            from "{staging_table}"
+            where "error" is not null
+            order by "line"
+        ''')
+        for line, error in cursor.fetchall():
+            self.reject(line, error)
+
+        # Register unknown reviewers with the first name given for each:
+        cursor.execute(f'''
+            insert into "{Reviewer._meta.db_table}" (
+                "created",
+                "modified",
+                "email",
+                "name"
+            )
+            select distinct on ("reviewer")
+                now(),
+                now(),
+                "reviewer",
+                coalesce("reviewer_name", '')
+            from "{staging_table}"
+            where "error" is null
+            order by "reviewer", "reviewer_name" is null, "line"
+            on conflict ("email") do nothing
+        ''')
+        registered = cursor.rowcount
+
+        # Companies without statistics get them from their stored reviews,
+        # before imported reviews are added to them below:
+        cursor.execute(f'''
+            select distinct "company_id"
+            from "{staging_table}"
+            where "error" is null
+        ''')
+        CompanyStats.create_missing(
+            company_id for [company_id] in cursor.fetchall()
+        )
+
+        cursor.execute(f'''
+            insert into "{Review._meta.db_table}" (
+                "created",
+                "modified",
+                "submitter_id",
+                "rating",
+                "title",
+                "summary",
+                "ip_address",
+                "company_id",
+                "reviewer_id"
+            )
+            select
+                coalesce("created", now()),
+                now(),
+                "submitter_id",
+                "rating"::integer,
+                coalesce("title", ''),
+                coalesce("summary", ''),
+                "ip_address",
+                "company_id",
+                "reviewer"
+            from "{staging_table}"
+            where "error" is null
+            order by "line"
+        ''')
+        imported = cursor.rowcount
+
+        # Signals aren't sent for rows inserted with SQL, so company statistics
+        # are updated here instead, once per company:
+        histogram = ', '.join(
+            f'"rating_{rating}" = s."rating_{rating}" + i."rating_{rating}"'
+            for rating in CompanyStats.ratings
+        )
+        counts = ', '.join(
+            f'''
+                count(*) filter (where "rating" = '{rating}')
+                as "rating_{rating}"
+            '''
+            for rating in CompanyStats.ratings
+        )
+        cursor.execute(f'''
+            update "{CompanyStats._meta.db_table}" as s
+            set
+                "modified" = now(),
+                "count" = s."count" + i."count",
+                "total" = s."total" + i."total",
+                {histogram},
+                "last_review" = greatest(s."last_review", i."last_review")
+            from (
+                select
+                    "company_id",
+                    count(*) as "count",
+                    sum("rating"::integer) as "total",
+                    {counts},
+                    max(coalesce("created", now())) as "last_review"
+                from "{staging_table}"
+                where "error" is null
+                group by "company_id"
+            ) as i
+            where s."company_id" = i."company_id"
+        ''')
+
+        cursor.execute(f'drop table "{staging_table}"')
+
+        if registered:
+            on_commit(lambda: response_cache.invalidate(Reviewer, None))
+
+        return imported, registered
+
+
+# Reviews often come from a few addresses, so checks are remembered:
+@lru_cache(maxsize=4096)
+def is_ip_address(value):
+    try:
+        ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=4096)
+def is_email_address(value):
+    try:
+        validate_email(value)
+    except ValidationError:
+        return False
+    return True
+
+
+def unlink(value):
+    '''
+    Get the lookup value at the end of an API hyperlink, or the value itself if
+    it's not a hyperlink.
+    '''
+
+    if value is None or '://' not in value:
+        return value
+    return unquote(urlsplit(value).path.rstrip('/').rsplit('/', 1)[-1])
@@ -0,0 +1,419 @@
+from argparse import ArgumentTypeError
+from base64 import b64encode
+from http.client import HTTPConnection
+from json import dumps, loads
+from random import Random
+
+from api.benchmarks import report
+from api.strategies import (
+    company_names,
+    emails,
+    passwords,
+    reviewer_names,
+    reviews,
+    usernames,
+)
+from api.utils.load import (
+    Request,
+    generate,
+    serve,
+    summarize,
+    summary_headers,
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from hypothesis.strategies import lists
+
+from reviews.models import (
+    Company,
+    Review,
+    ReviewSubmission,
+    Reviewer,
+    User,
+)
+
+
+version = 'v1'
+
+# Authentication schemes assigned to synthetic users in turn:
+schemes = ['token', 'jwt', 'basic']
+
+# Operations replayed by clients, with their default relative frequencies:
+operations = {
+    'submit': 1,
+    'list': 3,
+    'company': 4,
+    'detail': 2,
+}
+default_mix = ','.join(
+    f'{operation}={weight}'
+    for operation, weight in operations.items()
+)
+
+
+def mix(value):
+    '''
+    Parse a mix of operations given as comma-separated operation=weight pairs;
+    e.g. submit=1,list=3.  Operations left out aren't replayed.
+    '''
+    weights = {}
+    for pair in value.split(','):
+        operation, _, weight = pair.partition('=')
+        if operation not in operations:
+            raise ArgumentTypeError(f'Unknown operation: {operation}')
+        try:
+            weights[operation] = float(weight)
+        except ValueError:
+            raise ArgumentTypeError(f'Invalid weight: {pair}')
+        if weights[operation] < 0:
+            raise ArgumentTypeError(f'Negative weight: {pair}')
+    if not any(weights.values()):
+        raise ArgumentTypeError('No operation has a positive weight')
+    return weights
+
+
+def unique(strategy, count, existing):
+    '''
+    Generate a number of distinct values from a strategy, other than existing
+    ones.
+    '''
+    values = set(existing)
+    generated = []
+    while len(generated) < count:
+        for value in lists(
+            strategy,
+            min_size=count,
+            max_size=count,
+            unique=True,
+        ).example():
+            if value not in values and len(generated) < count:
+                values.add(value)
+                generated.append(value)
+    return generated
+
+
+def address(value):
+    host, _, port = value.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise ArgumentTypeError(f'Invalid address: {value}')
+
+
+class Command(BaseCommand):
+
+    help = '''
+        Load test the API under gunicorn against the configured database.  A \
+        pool of synthetic users, companies and reviewers is generated with \
+        the Hypothesis strategies in api.strategies and stored in the \
+        database.  The application is then started with config/gunicorn.py, \
+        where GUNICORN_* environment variables apply as usual.  Users \
+        authenticate through the token, JSON Web Token and Basic schemes in \
+        turn, and concurrent clients replay a mix of review submissions, \
+        filtered review lists, company lookups and review detail fetches for \
+        a fixed duration.  Throughput, latency percentiles and error rates \
+        are reported by operation.  Generated data, including submitted \
+        reviews, is deleted when the command finishes.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Number of concurrent clients, each with its own connection',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Duration of the load in seconds',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=24,
+            help='Number of synthetic users shared by the clients',
+        )
+        parser.add_argument(
+            '--companies',
+            type=int,
+            default=50,
+            help='Number of synthetic companies and reviewers',
+        )
+        parser.add_argument(
+            '--mix',
+            type=mix,
+            default=operations,
+            help=f'''
+                Relative frequencies of operations, as comma-separated
+                operation=weight pairs; by default, {default_mix}
+            ''',
+        )
+        parser.add_argument(
+            '--bind',
+            type=address,
+            default=('127.0.0.1', 8901),
+            help='Local host:port address for the server to listen on',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the random choices of operations by clients',
+        )
+
+    def handle(self, *args, **options):
+        if min(
+            options['concurrency'],
+            options['users'],
+            options['companies'],
+        ) < 1:
+            raise CommandError(
+                'At least one client, one user and one company are needed',
+            )
+
+        self.stdout.write('Generating data')
+        self.users = []
+        self.companies = []
+        self.reviewers = []
+        try:
+            self.populate(options['users'], options['companies'])
+
+            self.stdout.write('Starting the server')
+            with serve(options['bind']):
+                self.connection = HTTPConnection(*options['bind'])
+                self.stdout.write('Authenticating users')
+                credentials = [
+                    self.authenticate(index, user, password)
+                    for index, (user, password) in enumerate(self.users)
+                ]
+                self.connection.close()
+
+                self.stdout.write(
+                    f'Running {options["concurrency"]} clients for '
+                    f'{options["duration"]:g} seconds'
+                )
+                samples = generate(
+                    options['bind'],
+                    options['concurrency'],
+                    options['duration'],
+                    lambda index: self.requests(
+                        Random(options['seed'] + index),
+                        options['mix'],
+                        *credentials[index % len(credentials)],
+                    ),
+                )
+
+        finally:
+            self.stdout.write('Deleting data')
+            self.depopulate()
+
+        report(self.stdout, summary_headers, summarize(
+            samples,
+            options['duration'],
+        ))
+
+    def populate(self, users, companies):
+        '''
+        Store users with their passwords, companies and reviewers, and a few
+        reviews by each user to fetch, all generated by Hypothesis strategies.
+        Review payloads to submit are generated here too, so that clients don't
+        spend their time generating them.
+        '''
+
+        for username in unique(
+            usernames,
+            users,
+            User.objects.values_list('username', flat=True),
+        ):
+            password = passwords.example()
+            user = User.objects.create_user(
+                username=username,
+                password=password,
+            )
+            self.users.append((user, password))
+
+        self.companies = [
+            Company.objects.create(name=name)
+            for name in lists(
+                company_names,
+                min_size=companies,
+                max_size=companies,
+            ).example()
+        ]
+
+        # Reviewers are linked to by e-mail address in URLs, where slashes and
+        # question marks can't occur:
+        self.reviewers = [
+            Reviewer.objects.create(email=email, name=reviewer_names.example())
+            for email in unique(
+                emails.filter(lambda email: not set(email) & set('/?')),
+                companies,
+                Reviewer.objects.values_list('email', flat=True),
+            )
+        ]
+
+        self.payloads = [
+            {
+                'company': reverse(
+                    f'{version}:company-detail',
+                    kwargs={'pk': company.pk},
+                ),
+                'reviewer': reverse(
+                    f'{version}:reviewer-detail',
+                    kwargs={'email': reviewer.email},
+                ),
+                **review,
+            }
+            for company, reviewer, review in zip(
+                self.companies,
+                self.reviewers,
+                lists(
+                    reviews,
+                    min_size=companies,
+                    max_size=companies,
+                ).example(),
+            )
+        ]
+
+        self.reviews = {
+            user.pk: [
+                Review.objects.create(
+                    submitter=user,
+                    company=self.companies[(index + offset) % companies],
+                    reviewer=self.reviewers[(index + offset) % companies],
+                    ip_address='127.0.0.1',
+                    **review,
+                ).pk
+                for offset, review in enumerate(
+                    lists(reviews, min_size=3, max_size=3).example(),
+                )
+            ]
+            for index, (user, _) in enumerate(self.users)
+        }
+
+    def depopulate(self):
+        users = [user for user, _ in self.users]
+        Review.objects.filter(submitter__in=users).delete()
+        ReviewSubmission.objects.filter(submitter__in=users).delete()
+        for user in users:
+            user.delete()
+        Company.objects.filter(
+            pk__in=[company.pk for company in self.companies],
+        ).delete()
+        Reviewer.objects.filter(
+            pk__in=[reviewer.pk for reviewer in self.reviewers],
+        ).delete()
+
+    def call(self, method, path, headers, body=None):
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        if response.status != 200:
+            raise CommandError(
+                f'{method} {path} failed with status {response.status}: '
+                f'{content.decode(errors="replace")}'
+            )
+        return loads(content)
+
+    def authenticate(self, index, user, password):
+        '''
+        Authenticate a user through the scheme assigned to it, and return its
+        Authorization header along with the user.
+        '''
+
+        scheme = schemes[index % len(schemes)]
+        body = dumps({'username': user.username, 'password': password})
+        headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+        }
+
+        if scheme == 'token':
+            token = self.call('POST', '/api-token-auth/', headers, body)
+            authorization = f'Token {token["token"]}'
+
+        elif scheme == 'jwt':
+            token = self.call('POST', '/jwt/auth', headers, body)
+            authorization = f'JWT {token["token"]}'
+
+        else:
+            authorization = 'Basic ' + b64encode(
+                f'{user.username}:{password}'.encode(),
+            ).decode()
+
+        # Every scheme is checked by fetching the user's own details:
+        self.call(
+            'GET',
+            reverse(
+                f'{version}:user-detail',
+                kwargs={'username': user.username},
+            ),
+            {'Accept': 'application/json', 'Authorization': authorization},
+        )
+        return user, authorization
+
+    def requests(self, random, mix, user, authorization):
+        '''
+        Generate the requests of a client: operations chosen at random with the
+        weights of the mix, on behalf of a user.
+        '''
+
+        headers = {
+            'Accept': 'application/json',
+            'Authorization': authorization,
+        }
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        reviews_path = reverse(f'{version}:review-list')
+
+        while True:
+            operation = random.choices(names, weights)[0]
+
+            if operation == 'submit':
+                yield Request(
+                    operation,
+                    'POST',
+                    reviews_path,
+                    {**headers, 'Content-Type': 'application/json'},
+                    dumps(random.choice(self.payloads)),
+                )
+
+            elif operation == 'list':
+                filters = random.choice([
+                    lambda: f'rating={random.randint(1, 5)}',
+                    lambda: f'rating__gte={random.randint(1, 5)}',
+                    lambda: f'company={random.choice(self.companies).pk}',
+                ])
+                yield Request(
+                    operation,
+                    'GET',
+                    f'{reviews_path}?{filters()}',
+                    headers,
+                    None,
+                )
+
+            elif operation == 'company':
+                yield Request(
+                    operation,
+                    'GET',
+                    reverse(
+                        f'{version}:company-detail',
+                        kwargs={'pk': random.choice(self.companies).pk},
+                    ),
+                    headers,
+                    None,
+                )
+
+            else:
+                yield Request(
+                    operation,
+                    'GET',
+                    reverse(
+                        f'{version}:review-detail',
+                        kwargs={'pk': random.choice(self.reviews[user.pk])},
+                    ),
+                    headers,
+                    None,
+                )
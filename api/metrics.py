@@ -0,0 +1,482 @@
+'''
+Per-request performance instrumentation.  MetricsMiddleware times each request
+and the phases of its handling: authentication, permission checks,
+serialization and rendering, which are timed by api.views.TimedViewMixin, as
+well as the number of database queries and the time spent running them.  The
+timings are sent to clients in a Server-Timing header, and recorded in latency
+histograms by view, which api.views.MetricsView serves in the Prometheus text
+format.
+
+Metrics are kept in the memory of each process.  When the METRICS setting
+names a directory, each process also saves its metrics to a file of its own in
+that directory every so often, and merges them into a file for exited
+processes as it exits.  Metrics are then served from the files of every
+process sharing the directory, so that any server worker can serve the metrics
+of all of them; see config/gunicorn.py.
+'''
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import timedelta
+from fcntl import LOCK_EX, flock
+from json import dump, load
+from os import getpid, listdir, path, replace, unlink
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+# Upper bounds of the histogram buckets, in seconds:
+buckets = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0,
+)
+
+# Requests with other methods are recorded together, so that clients can't
+# make up an unbounded number of series:
+methods = ('DELETE', 'GET', 'HEAD', 'OPTIONS', 'PATCH', 'POST', 'PUT')
+
+help_texts = {
+    'reviews_request_duration_seconds': (
+        'Time spent serving requests by view, method and phase of their '
+        'handling; database time is excluded from other phases.'
+    ),
+    'reviews_database_queries_total': (
+        'Database queries run while serving requests by view and method.'
+    ),
+    'reviews_database_pool_events_total': (
+        'Connections opened, reused, recycled and discarded by database '
+        'connection pools, and waits and timeouts for pooled connections.'
+    ),
+    'reviews_response_cache_requests_total': (
+        'Response cache lookups by result.'
+    ),
+}
+
+
+def database_usage():
+    '''
+    Get the number of queries run by the database connections of this thread,
+    and the time spent running them.
+    '''
+    count, time = 0, 0.0
+    for connection in connections.all():
+        count += getattr(connection, 'query_count', 0)
+        time += getattr(connection, 'query_time', 0.0)
+    return count, time
+
+
+class Timings:
+    '''
+    Time spent serving a request, split into phases.  Time is attributed to
+    the current phase, if any, except for the time spent in the database,
+    which is accounted for separately, so phases don't overlap.  Phases may be
+    entered repeatedly and nested, and time outside of every phase is only
+    counted in the total.
+    '''
+
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+        self.phase = None
+        self.started = self.switched = perf_counter()
+        self.started_queries, self.started_query_time = database_usage()
+        self.switched_query_time = self.started_query_time
+
+    def switch(self, phase):
+        '''
+        Attribute the time since the last switch to the current phase, and make
+        another phase current, or none if None.
+        '''
+
+        now = perf_counter()
+        _, query_time = database_usage()
+        if self.phase is not None:
+            self.durations[self.phase] = (
+                self.durations.get(self.phase, 0.0) +
+                (now - self.switched) -
+                (query_time - self.switched_query_time)
+            )
+        self.phase = phase
+        self.switched = now
+        self.switched_query_time = query_time
+
+    @contextmanager
+    def timing(self, phase):
+        previous = self.phase
+        self.switch(phase)
+        try:
+            yield
+        finally:
+            self.switch(previous)
+
+    def finish(self):
+        '''
+        End timing and return the duration of each phase in seconds, including
+        the database and the total.
+        '''
+        self.switch(None)
+        queries, query_time = database_usage()
+        self.queries = queries - self.started_queries
+        self.durations['database'] = query_time - self.started_query_time
+        self.durations['total'] = perf_counter() - self.started
+        return self.durations
+
+    @property
+    def header(self):
+        '''
+        Server-Timing header value with the durations in milliseconds.
+        '''
+        return ', '.join(
+            f'{phase};dur={duration * 1000:.3f}' + (
+                f';desc="{self.queries} queries"'
+                if phase == 'database'
+                else ''
+            )
+            for phase, duration in self.durations.items()
+        )
+
+
+def get_timings(request):
+    '''
+    Get the timings of a request, or throwaway ones if it isn't being timed.
+    '''
+    timings = getattr(request, 'timings', None)
+    return Timings() if timings is None else timings
+
+
+class Metrics:
+    '''
+    Request latency histograms and counters of a process, which may be shared
+    with other processes through files in a directory.  Samples are keyed by
+    tuples of label name and value pairs.  With a directory, the metrics of
+    the process are saved in the background once every interval while they
+    change.
+    '''
+
+    # Metrics of processes that have exited are merged into this file:
+    archive_name = 'exited.json'
+    lock_name = 'exited.lock'
+
+    def __init__(self, directory=None, interval=timedelta(seconds=1)):
+        self.directory = directory
+        self.interval = interval.total_seconds()
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        # Processes forked from another one start with metrics of their own;
+        # file names are unique even if process identifiers are reused:
+        self.pid = getpid()
+        self.name = f'{self.pid}-{uuid4().hex}.json'
+        self.histograms = {}
+        self.counters = {}
+        self.changed = False
+        self.saving = False
+        self.archived = False
+
+    def record(self, view, method, durations, queries):
+        labels = (
+            ('view', view),
+            ('method', method if method in methods else 'other'),
+        )
+
+        with self.lock:
+            if self.pid != getpid():
+                self.reset()
+
+            for phase, duration in durations.items():
+                key = labels + (('phase', phase), )
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = [
+                        [0] * (len(buckets) + 1),
+                        0.0,
+                    ]
+                histogram[0][bisect_left(buckets, duration)] += 1
+                histogram[1] += duration
+
+            key = ('reviews_database_queries_total', labels)
+            self.counters[key] = self.counters.get(key, 0) + queries
+
+            self.changed = True
+            if self.directory is not None and not self.saving:
+                self.saving = True
+                Thread(
+                    target=self.keep_saving,
+                    args=[self.pid],
+                    daemon=True,
+                ).start()
+
+    def keep_saving(self, pid):
+        while True:
+            sleep(self.interval)
+            with self.lock:
+                if self.pid != pid or self.archived:
+                    return
+                changed = self.changed
+            if changed:
+                self.save()
+
+    def snapshot(self):
+        '''
+        Get the metrics of this process, including counters kept elsewhere.
+        '''
+
+        # Imported here, as views depend on this module:
+        from api.views import response_cache
+        from reviews.backends.postgresql_pool.base import pools, pools_lock
+
+        with self.lock:
+            if self.pid != getpid():
+                self.reset()
+            histograms = {
+                key: [list(counts), total]
+                for key, (counts, total) in self.histograms.items()
+            }
+            counters = dict(self.counters)
+
+        with pools_lock:
+            process_pools = [
+                pool
+                for (pid, _), pool in pools.items()
+                if pid == self.pid
+            ]
+        for event in [
+            'opened', 'reused', 'recycled', 'discarded', 'waits', 'timeouts',
+        ]:
+            counters[
+                ('reviews_database_pool_events_total', (('event', event), ))
+            ] = sum(getattr(pool, event) for pool in process_pools)
+
+        for result, count in [
+            ('hit', response_cache.hits),
+            ('miss', response_cache.misses),
+        ]:
+            counters[
+                ('reviews_response_cache_requests_total', (('result', result), ))
+            ] = count
+
+        return {'histograms': histograms, 'counters': counters}
+
+    def save(self):
+        '''
+        Write the metrics of this process to its file in the directory.
+        '''
+        with self.lock:
+            self.changed = False
+        snapshot = self.snapshot()
+        with self.lock:
+            if not self.archived:
+                write(path.join(self.directory, self.name), snapshot)
+
+    def collect(self):
+        '''
+        Get the metrics of every process sharing the directory, or of this
+        process alone if there's none.
+        '''
+
+        if self.directory is None:
+            return self.snapshot()
+
+        self.save()
+
+        # Files of exited processes are read before the archive they're merged
+        # into, and skipped if they're already merged by then:
+        snapshots = {}
+        for name in listdir(self.directory):
+            if name.endswith('.json') and name != self.archive_name:
+                try:
+                    snapshots[name] = read(path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+        archive = self.read_archive()
+        return merge([archive] + [
+            snapshot
+            for name, snapshot in snapshots.items()
+            if name not in archive['merged']
+        ])
+
+    def read_archive(self):
+        try:
+            return read(path.join(self.directory, self.archive_name))
+        except FileNotFoundError:
+            return {'histograms': {}, 'counters': {}, 'merged': set()}
+
+    def archive(self):
+        '''
+        Merge the metrics of this process into the archive as it exits, and
+        remove its file.
+        '''
+
+        snapshot = self.snapshot()
+        with self.lock:
+            self.archived = True
+
+        with open(path.join(self.directory, self.lock_name), 'w') as lock:
+            flock(lock, LOCK_EX)
+            archive = self.read_archive()
+            merged = merge([archive, snapshot])
+
+            # Names of files already removed can't be read again, so only
+            # those still present need to be remembered:
+            present = set(listdir(self.directory))
+            merged['merged'] = {
+                name
+                for name in archive['merged']
+                if name in present
+            } | {self.name}
+            write(path.join(self.directory, self.archive_name), merged)
+
+        try:
+            unlink(path.join(self.directory, self.name))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        '''
+        Remove the files of every process in the directory.
+        '''
+        for name in listdir(self.directory):
+            if name.endswith('.json') or name.endswith('.tmp'):
+                unlink(path.join(self.directory, name))
+
+
+def merge(snapshots):
+    histograms = {}
+    counters = {}
+    for snapshot in snapshots:
+        for key, (counts, total) in snapshot['histograms'].items():
+            histogram = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+            histogram[1] += total
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+    return {'histograms': histograms, 'counters': counters}
+
+
+# Snapshots are stored in JSON, with keys as lists of lists:
+
+def freeze(key):
+    return tuple(
+        freeze(item) if isinstance(item, list) else item
+        for item in key
+    )
+
+
+def write(filename, snapshot):
+    # Files are replaced at once, so readers never see partial ones:
+    temporary = f'{filename}.tmp'
+    with open(temporary, 'w') as file:
+        dump(
+            {
+                'histograms': list(snapshot['histograms'].items()),
+                'counters': list(snapshot['counters'].items()),
+                'merged': sorted(snapshot.get('merged', ())),
+            },
+            file,
+        )
+    replace(temporary, filename)
+
+
+def read(filename):
+    with open(filename) as file:
+        data = load(file)
+    return {
+        'histograms': {
+            freeze(key): value
+            for key, value in data['histograms']
+        },
+        'counters': {
+            freeze(key): value
+            for key, value in data['counters']
+        },
+        'merged': set(data['merged']),
+    }
+
+
+def exposition(snapshot):
+    '''
+    Format metrics in the Prometheus text exposition format.
+    '''
+
+    lines = []
+
+    def family(name, kind):
+        lines.append(f'# HELP {name} {help_texts[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    name = 'reviews_request_duration_seconds'
+    family(name, 'histogram')
+    for labels, (counts, total) in sorted(snapshot['histograms'].items()):
+        cumulative = 0
+        for bound, count in zip(buckets + (float('inf'), ), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(
+                f'{name}_bucket{format_labels(labels + (("le", le), ))} '
+                f'{cumulative}'
+            )
+        lines.append(f'{name}_sum{format_labels(labels)} {total!r}')
+        lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+
+    counters = sorted(snapshot['counters'].items())
+    for name in sorted({name for (name, _), _ in counters}):
+        family(name, 'counter')
+        for (counter, labels), value in counters:
+            if counter == name:
+                lines.append(f'{name}{format_labels(labels)} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            label,
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for label, value in labels
+    ) + '}'
+
+
+metrics = Metrics(
+    directory=settings.METRICS['DIRECTORY'],
+    interval=settings.METRICS['INTERVAL'],
+)
+
+
+class MetricsMiddleware:
+    '''
+    Time requests, send their timings in a Server-Timing header, and record
+    them in the metrics of their views.  This should come first in middleware
+    chains, so that the total time covers every other middleware.
+    '''
+
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request.timings = Timings()
+        response = self.get_response(request)
+        durations = timings.finish()
+        response['Server-Timing'] = timings.header
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        metrics.record(
+            '' if resolver_match is None else resolver_match.view_name,
+            request.method,
+            durations,
+            timings.queries,
+        )
+        return response
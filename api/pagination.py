@@ -0,0 +1,13 @@
+from rest_framework import pagination
+
+
+class CursorPagination(pagination.CursorPagination):
+    '''
+    Cursor pagination that can also paginate querysets of dictionaries, as
+    produced by QuerySet.values(), as well as model instances.
+    '''
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return str(instance[ordering[0].lstrip('-')])
+        return super()._get_position_from_instance(instance, ordering)
@@ -0,0 +1,79 @@
+from csv import writer
+from io import StringIO
+from itertools import islice
+from json import JSONEncoder
+
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRenderer(BaseRenderer):
+    '''
+    Renderer for formats made of one record per resource, which can also
+    stream a sequence of resource representations of unbounded length as an
+    iterator of encoded chunks of several records each.
+    '''
+
+    chunk_size = 1000
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Single documents, such as error responses, are rendered as a record:
+        return b''.join(self.stream(
+            data if isinstance(data, list) else [data],
+        ))
+
+    def stream(self, items):
+        items = iter(items)
+        first = True
+        while True:
+            chunk = list(islice(items, self.chunk_size))
+            if not chunk:
+                return
+            yield self.encode(chunk, first).encode(self.charset)
+            first = False
+
+    def encode(self, items, first):
+        '''
+        Encode a chunk of records, given whether it's the first one.
+        '''
+        raise NotImplementedError
+
+
+class NDJSONRenderer(StreamingRenderer):
+    '''
+    Newline-delimited JSON: one JSON object per line.  See http://ndjson.org/
+    '''
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    json = JSONEncoder(
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+
+    def encode(self, items, first):
+        return ''.join(
+            self.json.encode(item) + '\n'
+            for item in items
+        )
+
+
+class CSVRenderer(StreamingRenderer):
+    '''
+    Comma-separated values, with a header row taken from the keys of the first
+    record.  See https://tools.ietf.org/html/rfc4180
+    '''
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def encode(self, items, first):
+        buffer = StringIO()
+        csv = writer(buffer)
+        if first:
+            csv.writerow(items[0].keys())
+        csv.writerows(
+            ['' if value is None else value for value in item.values()]
+            for item in items
+        )
+        return buffer.getvalue()
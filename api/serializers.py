@@ -1,14 +1,465 @@
-from rest_framework.serializers import HyperlinkedModelSerializer
+from collections import defaultdict
+from collections.abc import Mapping
+from copy import copy
+from functools import lru_cache
+
+from api.utils.cache import LRUCache
+from django.conf import settings
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ObjectDoesNotExist,
+    ValidationError,
+)
+from django.db.models import Manager, prefetch_related_objects
+from django.db.models.signals import post_delete, post_save
+from django.db.transaction import atomic
+from django.dispatch import receiver
+from django.urls import get_script_prefix, get_urlconf, resolve, Resolver404
+from django.utils.encoding import uri_to_iri
+from django.utils.six.moves.urllib import parse as urlparse
+
+from rest_framework import exceptions
+from rest_framework.permissions import SAFE_METHODS
+
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    HyperlinkedRelatedField,
+)
+
+from rest_framework.serializers import (
+    HyperlinkedModelSerializer,
+    ListSerializer,
+    ModelSerializer,
+    ReadOnlyField,
+)
 
 from reviews.models import (
     Company,
+    CompanyStats,
     Review,
+    ReviewSubmission,
     Reviewer,
     User,
 )
 
 
-class UserSerializer(HyperlinkedModelSerializer):
+# Resolving a URL path only depends on the URL configuration, so the view names
+# and arguments parsed from hyperlinks are memoized:
+@lru_cache(maxsize=4096)
+def resolve_path(path, urlconf=None):
+    try:
+        match = resolve(path, urlconf)
+    except Resolver404:
+        return None
+    return match.view_name, match.args, match.kwargs
+
+
+# Companies and reviewers are shared by all users and referred to by most review
+# submissions, so recently used ones are kept in a small per-process cache.
+# Cached objects are discarded when saved or deleted in this process, and expire
+# after a while to bound staleness caused by changes made by other processes.
+related_object_cache = LRUCache(
+    max_size=settings.RELATED_OBJECT_CACHE['MAX_SIZE'],
+    ttl=settings.RELATED_OBJECT_CACHE['TTL'],
+)
+
+cached_related_models = [
+    Company,
+    Reviewer,
+]
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Reviewer)
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Reviewer)
+def discard_cached_related_object(sender, instance=None, **kwargs):
+    related_object_cache.discard((sender, instance.pk))
+
+
+class RelatedObjectResolver:
+    '''
+    Look up objects referred to by hyperlinks in a request.  Lookups may be
+    deferred, and all pending lookups for a model are resolved with a single
+    query when any one of them is requested.  Objects looked up by primary key
+    are served from the per-process related object cache when possible.
+    '''
+
+    def __init__(self):
+        self.pending = defaultdict(set)
+        self.resolved = defaultdict(dict)
+
+        # Cache keys of objects served from the related object cache:
+        self.cached = set()
+
+    # Resolvers are shared by all serializers used while handling a request:
+    @classmethod
+    def for_context(cls, context):
+        request = context.get('request')
+        if request is None:
+            return context.setdefault('related_object_resolver', cls())
+
+        resolver = getattr(request, 'related_object_resolver', None)
+        if resolver is None:
+            resolver = request.related_object_resolver = cls()
+        return resolver
+
+    def defer(self, queryset, lookup_field, key):
+        group = (queryset.model, lookup_field)
+        if key not in self.resolved[group]:
+            self.pending[group].add(key)
+
+    def get(self, queryset, lookup_field, key):
+        group = (queryset.model, lookup_field)
+        resolved = self.resolved[group]
+
+        if key not in resolved:
+            self.defer(queryset, lookup_field, key)
+            self.resolve(queryset, lookup_field)
+
+        try:
+            return resolved[key]
+        except KeyError:
+            raise queryset.model.DoesNotExist
+
+    def resolve(self, queryset, lookup_field):
+        model = queryset.model
+        group = (model, lookup_field)
+        keys = self.pending.pop(group, set())
+        resolved = self.resolved[group]
+
+        cached = (
+            model in cached_related_models and
+            lookup_field in ('pk', model._meta.pk.name)
+        )
+
+        if cached:
+            for key in list(keys):
+                instance = related_object_cache.get((model, key))
+                if instance is not None:
+                    resolved[key] = copy(instance)
+                    keys.discard(key)
+                    self.cached.add((model, key))
+
+        if not keys:
+            return
+
+        for instance in queryset.filter(**{f'{lookup_field}__in': keys}):
+            resolved[getattr(instance, lookup_field)] = instance
+            if cached:
+                related_object_cache.set((model, instance.pk), copy(instance))
+
+    def discard_cached(self):
+        '''
+        Discard the objects served from the related object cache, e.g. as they
+        may have been deleted by another process, and return whether there
+        were any.
+        '''
+        for key in self.cached:
+            related_object_cache.discard(key)
+        discarded = bool(self.cached)
+        self.cached.clear()
+        return discarded
+
+
+class BatchHyperlinkedRelatedField(HyperlinkedRelatedField):
+    '''
+    Hyperlinked related field that parses hyperlinks with memoized URL
+    resolution and looks up the objects they refer to through the request's
+    RelatedObjectResolver, so that lookups for many objects may be batched.
+    '''
+
+    @property
+    def resolver(self):
+        return RelatedObjectResolver.for_context(self.context)
+
+    @property
+    def expected_view_name(self):
+        request = self.context.get('request', None)
+        try:
+            return request.versioning_scheme.get_versioned_viewname(
+                self.view_name,
+                request,
+            )
+        except AttributeError:
+            return self.view_name
+
+    # Related objects identified by their primary key can be linked to without
+    # fetching them from the database, even if the lookup field isn't named pk:
+    @property
+    def looks_up_pk(self):
+        if self.lookup_field == 'pk':
+            return True
+        queryset = self.get_queryset()
+        return (
+            queryset is not None and
+            self.lookup_field == queryset.model._meta.pk.name
+        )
+
+    def use_pk_only_optimization(self):
+        return self.looks_up_pk
+
+    def get_url(self, obj, view_name, request, format):
+        # Unsaved objects will not yet have a valid URL.
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+        return self.reverse(
+            view_name,
+            kwargs={
+                self.lookup_url_kwarg: (
+                    obj.pk
+                    if self.looks_up_pk
+                    else getattr(obj, self.lookup_field)
+                ),
+            },
+            request=request,
+            format=format,
+        )
+
+    def parse(self, data):
+        '''
+        Parse a hyperlink into the view name and arguments it resolves to, or
+        return None if it doesn't resolve.  This follows the parsing rules of
+        HyperlinkedRelatedField.to_internal_value.
+        '''
+
+        if data.startswith(('http:', 'https:')):
+            data = urlparse.urlparse(data).path
+            prefix = get_script_prefix()
+            if data.startswith(prefix):
+                data = '/' + data[len(prefix):]
+
+        return resolve_path(uri_to_iri(data), get_urlconf())
+
+    # Lookup values parsed from URLs are strings, so they're converted into
+    # values of the same type as the model field that holds them:
+    def lookup_key(self, value):
+        opts = self.get_queryset().model._meta
+        return (
+            opts.pk
+            if self.lookup_field == 'pk'
+            else opts.get_field(self.lookup_field)
+        ).to_python(value)
+
+    def defer(self, data):
+        '''
+        Register a lookup for the object a hyperlink refers to, to be resolved
+        in a batch along with other lookups.  Invalid hyperlinks are ignored
+        here; they're reported when the field is validated.
+        '''
+
+        if not isinstance(data, str):
+            return
+
+        match = self.parse(data)
+        if match is None or match[0] != self.expected_view_name:
+            return
+
+        try:
+            key = self.lookup_key(match[2][self.lookup_url_kwarg])
+        except (KeyError, ValidationError):
+            return
+
+        self.resolver.defer(self.get_queryset(), self.lookup_field, key)
+
+    def to_internal_value(self, data):
+
+        if not isinstance(data, str):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        match = self.parse(data)
+        if match is None:
+            self.fail('no_match')
+
+        view_name, view_args, view_kwargs = match
+        if view_name != self.expected_view_name:
+            self.fail('incorrect_match')
+
+        try:
+            return self.get_object(view_name, view_args, view_kwargs)
+        except (ObjectDoesNotExist, TypeError, ValueError):
+            self.fail('does_not_exist')
+
+    def get_object(self, view_name, view_args, view_kwargs):
+        try:
+            key = self.lookup_key(view_kwargs[self.lookup_url_kwarg])
+        except ValidationError:
+            raise ObjectDoesNotExist
+        return self.resolver.get(self.get_queryset(), self.lookup_field, key)
+
+
+class BatchListSerializer(ListSerializer):
+    '''
+    List serializer that fetches objects related to a batch of items through
+    hyperlinks with a single query per related model, and creates new objects
+    with a single bulk insertion.  Note that this bypasses the model's save
+    method and its pre_save and post_save signals; these are the
+    responsibility of the after_bulk_create hook.
+    '''
+
+    @property
+    def related_fields(self):
+        return [
+            field
+            for field in self.child.fields.values()
+            if isinstance(field, BatchHyperlinkedRelatedField)
+        ]
+
+    def to_internal_value(self, data):
+
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, Mapping)]
+            for field in self.related_fields:
+                if not field.read_only:
+                    for item in items:
+                        if field.field_name in item:
+                            field.defer(item[field.field_name])
+
+        return super().to_internal_value(data)
+
+    def to_representation(self, data):
+
+        instances = list(data.all() if isinstance(data, Manager) else data)
+
+        prefetch_related_objects(
+            instances,
+            *(
+                field.source
+                for field in self.related_fields
+                if not field.use_pk_only_optimization()
+            )
+        )
+
+        return super().to_representation(instances)
+
+    @atomic
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = model.objects.bulk_create([
+            model(**attrs)
+            for attrs in validated_data
+        ])
+        self.after_bulk_create(instances)
+        return instances
+
+    def after_bulk_create(self, instances):
+        pass
+
+
+class SparseFieldsetMixin:
+    '''
+    Narrow the representations produced by a model serializer to the fields
+    named in the fields query parameter, and leave out those named in the
+    exclude query parameter, both given as comma-separated lists; e.g.
+    /v1/review?fields=self,title,rating.  Requests naming unknown fields are
+    rejected.  This only applies to reads, so submissions are validated with
+    every field regardless.  The model fields read by the remaining fields are
+    given by sparse_columns, so that views may avoid loading any others.
+    '''
+
+    sparse_parameters = ('fields', 'exclude')
+
+    @classmethod
+    def get_sparse_fieldset(cls, request):
+        '''
+        Get the sets of field names requested with the fields and exclude query
+        parameters, or None for either of them if absent.
+        '''
+
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+
+        # Exports are serialized with plain Django requests, which lack the
+        # query_params alias of REST framework requests:
+        query = request.GET
+        return tuple(
+            set(filter(None, query[parameter].split(',')))
+            if query.get(parameter)
+            else None
+            for parameter in cls.sparse_parameters
+        )
+
+    @classmethod
+    def selects(cls, request, name):
+        '''
+        Tell whether a field is left in representations by a request.
+        '''
+        fields, exclude = cls.get_sparse_fieldset(request)
+        return (
+            (fields is None or name in fields) and
+            (exclude is None or name not in exclude)
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        fieldset = self.get_sparse_fieldset(request)
+        self.sparse = fieldset != (None, None)
+        if not self.sparse:
+            return fields
+
+        readable = {
+            name
+            for name, field in fields.items()
+            if not field.write_only
+        }
+        errors = {
+            parameter: [
+                f'Unknown field: {name}'
+                for name in sorted((names or set()) - readable)
+            ]
+            for parameter, names in zip(self.sparse_parameters, fieldset)
+        }
+        if any(errors.values()):
+            raise exceptions.ValidationError({
+                parameter: messages
+                for parameter, messages in errors.items()
+                if messages
+            })
+
+        for name in list(fields):
+            if name in readable and not self.selects(request, name):
+                del fields[name]
+        return fields
+
+    @property
+    def sparse_columns(self):
+        '''
+        Get the names of the model fields read by a narrowed representation, or
+        None if representations aren't narrowed or they need more than model
+        fields of their own, such as nested objects.
+        '''
+
+        fields = self.fields
+        if not self.sparse:
+            return None
+
+        opts = self.Meta.model._meta
+        columns = []
+        for field in fields.values():
+            if field.write_only:
+                continue
+
+            source = (
+                field.lookup_field
+                if isinstance(field, HyperlinkedIdentityField)
+                else field.source
+            )
+            if source == 'pk':
+                source = opts.pk.name
+
+            try:
+                model_field = opts.get_field(source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete:
+                return None
+            columns.append(source)
+
+        return columns
+
+
+class UserSerializer(SparseFieldsetMixin, HyperlinkedModelSerializer):
 
     class Meta:
 
@@ -51,12 +502,47 @@ class UserSerializer(HyperlinkedModelSerializer):
         return user
 
 
-class CompanySerializer(HyperlinkedModelSerializer):
+class CompanyStatsSerializer(ModelSerializer):
+
+    average = ReadOnlyField()
+    histogram = ReadOnlyField()
+
+    class Meta:
+
+        model = CompanyStats
+
+        fields = [
+            'count',
+            'average',
+            'histogram',
+            'last_review',
+        ]
+
+        read_only_fields = fields
+
+
+class CompanySerializer(SparseFieldsetMixin, HyperlinkedModelSerializer):
+
+    # Company statistics are only embedded in company representations on
+    # request; see CompanyViewSet.
+    embed_parameter = 'embed'
+
+    stats = CompanyStatsSerializer(
+        read_only=True,
+    )
 
     class Meta:
 
         model = Company
-        fields = '__all__'
+
+        fields = [
+            'self',
+            'created',
+            'modified',
+            'name',
+            'url',
+            'stats',
+        ]
 
         # These fields are determined automatically and should be rejected in
         # object creation requests.
@@ -65,8 +551,21 @@ class CompanySerializer(HyperlinkedModelSerializer):
             'modified',
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.embeds_stats(self.context.get('request')):
+            fields.pop('stats', None)
+        return fields
+
+    # Statistics are embedded on request unless left out of a sparse fieldset:
+    @classmethod
+    def embeds_stats(cls, request):
+        return request is not None and 'stats' in (
+            request.query_params.get(cls.embed_parameter, '').split(',')
+        ) and cls.selects(request, 'stats')
+
 
-class ReviewerSerializer(HyperlinkedModelSerializer):
+class ReviewerSerializer(SparseFieldsetMixin, HyperlinkedModelSerializer):
 
     class Meta:
 
@@ -96,12 +595,31 @@ class ReviewerSerializer(HyperlinkedModelSerializer):
         }
 
 
-class ReviewSerializer(HyperlinkedModelSerializer):
+class ReviewListSerializer(BatchListSerializer):
+
+    # Bulk insertion emits no signals, so company statistics are updated here:
+    def after_bulk_create(self, instances):
+        CompanyStats.add(
+            instance.stats_key
+            for instance in instances
+        )
+        for instance in instances:
+            instance._stats_key = instance.stats_key
+
+
+class ReviewSerializer(SparseFieldsetMixin, HyperlinkedModelSerializer):
+
+    serializer_related_field = BatchHyperlinkedRelatedField
 
     class Meta:
 
         model = Review
-        fields = '__all__'
+
+        # Search documents are only used internally for full-text search:
+        exclude = ['search']
+
+        # Allow submission of many reviews at once in a single request:
+        list_serializer_class = ReviewListSerializer
 
         # These fields are determined automatically and should be rejected in
         # object creation requests.
@@ -123,3 +641,36 @@ class ReviewSerializer(HyperlinkedModelSerializer):
                 'lookup_field': 'username',
             },
         }
+
+
+class ReviewSubmissionSerializer(HyperlinkedModelSerializer):
+
+    serializer_related_field = BatchHyperlinkedRelatedField
+
+    # Submissions are pending until stored as reviews, which are then linked:
+    status = ReadOnlyField()
+
+    class Meta:
+
+        model = ReviewSubmission
+
+        # Fetch the submitters of a page of submissions with a single query:
+        list_serializer_class = BatchListSerializer
+
+        fields = [
+            'self',
+            'created',
+            'modified',
+            'submitter',
+            'status',
+            'review',
+        ]
+
+        read_only_fields = fields
+
+        extra_kwargs = {
+            'submitter': {
+                # Users are looked up by username, not by their ID number.
+                'lookup_field': 'username',
+            },
+        }
@@ -1,5 +1,8 @@
 from hypothesis.strategies import (
     builds,
+    characters,
+    fixed_dictionaries,
+    integers,
     lists,
     one_of,
     text,
@@ -98,3 +101,39 @@ emails = builds(
     ),
     domains,
 ).filter(lambda email: len(email) < 254)
+
+
+# Free-form text of a bounded length, stripped of surrounding whitespace as
+# Django REST Framework character fields do, and without control characters or
+# surrogates, which can't be stored or encoded:
+def texts(min_size=1, max_size=None):
+    return (
+        text(
+            alphabet=characters(blacklist_categories=('Cc', 'Cs')),
+            min_size=min_size,
+            max_size=max_size,
+        )
+        .map(str.strip)
+        .filter(lambda string: len(string) >= min_size)
+    )
+
+
+# Company names:
+company_names = texts(max_size=64)
+
+
+# Reviewer names:
+reviewer_names = texts(max_size=256)
+
+
+# Review ratings, from one to five stars:
+ratings = integers(min_value=1, max_value=5)
+
+
+# Review attributes other than their company and reviewer, as submitted to the
+# API:
+reviews = fixed_dictionaries({
+    'rating': ratings,
+    'title': texts(max_size=64),
+    'summary': texts(max_size=10000),
+})
@@ -1,24 +1,61 @@
-from django.test import LiveServerTestCase
+from api.handlers import WSGIHandler
+from api.utils.cache import clear_caches
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import override_settings
+from functools import lru_cache
+from gabbi import json_parser
 from gabbi.handlers import RESPONSE_HANDLERS
 from gabbi.suitemaker import test_suite_from_dict
 from gabbi.reporter import ConciseTestRunner
-from hypothesis.extra.django import TransactionTestCase
+from hypothesis.extra.django import TestCase
 from io import StringIO
 from unittest import defaultTestLoader
 
 
+# Gabbi parses JSONPath expressions with a parser that builds its parsing tables
+# anew for every expression, which takes longer than serving the requests they
+# check.  Parsed expressions are never modified, so they're memoized:
+json_parser.parse = lru_cache(maxsize=None)(json_parser.parse)
+
+
 # Adapted from https://github.com/wildfish/gabbi-hypothesis-demo/blob/b4a15168895cac09342f2ae9d6b2c592332710ea/app/test_case.py  # noqa
-class GabbiHypothesisTestCase(LiveServerTestCase, TransactionTestCase):
+@override_settings(
+    # Passwords are hashed with a fast, insecure hasher; the passwords of users
+    # in fixtures are stored likewise:
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class GabbiHypothesisTestCase(TestCase):
     '''
     Base test class case to handle running Gabbi tests along with Hypothesis in
     Django applications.
+
+    Gabbi requests are served in-process: they're intercepted before reaching
+    the network and passed to the application's WSGI handler in the thread of
+    the test, so they share its database connection.  Fixtures are loaded once
+    for each test case class, and each Hypothesis example runs in a savepoint
+    that's rolled back when it finishes, so examples don't need to commit their
+    data nor clean up after themselves.
     '''
 
-    def run_gabbi(self, gabbi_declaration):
+    # Intercepted requests are addressed to this host name, which is never
+    # resolved:
+    host = 'testserver'
+    port = 80
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.application = WSGIHandler()
 
-        # Take only the host name and port from the live server:
-        _, authority = self.live_server_url.split('://')
-        host, port = authority.split(':')
+    def teardown_example(self, example):
+        super().teardown_example(example)
+
+        # Rolling back the data of an example sends no signals, so entries for
+        # its objects must be removed from per-process caches by hand:
+        clear_caches()
+
+    def run_gabbi(self, gabbi_declaration):
 
         # Use Gabbi to create the test suite from our declaration:
         suite = test_suite_from_dict(
@@ -26,24 +63,34 @@ class GabbiHypothesisTestCase(LiveServerTestCase, TransactionTestCase):
             test_base_name=self.id(),
             suite_dict=gabbi_declaration,
             test_directory='.',
-            host=host,
-            port=port,
+            host=self.host,
+            port=self.port,
             fixture_module=None,
-            intercept=None,
+            intercept=lambda: self.application,
             handlers=[
                 handler()
                 for handler in RESPONSE_HANDLERS
             ],
         )
 
+        # Requests are served with the database connection of the test, which
+        # must stay open across requests to keep the test transaction, as the
+        # Django test client does:
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+
         # Run the test.  We store the the output into a custom stream so that
         # Hypothesis can display only the simple case test result on failure
         # rather than every failing case:
         s = StringIO()
-        result = ConciseTestRunner(
-            stream=s,
-            verbosity=0,
-        ).run(suite)
+        try:
+            result = ConciseTestRunner(
+                stream=s,
+                verbosity=0,
+            ).run(suite)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
 
         # If we weren't successful we need to fail the test case with the error
         # string from Gabbi:
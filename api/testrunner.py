@@ -0,0 +1,45 @@
+from django.test import runner
+
+
+class RemoteTestResult(runner.RemoteTestResult):
+    '''
+    Result of tests run in a worker process of the parallel test runner.  The
+    Django runner rejects subtests altogether; here, failing subtests are
+    reported as failures or errors of their test, and passing subtests are
+    ignored, as the runner of the unittest module does.
+    '''
+
+    def addSubTest(self, test, subtest, err):
+        if err is None:
+            return
+        if issubclass(err[0], test.failureException):
+            self.addFailure(test, err)
+        else:
+            self.addError(test, err)
+
+
+def run_subsuite(args):
+    '''
+    Run a suite of tests in a worker process and return the events of its
+    result, like django.test.runner._run_subsuite.
+    '''
+    subsuite_index, subsuite, failfast = args
+    result = runner.RemoteTestRunner(
+        failfast=failfast,
+        resultclass=RemoteTestResult,
+    ).run(subsuite)
+    return subsuite_index, result.events
+
+
+class ParallelTestSuite(runner.ParallelTestSuite):
+    run_subsuite = run_subsuite
+
+
+class TestRunner(runner.DiscoverRunner):
+    '''
+    Test runner that supports subtests when running test cases in parallel
+    worker processes with the --parallel option, each with a database of its
+    own cloned from the test database.
+    '''
+
+    parallel_test_suite = ParallelTestSuite
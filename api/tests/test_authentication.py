@@ -0,0 +1,321 @@
+from json import dumps
+from os import environ
+from runpy import run_module
+from time import monotonic
+from unittest.mock import patch
+
+from api.authentication import (
+    CachedBasicAuthentication,
+    CachedTokenAuthentication,
+    TokenUser,
+    basic_credentials_cache,
+    get_user,
+    jwt_payload_handler,
+    token_cache,
+)
+
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_jwt.settings import api_settings
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class BasicAuthenticationTestSuite(TestCase):
+
+    password = 'xyzzy'
+
+    def setUp(self):
+        basic_credentials_cache.clear()
+        self.user = self.create_user('test_authentication')
+        self.authentication = CachedBasicAuthentication()
+
+    def create_user(self, username):
+        user = User(username=username)
+        user.set_password(self.password)
+        user.save()
+        return user
+
+    def authenticate(self, user=None, password=password):
+        '''
+        Authenticate a user with a password, and return the authenticated user
+        and whether the credentials were found in the cache.
+        '''
+        user = user or self.user
+        hits = basic_credentials_cache.hits
+        authenticated, _ = self.authentication.authenticate_credentials(
+            user.username,
+            password,
+        )
+        return authenticated, basic_credentials_cache.hits > hits
+
+    def cached(self, user=None):
+        return basic_credentials_cache.get(
+            CachedBasicAuthentication.credentials_digest(
+                (user or self.user).username,
+                self.password,
+            ),
+        ) is not None
+
+    def test_cached_credentials(self):
+        user, hit = self.authenticate()
+        self.assertFalse(hit)
+        self.assertEqual(user, self.user)
+
+        with self.assertNumQueries(0):
+            user, hit = self.authenticate()
+        self.assertTrue(hit)
+        self.assertEqual(user, self.user)
+
+        # Wrong passwords don't match the cached credentials, nor are they
+        # cached themselves:
+        for attempt in range(2):
+            with self.subTest(attempt=attempt):
+                with self.assertRaises(AuthenticationFailed):
+                    self.authenticate(password='plugh')
+        self.assertEqual(len(basic_credentials_cache), 1)
+
+    def test_eviction(self):
+        other = self.create_user('test_authentication_other')
+
+        with patch.object(basic_credentials_cache, 'max_size', 1):
+            self.authenticate()
+            self.authenticate(other)
+            self.assertFalse(self.cached())
+            self.assertTrue(self.cached(other))
+
+        # Credentials expire after the configured time to live:
+        with patch(
+            'api.utils.cache.monotonic',
+            return_value=monotonic() + basic_credentials_cache.ttl,
+        ):
+            self.assertFalse(self.cached(other))
+
+    def test_discarded_credentials(self):
+        for description, change in [
+            ('password', lambda user: (
+                user.set_password('plugh'),
+                user.save(),
+            )),
+            ('is_active', lambda user: (
+                setattr(user, 'is_active', False),
+                user.save(update_fields=['is_active']),
+            )),
+            ('is_staff', lambda user: (
+                setattr(user, 'is_staff', True),
+                user.save(),
+            )),
+            ('delete', lambda user: user.delete()),
+        ]:
+            with self.subTest(change=description):
+                user = self.create_user(f'test_authentication_{description}')
+                self.authenticate(user)
+                self.assertTrue(self.cached(user))
+                change(user)
+                self.assertFalse(self.cached(user))
+
+        # Logging in only updates the last login time, which doesn't affect
+        # authentication:
+        self.authenticate()
+        update_last_login(None, self.user)
+        self.assertTrue(self.cached())
+        _, hit = self.authenticate()
+        self.assertTrue(hit)
+
+
+class TokenAuthenticationTestSuite(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create(
+            username='test_authentication',
+        )
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self, key=None):
+        '''
+        Authenticate a token key, by default the user's current one, and return
+        the authenticated user and whether the token was found in the cache.
+        '''
+        hits = token_cache.hits
+        user, _ = self.authentication.authenticate_credentials(
+            key or Token.objects.get(user=self.user).key,
+        )
+        return user, token_cache.hits > hits
+
+    def test_cached_tokens(self):
+        user, hit = self.authenticate()
+        self.assertFalse(hit)
+        self.assertEqual(user, self.user)
+
+        key = self.user.auth_token.key
+        with self.assertNumQueries(0):
+            user, hit = self.authenticate(key)
+        self.assertTrue(hit)
+        self.assertEqual(user, self.user)
+
+    def test_revoked_tokens(self):
+        key = self.user.auth_token.key
+        self.authenticate(key)
+
+        # Deleted tokens stop authenticating right away:
+        Token.objects.get(key=key).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+
+        # Regenerated tokens replace the previous ones:
+        key = Token.objects.create(user=self.user).key
+        self.authenticate(key)
+        Token.objects.get(key=key).delete()
+        replacement = Token.objects.create(user=self.user)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+        _, hit = self.authenticate(replacement.key)
+        self.assertFalse(hit)
+
+        # Deactivated users stop authenticating right away too:
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(replacement.key)
+
+    def test_ttl(self):
+        self.assertEqual(
+            token_cache.ttl,
+            settings.AUTHENTICATION_CACHE['TOKEN_TTL'].total_seconds(),
+        )
+
+        with patch.dict(environ, {
+            'BASIC_AUTH_CACHE_TTL': '30',
+            'TOKEN_AUTH_CACHE_TTL': '60',
+        }):
+            cache_settings = run_module('reviews.settings')[
+                'AUTHENTICATION_CACHE'
+            ]
+        self.assertEqual(cache_settings['BASIC_TTL'].total_seconds(), 30)
+        self.assertEqual(cache_settings['TOKEN_TTL'].total_seconds(), 60)
+
+        # Tokens expire after the configured time to live:
+        key = self.user.auth_token.key
+        self.authenticate(key)
+        with patch(
+            'api.utils.cache.monotonic',
+            return_value=monotonic() + token_cache.ttl,
+        ):
+            _, hit = self.authenticate(key)
+        self.assertFalse(hit)
+
+
+@override_settings(
+    JWT_USER_CLAIMS=True,
+)
+class ClaimsJSONWebTokenTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_authentication',
+            email='test_authentication@example.com',
+        )
+        self.staff = User.objects.create(
+            username='test_authentication_staff',
+            is_staff=True,
+        )
+
+    def token(self, user):
+        return api_settings.JWT_ENCODE_HANDLER(jwt_payload_handler(user))
+
+    def request(self, method, url, token, status, **kwargs):
+        response = getattr(self.client, method)(
+            url,
+            HTTP_ACCEPT='application/json',
+            HTTP_AUTHORIZATION=f'JWT {token}',
+            **kwargs
+        )
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def test_token_user(self):
+        with self.assertNumQueries(0):
+            user = TokenUser(jwt_payload_handler(self.user))
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.username, self.user.username)
+            self.assertFalse(user.is_staff)
+            self.assertTrue(user.is_authenticated)
+            self.assertFalse(user.is_anonymous)
+            self.assertEqual(user, self.user)
+            staff = TokenUser(jwt_payload_handler(self.staff))
+            self.assertTrue(staff.is_staff)
+
+        # Attributes missing from the claims are read from the User, which is
+        # loaded once:
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+            self.assertEqual(user.date_joined, self.user.date_joined)
+
+        self.assertIsInstance(get_user(user), User)
+        self.assertEqual(get_user(user).pk, self.user.pk)
+        self.assertIs(get_user(self.user), self.user)
+
+        payload = jwt_payload_handler(self.user)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            TokenUser(payload).email
+
+    def test_claims(self):
+        company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        token = self.token(self.user)
+        self.request(
+            'post',
+            reverse(f'{self.version}:review-list'),
+            token,
+            201,
+            data=dumps({
+                'company': reverse(
+                    f'{self.version}:company-detail',
+                    args=[company.pk],
+                ),
+                'reviewer': reverse(
+                    f'{self.version}:reviewer-detail',
+                    args=[reviewer.email],
+                ),
+                'rating': 5,
+                'title': 'Great',
+            }),
+            content_type='application/json',
+            HTTP_X_FORWARDED_FOR='192.0.2.1',
+        )
+        self.assertEqual(Review.objects.get().submitter, self.user)
+
+        # Regular users are served from their claims, so they keep reading
+        # until their tokens expire:
+        self.request('get', '/metrics', token, 403)
+        self.user.is_active = False
+        self.user.save()
+        self.request('get', reverse(f'{self.version}:review-list'), token, 200)
+
+    def test_staff_claims(self):
+        # Administrator status is checked against the database, so revoking it
+        # or deleting the user applies right away:
+        token = self.token(self.staff)
+        self.request('get', '/metrics', token, 200)
+        self.staff.is_staff = False
+        self.staff.save()
+        self.request('get', '/metrics', token, 403)
+        self.staff.delete()
+        self.request('get', '/metrics', token, 401)
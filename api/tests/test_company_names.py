@@ -0,0 +1,85 @@
+from api.utils.database import has_extension
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    User,
+)
+
+
+class CompanyNameTestSuite(TestCase):
+
+    version = 'v1'
+
+    names = [
+        'ACME, Inc.',
+        'Acme Corporation',
+        'acmeology',
+        'Acne Studios',
+        'Initech',
+        'Zeta',
+    ]
+
+    def setUp(self):
+        self.companies = {
+            name: Company.objects.create(name=name)
+            for name in self.names
+        }
+        self.client.force_login(User.objects.create(
+            username='test_company_names',
+        ))
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def autocomplete(self, prefix):
+        return self.get(
+            reverse(f'{self.version}:company-autocomplete') +
+            f'?prefix={prefix}',
+        )
+
+    def test_name_lookup(self):
+        page = self.get(reverse(f'{self.version}:company-list') + '?name=acme')
+        self.assertLessEqual(
+            {'ACME, Inc.', 'Acme Corporation', 'acmeology'},
+            {company['name'] for company in page['results']},
+        )
+        self.assertNotIn(
+            'Initech',
+            {company['name'] for company in page['results']},
+        )
+
+    def test_autocomplete(self):
+        suggestions = self.autocomplete('acm')
+        self.assertEqual(
+            [company['name'] for company in suggestions[:3]],
+            ['Acme Corporation', 'ACME, Inc.', 'acmeology'],
+        )
+
+        # Suggestions must be compact and link to companies:
+        for company in suggestions:
+            self.assertEqual(set(company), {'self', 'name'})
+            self.assertEqual(self.get(company['self'])['name'], company['name'])
+
+        self.assertEqual(self.autocomplete(''), [])
+        self.assertEqual(
+            [company['name'] for company in self.autocomplete('init')],
+            ['Initech'],
+        )
+
+    def test_autocomplete_size(self):
+        for index in range(20):
+            Company.objects.create(name=f'Initech {index}')
+        self.assertEqual(len(self.autocomplete('init')), 10)
+
+    def test_similar_names(self):
+        if not has_extension('pg_trgm'):
+            self.skipTest('Trigram matching is not available')
+
+        self.assertIn(
+            'Initech',
+            [company['name'] for company in self.autocomplete('initek')],
+        )
@@ -0,0 +1,268 @@
+from io import StringIO
+
+from api.testcase import GabbiHypothesisTestCase
+from api.utils.database import load_fixtures
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from hypothesis import (
+    Verbosity,
+    given,
+    settings,
+)
+
+from hypothesis.strategies import (
+    integers,
+    lists,
+)
+
+from requests.auth import _basic_auth_str
+
+from reviews.models import (
+    Company,
+    CompanyStats,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class CompanyStatsTestSuite(GabbiHypothesisTestCase):
+
+    version = 'v1'
+
+    # Users with known passwords:
+    @classmethod
+    def setUpTestData(cls):
+        load_fixtures('test_nonadmin')
+
+    @given(
+        ratings=lists(
+            integers(min_value=1, max_value=5),
+            max_size=5,
+        ),
+    )
+    @settings(
+        max_examples=10,
+        verbosity=Verbosity.verbose,
+    )
+    def test_company_stats(self, ratings):
+
+        auth_string = _basic_auth_str(
+            username='test_nonadmin',
+            password='xyzzy',
+        )
+
+        self.run_gabbi(
+            {
+                'defaults': {
+                    'request_headers': {
+                        'content-type': 'application/json',
+                        'authorization': auth_string,
+                    },
+                },
+                'tests': [
+
+                    {
+                        'name': 'create company',
+                        'url': reverse(self.version + ':company-list'),
+                        'method': 'POST',
+                        'data': {
+                            'name': 'ACME, Inc.',
+                        },
+                        'status': 201,
+                    },
+
+                    {
+                        'name': 'create reviewer',
+                        'url': reverse(self.version + ':reviewer-list'),
+                        'method': 'POST',
+                        'data': {
+                            'email': 'john.doe@example.com',
+                        },
+                        'status': 201,
+                    },
+
+                    # Submit a review with each rating:
+                    *(
+                        {
+                            'name': f'submit review {index}',
+                            'url': reverse(self.version + ':review-list'),
+                            'method': 'POST',
+                            'data': {
+                                # Double quotes would be escaped in the JSON
+                                # request entity, which breaks substitution:
+                                'company': (
+                                    "$HISTORY['create company'].$LOCATION"
+                                ),
+                                'reviewer': (
+                                    "$HISTORY['create reviewer'].$LOCATION"
+                                ),
+                                'rating': rating,
+                            },
+                            'status': 201,
+                        }
+                        for index, rating in enumerate(ratings)
+                    ),
+
+                    # Move the first review, if any, to a different rating:
+                    *(
+                        {
+                            'name': 'update review',
+                            'url': '$HISTORY["submit review 0"].$LOCATION',
+                            'method': 'PATCH',
+                            'data': {
+                                'rating': 6 - ratings[0],
+                            },
+                            'status': 200,
+                        }
+                        for _ in ratings[:1]
+                    ),
+
+                    # Delete the last review, if any:
+                    *(
+                        {
+                            'name': 'delete review',
+                            'url': (
+                                f'$HISTORY["submit review {len(ratings) - 1}"]'
+                                '.$LOCATION'
+                            ),
+                            'method': 'DELETE',
+                            'status': 204,
+                        }
+                        for _ in ratings[-1:]
+                    ),
+
+                    {
+                        'name': 'fetch company stats',
+                        'url': '$HISTORY["create company"].$LOCATION/stats',
+                        'status': 200,
+                        'response_json_paths': {
+                            '$.count': len(self.expected(ratings)),
+                            '$.histogram': {
+                                str(rating): self.expected(ratings).count(
+                                    rating,
+                                )
+                                for rating in range(1, 6)
+                            },
+                        },
+                    },
+
+                    {
+                        'name': 'fetch company with embedded stats',
+                        'url': '$HISTORY["create company"].$LOCATION',
+                        'query_parameters': {
+                            'embed': 'stats',
+                        },
+                        'status': 200,
+                        'response_json_paths': {
+                            '$.stats.count': len(self.expected(ratings)),
+                        },
+                    },
+
+                ],
+            },
+        )
+
+    # The ratings that should remain after the updates and deletions above:
+    @staticmethod
+    def expected(ratings):
+        return ([6 - ratings[0]] + ratings[1:])[:-1] if ratings else []
+
+
+class MissingCompanyStatsTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_missing_company_stats',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        self.client.force_login(self.user)
+
+    # Companies may lack statistics, e.g. if they were inserted in bulk:
+    def create_company(self, name):
+        company = Company.objects.create(name=name)
+        CompanyStats.objects.filter(company=company).delete()
+        return company
+
+    def submit_review(self, company, rating):
+        return Review.objects.create(
+            submitter=self.user,
+            company=company,
+            reviewer=self.reviewer,
+            rating=rating,
+            ip_address='192.0.2.1',
+        )
+
+    def test_created_on_review(self):
+        company = self.create_company('ACME, Inc.')
+        self.submit_review(company, 4)
+        self.submit_review(company, 2)
+
+        stats = CompanyStats.objects.get(company=company)
+        self.assertEqual((stats.count, stats.total), (2, 6))
+        self.assertEqual(stats.histogram['4'], 1)
+
+    def test_created_on_request(self):
+        company = self.create_company('ACME, Inc.')
+        self.submit_review(company, 4)
+        CompanyStats.objects.filter(company=company).delete()
+
+        url = reverse(f'{self.version}:company-detail', args=[company.pk])
+        for path, stats in [
+            (f'{url}/stats', lambda data: data),
+            (f'{url}?embed=stats', lambda data: data['stats']),
+        ]:
+            with self.subTest(path=path):
+                CompanyStats.objects.filter(company=company).delete()
+                response = self.client.get(path, HTTP_ACCEPT='application/json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(stats(response.json())['count'], 1)
+
+    def test_create_missing(self):
+        companies = [
+            self.create_company(f'Company {index}')
+            for index in range(3)
+        ]
+        self.submit_review(companies[0], 5)
+        CompanyStats.objects.filter(company=companies[0]).delete()
+
+        self.assertEqual(
+            CompanyStats.create_missing(),
+            {company.pk for company in companies},
+        )
+        self.assertEqual(
+            CompanyStats.objects.get(company=companies[0]).count,
+            1,
+        )
+        self.assertEqual(CompanyStats.create_missing(), set())
+
+    def test_rebuild(self):
+        companies = [
+            self.create_company(f'Company {index}')
+            for index in range(2)
+        ]
+        self.submit_review(companies[0], 5)
+        self.submit_review(companies[0], 3)
+
+        # Statistics may drift from the reviews, e.g. if reviews are modified
+        # directly in the database:
+        CompanyStats.objects.update(count=10, total=0, rating_5=0)
+
+        stdout = StringIO()
+        call_command('rebuild_company_stats', stdout=stdout)
+        self.assertIn('for 2 companies', stdout.getvalue())
+
+        first, second = (
+            CompanyStats.objects.get(company=company)
+            for company in companies
+        )
+        self.assertEqual((first.count, first.total), (2, 8))
+        self.assertEqual((first.rating_3, first.rating_5), (1, 1))
+        self.assertEqual(first.last_review, Review.objects.latest().created)
+        self.assertEqual((second.count, second.total), (0, 0))
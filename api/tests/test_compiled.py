@@ -0,0 +1,108 @@
+from api.strategies import emails
+from django.test import override_settings
+from django.urls import reverse
+
+from hypothesis import (
+    HealthCheck,
+    given,
+    settings,
+)
+
+from hypothesis.extra.django import TestCase
+
+from hypothesis.strategies import (
+    integers,
+    lists,
+    text,
+    tuples,
+)
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+# PostgreSQL can't store NUL characters in text columns:
+texts = text().filter(lambda value: '\x00' not in value)
+
+
+# Reviewer URLs can't represent e-mail addresses with slashes or question marks
+# in them; see ReviewerViewSet.lookup_value_regex:
+reviewer_emails = emails.filter(
+    lambda email: '/' not in email and '?' not in email,
+)
+
+
+# Compare freshly generated responses rather than cached ones:
+@override_settings(
+    RESPONSE_CACHE={
+        'ALIAS': 'responses',
+        'ENABLED': False,
+    },
+)
+class CompiledSerializerTestSuite(TestCase):
+
+    version = 'v1'
+
+    @given(
+        reviews=lists(
+            tuples(
+                integers(min_value=1, max_value=5),
+                texts.map(lambda value: value[:Review.title_max_length]),
+                texts,
+                reviewer_emails,
+            ),
+            max_size=15,
+        ),
+    )
+    # Generating e-mail addresses of any valid length, and dropping those with
+    # characters reviewer URLs can't hold, is slower than the health check
+    # allows for lists of them, so only that check is suppressed:
+    @settings(
+        max_examples=10,
+        suppress_health_check=[HealthCheck.too_slow],
+    )
+    def test_compiled_lists_match(self, reviews):
+
+        user = User.objects.create(
+            username='test_compiled',
+            is_staff=True,
+        )
+
+        company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+
+        for rating, title, summary, email in reviews:
+            Review.objects.create(
+                submitter=user,
+                company=company,
+                reviewer=Reviewer.objects.get_or_create(email=email)[0],
+                rating=rating,
+                title=title,
+                summary=summary,
+                ip_address='192.0.2.1',
+            )
+
+        self.client.force_login(user)
+
+        for resource in ['company', 'reviewer', 'review']:
+            url = reverse(f'{self.version}:{resource}-list')
+
+            # Follow every page of the list with both serializers:
+            while url:
+                pages = []
+                for compiled in [False, True]:
+                    with override_settings(COMPILED_SERIALIZERS=compiled):
+                        pages.append(self.client.get(
+                            url,
+                            HTTP_ACCEPT='application/json',
+                        ))
+
+                regular, compiled = pages
+                self.assertEqual(regular.status_code, 200)
+                self.assertEqual(regular.content, compiled.content)
+                url = regular.json()['next']
@@ -0,0 +1,109 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class ConditionalGetTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_conditional',
+            is_staff=True,
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        self.review = self.submit_review()
+        self.client.force_login(self.user)
+
+    def submit_review(self):
+        return Review.objects.create(
+            submitter=self.user,
+            company=self.company,
+            reviewer=self.reviewer,
+            rating=5,
+            ip_address='192.0.2.1',
+        )
+
+    def get(self, url, **headers):
+        return self.client.get(url, HTTP_ACCEPT='application/json', **headers)
+
+    def assertRevalidates(self, url, change, last_modified=True):
+        '''
+        Check that a resource is not sent again until it changes.
+        '''
+
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+        # Lists are only validated by their ETag:
+        response = self.get(url)
+        self.assertEqual(response.has_header('Last-Modified'), last_modified)
+        if last_modified:
+            response = self.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            )
+            self.assertEqual(response.status_code, 304)
+
+        change()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_conditional_detail(self):
+        for resource, lookup, instance in [
+            ('user', 'username', self.user),
+            ('company', 'pk', self.company),
+            ('reviewer', 'email', self.reviewer),
+            ('review', 'pk', self.review),
+        ]:
+            with self.subTest(resource=resource):
+                self.assertRevalidates(
+                    reverse(
+                        f'{self.version}:{resource}-detail',
+                        args=[getattr(instance, lookup)],
+                    ),
+                    instance.save,
+                )
+
+    def test_conditional_list(self):
+        url = reverse(f'{self.version}:review-list')
+        self.assertRevalidates(url, self.review.save, last_modified=False)
+        self.assertRevalidates(url, self.submit_review, last_modified=False)
+        self.assertRevalidates(url, self.review.delete, last_modified=False)
+
+    def test_conditional_embedded_stats(self):
+        for url, last_modified in [
+            (reverse(f'{self.version}:company-list'), False),
+            (
+                reverse(
+                    f'{self.version}:company-detail',
+                    args=[self.company.pk],
+                ),
+                True,
+            ),
+        ]:
+            with self.subTest(url=url):
+                self.assertRevalidates(
+                    f'{url}?embed=stats',
+                    self.submit_review,
+                    last_modified,
+                )
@@ -0,0 +1,141 @@
+from datetime import timedelta
+from threading import Event, Thread
+from time import sleep
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from reviews.backends.postgresql_pool.base import ConnectionPool
+
+
+class ConnectionPoolTestSuite(SimpleTestCase):
+
+    allow_database_queries = True
+
+    def pool(self, max_size=2, **options):
+        params = connection.get_connection_params()
+        pool = ConnectionPool(
+            connect=lambda: connection.Database.connect(**params),
+            max_size=max_size,
+            **{
+                'max_age': timedelta(hours=1),
+                'check_after': timedelta(hours=1),
+                'timeout': timedelta(seconds=1),
+                **options,
+            }
+        )
+        self.addCleanup(pool.clear)
+        return pool
+
+    def backend_pid(self, pooled):
+        with pooled.cursor() as cursor:
+            cursor.execute('select pg_backend_pid()')
+            [[pid]] = cursor.fetchall()
+        return pid
+
+    def test_reuse(self):
+        pool = self.pool()
+        first = pool.get()
+        pid = self.backend_pid(first)
+        pool.put(first)
+
+        # Transactions left open are rolled back on return:
+        self.assertEqual(
+            first.get_transaction_status(),
+            TRANSACTION_STATUS_IDLE,
+        )
+        second = pool.get()
+        self.assertIs(second, first)
+        self.assertEqual(self.backend_pid(second), pid)
+        pool.put(second)
+
+        self.assertEqual(
+            {key: pool.stats[key] for key in ['size', 'idle', 'in_use']},
+            {'size': 1, 'idle': 1, 'in_use': 0},
+        )
+        self.assertEqual((pool.opened, pool.reused), (1, 1))
+
+    def test_bounded_size(self):
+        pool = self.pool(max_size=2, timeout=timedelta(milliseconds=100))
+        connections = [pool.get(), pool.get()]
+        with self.assertRaises(OperationalError):
+            pool.get()
+        self.assertEqual(pool.timeouts, 1)
+
+        # Threads waiting for connections get them as they're returned:
+        taken = []
+        waiter = Thread(target=lambda: taken.append(pool.get()))
+        pool.timeout = 5
+        waiter.start()
+        sleep(0.1)
+        pool.put(connections[0])
+        waiter.join()
+        self.assertEqual(taken, connections[:1])
+        pool.put(connections[1])
+        pool.put(taken[0])
+        self.assertEqual(pool.size, 2)
+
+    def test_recycling(self):
+        pool = self.pool(max_age=timedelta(0))
+        first = pool.get()
+        pool.put(first)
+        self.assertTrue(first.closed)
+        self.assertEqual((pool.size, pool.recycled), (0, 1))
+
+    def test_health_check(self):
+        pool = self.pool(check_after=timedelta(0))
+        broken, other = pool.get(), pool.get()
+        pid = self.backend_pid(broken)
+        broken.rollback()
+
+        # Connections closed by the server are replaced when taken again:
+        with other.cursor() as cursor:
+            cursor.execute('select pg_terminate_backend(%s)', [pid])
+        pool.put(other)
+        pool.put(broken)
+        self.assertEqual(pool.idle, 2)
+
+        self.assertIs(pool.get(), other)
+        self.assertTrue(broken.closed)
+        self.assertEqual((pool.size, pool.discarded), (1, 1))
+        pool.put(other)
+
+    def test_concurrent_health_check(self):
+        pool = self.pool(check_after=timedelta(0))
+        first, second = pool.get(), pool.get()
+        pool.put(first)
+        pool.put(second)
+
+        # Connections are checked without holding up other threads taking
+        # connections, e.g. while the server takes long to answer:
+        checking, checked = Event(), Event()
+        healthy = pool.healthy
+
+        def slow_healthy(connection, returned_at):
+            if connection is second:
+                checking.set()
+                checked.wait(5)
+            return healthy(connection, returned_at)
+
+        taken = {}
+        checker = Thread(target=lambda: taken.update(slow=pool.get()))
+        other = Thread(target=lambda: taken.update(fast=pool.get()))
+        with patch.object(pool, 'healthy', side_effect=slow_healthy):
+            checker.start()
+            try:
+                self.assertTrue(checking.wait(5))
+                other.start()
+                other.join(1)
+                self.assertFalse(other.is_alive())
+            finally:
+                checked.set()
+                checker.join()
+                if other.is_alive():
+                    other.join()
+                for connection in taken.values():
+                    pool.put(connection)
+
+        self.assertEqual(taken, {'slow': second, 'fast': first})
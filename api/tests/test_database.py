@@ -0,0 +1,107 @@
+from api.serializers import related_object_cache
+from api.utils.database import (
+    Snapshot,
+    load_fixtures,
+    truncate,
+)
+from django.db.transaction import atomic
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from reviews.models import (
+    Company,
+    CompanyStats,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class DatabaseTestSuite(TestCase):
+
+    fixtures = ['test_admin', 'test_nonadmin']
+    models = [User, Token, Company, CompanyStats, Reviewer, Review]
+
+    def contents(self):
+        '''
+        Get the rows of every table by model, except for the keys and creation
+        times of tokens, which are generated.
+        '''
+        return {
+            model: list(
+                model.objects
+                .order_by('user' if model is Token else 'pk')
+                .values(*(
+                    field.attname
+                    for field in model._meta.concrete_fields
+                    if model is not Token or field.name == 'user'
+                ))
+            )
+            for model in self.models
+        }
+
+    def populate(self):
+        user = User.objects.get(username='test_nonadmin')
+        company = Company.objects.create(name='ACME, Inc.')
+        reviewer = Reviewer.objects.create(email='john.doe@example.com')
+        for rating in range(1, 6):
+            Review.objects.create(
+                submitter=user,
+                company=company,
+                reviewer=reviewer,
+                rating=rating,
+                title='Great',
+                summary='Great service.',
+                ip_address='192.0.2.1',
+            )
+
+    def test_load_fixtures(self):
+        loaded = self.contents()
+        self.assertEqual(len(loaded[Token]), 2)
+
+        truncate(*self.models)
+        for model in self.models:
+            self.assertFalse(model.objects.exists())
+
+        # Fixtures loaded in bulk are stored like those loaded by loaddata,
+        # along with tokens for their users:
+        load_fixtures('test_admin', 'test_nonadmin')
+        self.assertEqual(self.contents(), loaded)
+
+        # Objects created later get new primary keys:
+        user = User.objects.create(username='test_database')
+        self.assertGreater(user.pk, max(row['id'] for row in loaded[User]))
+        self.assertTrue(Token.objects.filter(user=user).exists())
+
+    def test_truncate(self):
+        self.populate()
+        company = Company.objects.get()
+        related_object_cache.set((Company, company.pk), company)
+        truncate(Company, Reviewer)
+
+        # Tables referring to truncated tables are emptied too:
+        for model in [Company, CompanyStats, Reviewer, Review]:
+            self.assertFalse(model.objects.exists())
+        self.assertEqual(User.objects.count(), 2)
+
+        # Primary key sequences start over, so cached objects are discarded:
+        self.assertIsNone(related_object_cache.get((Company, company.pk)))
+        self.assertEqual(Company.objects.create(name='ACME, Inc.').pk, 1)
+
+    def test_snapshot(self):
+        self.populate()
+        populated = self.contents()
+        snapshot = Snapshot(*self.models)
+
+        for _ in range(2):
+            with atomic():
+                Review.objects.filter(rating__gt=2).delete()
+                Company.objects.create(name='Initech')
+                User.objects.get(username='test_admin').delete()
+                snapshot.restore()
+            self.assertEqual(self.contents(), populated)
+
+        self.assertGreater(
+            Company.objects.create(name='Initech').pk,
+            max(row['id'] for row in populated[Company]),
+        )
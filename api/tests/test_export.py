@@ -0,0 +1,103 @@
+from csv import DictReader
+from io import StringIO
+from json import loads
+
+from datetime import timedelta
+
+from api.utils.database import stream_values
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class ExportTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.staff = User.objects.create(
+            username='test_export_staff',
+            is_staff=True,
+        )
+        self.user = User.objects.create(
+            username='test_export',
+        )
+        company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        for index in range(25):
+            Review.objects.create(
+                submitter=self.user if index % 5 == 0 else self.staff,
+                company=company,
+                reviewer=reviewer,
+                rating=1 + index % 5,
+                title=f'Review, "{index}"',
+                summary='Multiple\nlines',
+                ip_address='192.0.2.1',
+            )
+
+    def export(self, user, format=None):
+        self.client.force_login(user)
+        url = reverse(f'{self.version}:review-export')
+        response = self.client.get(
+            url,
+            {} if format is None else {'format': format},
+        )
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        for user, count in [(self.staff, 25), (self.user, 5)]:
+            with self.subTest(user=user.username):
+                for format in [None, 'ndjson']:
+                    reviews = [
+                        loads(line)
+                        for line in self.export(user, format).splitlines()
+                    ]
+                    self.assertEqual(len(reviews), count)
+
+                    # Exports must match regular representations:
+                    for review in reviews:
+                        self.assertNotIn('format=', review['self'])
+                        self.assertEqual(
+                            review,
+                            self.client.get(
+                                review['self'],
+                                HTTP_ACCEPT='application/json',
+                            ).json(),
+                        )
+
+    def test_export_csv(self):
+        reviews = list(DictReader(StringIO(self.export(self.user, 'csv'))))
+        self.assertEqual(len(reviews), 5)
+        for review in reviews:
+            self.assertTrue(review['title'].startswith('Review, "'))
+            self.assertEqual(review['summary'], 'Multiple\nlines')
+
+    def test_idle_timeout(self):
+        def idle_timeout():
+            with connection.cursor() as cursor:
+                cursor.execute('show idle_in_transaction_session_timeout')
+                [[timeout]] = cursor.fetchall()
+            return timeout
+
+        # Streams stalled for longer than their idle timeout are ended by the
+        # database:
+        rows = stream_values(
+            Review.objects.values('pk'),
+            chunk_size=10,
+            idle_timeout=timedelta(seconds=5),
+        )
+        next(rows)
+        self.assertEqual(idle_timeout(), '5s')
+        self.assertEqual(len(list(rows)), 24)
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from api.handlers import WSGIHandler
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    User,
+)
+
+
+@contextmanager
+def kept_connections():
+    '''
+    Keep database connections open across requests, like the test client
+    does, so that requests see the data of the test transaction.
+    '''
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+class HandlerTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_handlers',
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.handler = WSGIHandler()
+        self.url = reverse(
+            f'{self.version}:company-detail',
+            args=[self.company.pk],
+        )
+
+    def get(self, url, **headers):
+        '''
+        Serve a request through the WSGI handler and return the status code,
+        lowercased headers and content of its response, and whether it went through the
+        full middleware chain.
+        '''
+
+        started = []
+        environ = RequestFactory().get(
+            url,
+            HTTP_ACCEPT='application/json',
+            HTTP_ORIGIN='http://example.com',
+            **headers
+        ).environ
+
+        with kept_connections(), patch.object(
+            SessionMiddleware,
+            'process_request',
+            autospec=True,
+            side_effect=SessionMiddleware.process_request,
+        ) as process_request:
+            content = b''.join(self.handler(
+                environ,
+                lambda status, headers: started.extend([status, headers]),
+            ))
+
+        status, headers = started
+        return (
+            int(status.split()[0]),
+            {name.lower(): value for name, value in headers},
+            content,
+            process_request.called,
+        )
+
+    def test_stateless_requests(self):
+        status, headers, content, full = self.get(
+            self.url,
+            HTTP_AUTHORIZATION=f'Token {self.user.auth_token.key}',
+        )
+        self.assertEqual(status, 200, content)
+        self.assertFalse(full)
+        self.assertIn(b'ACME, Inc.', content)
+
+        # Security and CORS headers are still added:
+        self.assertEqual(headers['x-content-type-options'], 'nosniff')
+        self.assertEqual(headers['access-control-allow-origin'], '*')
+        self.assertNotIn('set-cookie', headers)
+
+    def test_stateful_requests(self):
+        # Requests without credentials, and requests outside of the API, go
+        # through the full middleware chain:
+        for url, headers in [
+            (self.url, {}),
+            (
+                '/admin/',
+                {'HTTP_AUTHORIZATION': f'Token {self.user.auth_token.key}'},
+            ),
+        ]:
+            with self.subTest(url=url, headers=headers):
+                _, headers, _, full = self.get(url, **headers)
+                self.assertTrue(full)
+                self.assertEqual(headers['x-content-type-options'], 'nosniff')
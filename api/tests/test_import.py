@@ -0,0 +1,122 @@
+from io import StringIO
+from json import dumps
+from tempfile import NamedTemporaryFile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class ImportTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_import',
+            is_staff=True,
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+
+    def import_reviews(self, content, **options):
+        '''
+        Import reviews from the given file content and return the lines of the
+        report of rejected records.
+        '''
+
+        stdout, stderr = StringIO(), StringIO()
+        with NamedTemporaryFile('w') as input:
+            input.write(content)
+            input.flush()
+            call_command(
+                'import_reviews',
+                input.name,
+                stdout=stdout,
+                stderr=stderr,
+                **options
+            )
+        self.assertIn('Imported', stdout.getvalue())
+        return stderr.getvalue().splitlines()
+
+    def test_import_export(self):
+        for index in range(10):
+            Review.objects.create(
+                submitter=self.user,
+                company=self.company,
+                reviewer=self.reviewer,
+                rating=1 + index % 5,
+                title=f'Review, "{index}"',
+                summary='Multiple\nlines',
+                ip_address='192.0.2.1',
+            )
+
+        self.client.force_login(self.user)
+        for format in ['ndjson', 'csv']:
+            with self.subTest(format=format):
+                response = self.client.get(
+                    reverse(f'{self.version}:review-export'),
+                    {'format': format},
+                )
+                content = b''.join(response.streaming_content).decode()
+
+                rejects = self.import_reviews(content, format=format)
+                self.assertFalse(rejects)
+
+        # Each import must have doubled the reviews:
+        self.assertEqual(Review.objects.count(), 40)
+        self.company.stats.refresh_from_db()
+        self.assertEqual(self.company.stats.count, 40)
+        self.assertEqual(self.company.stats.total, 120)
+        for review in Review.objects.all():
+            self.assertEqual(review.summary, 'Multiple\nlines')
+
+    def test_import_rejects(self):
+        valid = {
+            'company': self.company.pk,
+            'reviewer': 'jane.doe@example.com',
+            'reviewer_name': 'Jane Doe',
+            'rating': 4,
+            'ip_address': '2001:db8::1',
+        }
+        records = [
+            valid,
+            dict(valid, company=self.company.pk + 1),
+            dict(valid, company='ACME'),
+            dict(valid, rating=6),
+            dict(valid, rating='four'),
+            dict(valid, reviewer='jane.doe'),
+            dict(valid, reviewer='jane.doe@example'),
+            dict(valid, reviewer='jane..doe@example.com'),
+            dict(valid, ip_address='192.0.2'),
+            dict(valid, title='x' * (Review.title_max_length + 1)),
+            dict(valid, submitter='nobody'),
+            dict(valid, created='yesterday'),
+        ]
+        rejects = self.import_reviews(
+            '\n'.join(dumps(record) for record in records) + '\n{\n',
+            submitter=self.user.username,
+        )
+
+        self.assertEqual(
+            sorted(int(reject.split()[1].rstrip(':')) for reject in rejects),
+            list(range(2, len(records) + 2)),
+        )
+
+        review = Review.objects.get()
+        self.assertEqual(review.submitter, self.user)
+        self.assertEqual(review.reviewer.name, 'Jane Doe')
+        self.assertEqual(review.title, '')
+        self.company.stats.refresh_from_db()
+        self.assertEqual(self.company.stats.histogram['4'], 1)
@@ -0,0 +1,48 @@
+from argparse import ArgumentTypeError
+
+from api.management.commands.loadtest import mix
+from api.utils.load import Sample, summarize
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+
+class LoadTestSuite(SimpleTestCase):
+
+    def test_summarize(self):
+        samples = [
+            Sample('list', latency / 1000, 200)
+            for latency in range(1, 101)
+        ] + [
+            Sample('submit', 0.01, 201),
+            Sample('submit', 0.02, 400),
+            Sample('submit', 0.03, None),
+        ]
+
+        rows = {row[0]: row[1:] for row in summarize(samples, 10)}
+
+        self.assertEqual(
+            rows['list'],
+            [100, '10.0', '51.0', '96.0', '100.0', '0.0'],
+        )
+        self.assertEqual(
+            rows['submit'],
+            [3, '0.1', '10.0', '10.0', '10.0', '66.7'],
+        )
+        self.assertEqual(rows['total'][:2], [103, '10.1'])
+        self.assertEqual(rows['total'][-1], '1.9')
+
+    def test_mix(self):
+        self.assertEqual(
+            mix('submit=1,list=0.5'),
+            {'submit': 1, 'list': 0.5},
+        )
+        for value in ['submit=1,delete=1', 'list=many', 'list=0', 'list=-1']:
+            with self.subTest(value=value):
+                with self.assertRaises(ArgumentTypeError):
+                    mix(value)
+
+    def test_options(self):
+        for option in ['concurrency', 'users', 'companies']:
+            with self.subTest(option=option):
+                with self.assertRaises(CommandError):
+                    call_command('loadtest', **{option: 0})
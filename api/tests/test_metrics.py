@@ -0,0 +1,168 @@
+from os import listdir
+from tempfile import TemporaryDirectory
+
+from api.metrics import Metrics, exposition
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class MetricsTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_metrics',
+        )
+        self.staff = User.objects.create(
+            username='test_metrics_staff',
+            is_staff=True,
+        )
+        Review.objects.create(
+            submitter=self.user,
+            company=Company.objects.create(name='ACME, Inc.'),
+            reviewer=Reviewer.objects.create(email='john.doe@example.com'),
+            rating=5,
+            title='Great',
+            summary='Great service.',
+            ip_address='192.0.2.1',
+        )
+        self.url = reverse(f'{self.version}:review-list')
+
+    def samples(self):
+        '''
+        Get the samples served by the metrics endpoint by series.
+        '''
+        self.client.force_login(self.staff)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return dict(
+            line.rsplit(' ', 1)
+            for line in response.content.decode().splitlines()
+            if not line.startswith('#')
+        )
+
+    def test_server_timing(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        timings = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *parameters = metric.split(';')
+            timings[name] = dict(
+                parameter.split('=', 1)
+                for parameter in parameters
+            )
+
+        self.assertEqual(
+            set(timings),
+            {
+                'authentication',
+                'permissions',
+                'serialization',
+                'rendering',
+                'database',
+                'total',
+            },
+        )
+        self.assertRegex(timings['database']['desc'], r'^"[1-9]\d* queries"$')
+
+        # Phases don't overlap:
+        total = float(timings.pop('total')['dur'])
+        self.assertLessEqual(
+            sum(float(timing['dur']) for timing in timings.values()),
+            total,
+        )
+
+    def test_metrics(self):
+        series = (
+            'reviews_request_duration_seconds_count'
+            f'{{view="{self.version}:review-list",method="GET",phase="total"}}'
+        )
+        before = int(self.samples().get(series, 0))
+
+        self.client.force_login(self.user)
+        self.client.get(self.url, HTTP_ACCEPT='application/json')
+
+        samples = self.samples()
+        self.assertEqual(int(samples[series]), before + 1)
+        self.assertEqual(
+            samples[series.replace('_count{', '_bucket{')[:-1] + ',le="+Inf"}'],
+            samples[series],
+        )
+        self.assertGreater(
+            int(samples[
+                'reviews_database_queries_total'
+                f'{{view="{self.version}:review-list",method="GET"}}'
+            ]),
+            0,
+        )
+
+        # Metrics are only available to staff users:
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class SharedMetricsTestSuite(SimpleTestCase):
+
+    # Counters of connection pools are collected along with metrics:
+    allow_database_queries = True
+
+    def histogram(self, metrics):
+        snapshot = metrics.collect()
+        counts, total = snapshot['histograms'][
+            (('view', 'review-list'), ('method', 'GET'), ('phase', 'total'))
+        ]
+        queries = snapshot['counters'][(
+            'reviews_database_queries_total',
+            (('view', 'review-list'), ('method', 'GET')),
+        )]
+        return counts, round(total, 6), queries
+
+    def test_shared_directory(self):
+        with TemporaryDirectory() as directory:
+
+            # Metrics of several processes sharing a directory:
+            first, second = Metrics(directory), Metrics(directory)
+            first.record('review-list', 'GET', {'total': 0.003}, 2)
+            second.record('review-list', 'GET', {'total': 0.2}, 1)
+            second.record('review-list', 'BREW', {'total': 0.2}, 1)
+            second.save()
+
+            counts, total, queries = self.histogram(first)
+            self.assertEqual(sum(counts), 2)
+            self.assertEqual(counts[2], 1)  # le="0.005"
+            self.assertEqual(counts[7], 1)  # le="0.25"
+            self.assertEqual((total, queries), (0.203, 3))
+            self.assertEqual(self.histogram(second), (counts, total, queries))
+
+            # Unknown methods are recorded together:
+            self.assertIn(
+                'method="other"',
+                exposition(second.collect()),
+            )
+
+            # Once processes exit, their metrics are kept together:
+            first.archive()
+            second.archive()
+            self.assertEqual(
+                set(listdir(directory)),
+                {Metrics.archive_name, Metrics.lock_name},
+            )
+            self.assertEqual(
+                Metrics(directory).read_archive()['merged'],
+                {second.name},
+            )
+            self.assertEqual(
+                self.histogram(Metrics(directory)),
+                (counts, total, queries),
+            )
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from api.pagination import CursorPagination
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    ReviewSubmission,
+    Reviewer,
+    User,
+)
+
+
+# Responses are served from the database rather than the response cache:
+@override_settings(
+    RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': False},
+)
+class QueryCountTestSuite(TestCase):
+    '''
+    The number of queries needed to serve a list page must not depend on the
+    number of objects in the page.
+    '''
+
+    version = 'v1'
+    objects = 12
+    page_sizes = [1, 4, objects]
+
+    def setUp(self):
+        self.staff = User.objects.create(
+            username='test_query_counts_staff',
+            is_staff=True,
+        )
+        self.user = User.objects.create(
+            username='test_query_counts',
+        )
+        companies = [
+            Company.objects.create(name=f'Company {index}')
+            for index in range(self.objects)
+        ]
+        reviewers = [
+            Reviewer.objects.create(email=f'reviewer{index}@example.com')
+            for index in range(self.objects)
+        ]
+        for index in range(self.objects):
+            attributes = dict(
+                submitter=self.user,
+                company=companies[index],
+                reviewer=reviewers[index],
+                rating=1 + index % 5,
+                title=f'Review {index}',
+                summary='Lorem ipsum dolor sit amet.',
+                ip_address='192.0.2.1',
+            )
+            Review.objects.create(**attributes)
+            ReviewSubmission.objects.create(**attributes)
+        for index in range(self.objects):
+            User.objects.create(username=f'test_query_counts_{index}')
+
+    def count_queries(self, url, page_size):
+        with patch.object(CursorPagination, 'page_size', page_size):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+        return len(queries)
+
+    def test_list_query_counts(self):
+        urls = [
+            reverse(f'{self.version}:user-list'),
+            reverse(f'{self.version}:company-list'),
+            reverse(f'{self.version}:company-list') + '?embed=stats',
+            reverse(f'{self.version}:reviewer-list'),
+            reverse(f'{self.version}:review-list'),
+            reverse(f'{self.version}:reviewsubmission-list'),
+        ]
+
+        for user in [self.staff, self.user]:
+            self.client.force_login(user)
+            for compiled in [False, True]:
+                for url in urls:
+                    with self.subTest(
+                        user=user.username,
+                        compiled=compiled,
+                        url=url,
+                    ), override_settings(COMPILED_SERIALIZERS=compiled):
+                        counts = [
+                            self.count_queries(url, page_size)
+                            for page_size in self.page_sizes
+                        ]
+                        self.assertEqual(
+                            counts,
+                            [counts[0]] * len(counts),
+                            f'Query counts grow with page sizes '
+                            f'{self.page_sizes}',
+                        )
@@ -0,0 +1,236 @@
+from datetime import timedelta
+
+from api.utils.database import has_extension, plan_nodes, query_plan
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.http import urlencode
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import (
+    CompanyViewSet,
+    ReviewViewSet,
+    ReviewerViewSet,
+    UserViewSet,
+)
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+# Check the queries that serve responses rather than cached responses:
+@override_settings(
+    RESPONSE_CACHE={
+        'ALIAS': 'responses',
+        'ENABLED': False,
+    },
+)
+class QueryPlanTestSuite(TestCase):
+    '''
+    Check that every query performed to serve list pages can use indexes, so
+    that listing doesn't get slower as tables grow.  The database is seeded
+    with enough rows for the query planner to prefer index scans wherever they
+    are possible, and the plan of each query is checked with EXPLAIN.
+    '''
+
+    version = 'v1'
+
+    viewsets = [
+        (UserViewSet, 'user'),
+        (CompanyViewSet, 'company'),
+        (ReviewerViewSet, 'reviewer'),
+        (ReviewViewSet, 'review'),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        timestamp = now()
+
+        def timestamps(index):
+            return {
+                'created': timestamp - timedelta(seconds=index),
+                'modified': timestamp - timedelta(seconds=index),
+            }
+
+        users = User.objects.bulk_create([
+            User(
+                username=f'user{index}',
+                is_staff=index == 0,
+                **timestamps(index),
+            )
+            for index in range(5000)
+        ])
+
+        companies = Company.objects.bulk_create([
+            Company(
+                name=f'Company {index}',
+                **timestamps(index),
+            )
+            for index in range(2000)
+        ])
+
+        reviewers = Reviewer.objects.bulk_create([
+            Reviewer(
+                email=f'reviewer{index}@example.com',
+                **timestamps(index),
+            )
+            for index in range(2000)
+        ])
+
+        Review.objects.bulk_create(
+            [
+                Review(
+                    submitter=users[index % len(users)],
+                    company=companies[index % len(companies)],
+                    reviewer=reviewers[index % len(reviewers)],
+                    rating=1 + index % 5,
+                    ip_address='192.0.2.1',
+                    **timestamps(index),
+                )
+                for index in range(50000)
+            ],
+            batch_size=5000,
+        )
+
+        cursor = connection.cursor()
+        cursor.execute('analyze')
+
+        # Check database features once ahead of time, as the application does,
+        # so that only the queries serving each request are checked:
+        has_extension('pg_trgm')
+
+        cls.staff, cls.regular = users[0], users[1]
+        cls.companies, cls.reviewers = companies[:2], reviewers[:2]
+        cls.timestamp = timestamp
+
+    def get_queries(self, viewset, url, user, action='list'):
+        '''
+        Get a list page as a user and return the page along with the SQL of
+        every query performed to serve it.
+        '''
+
+        request = APIRequestFactory().get(url, HTTP_ACCEPT='application/json')
+        request.resolver_match = resolve(request.path)
+        force_authenticate(request, user=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = viewset.as_view({'get': action})(request).render()
+
+        self.assertEqual(response.status_code, 200)
+        return response.data, [query['sql'] for query in queries]
+
+    def assertUsesIndexes(self, sql):
+        plan = query_plan(sql)
+        sequential_scans = [
+            node['Relation Name']
+            for node in plan_nodes(plan)
+            if node['Node Type'] == 'Seq Scan'
+        ]
+        self.assertFalse(
+            sequential_scans,
+            f'Sequential scan of {sequential_scans} in {sql}\n{plan}',
+        )
+
+    def test_list_query_plans(self):
+        for compiled in [False, True]:
+            for user in [self.staff, self.regular]:
+                for viewset, resource in self.viewsets:
+                    with self.subTest(
+                        compiled=compiled,
+                        staff=user.is_staff,
+                        resource=resource,
+                    ), override_settings(COMPILED_SERIALIZERS=compiled):
+
+                        # Check the first page and a page reached by a cursor:
+                        url = reverse(f'{self.version}:{resource}-list')
+                        for _ in range(2):
+                            page, queries = self.get_queries(
+                                viewset,
+                                url,
+                                user,
+                            )
+                            self.assertTrue(queries)
+                            for sql in queries:
+                                self.assertUsesIndexes(sql)
+
+                            url = page['next']
+                            if not url:
+                                break
+
+    def test_search_query_plans(self):
+        url = reverse(f'{self.version}:review-list') + '?q=great+service'
+        for compiled in [False, True]:
+            for user in [self.staff, self.regular]:
+                with self.subTest(
+                    compiled=compiled,
+                    staff=user.is_staff,
+                ), override_settings(COMPILED_SERIALIZERS=compiled):
+                    page, queries = self.get_queries(ReviewViewSet, url, user)
+                    for sql in queries:
+                        self.assertUsesIndexes(sql)
+
+    def test_company_name_query_plans(self):
+        for url, action in [
+            (reverse(f'{self.version}:company-list') + '?name=company+19', 'list'),
+            (
+                reverse(f'{self.version}:company-autocomplete') +
+                '?prefix=company+19',
+                'autocomplete',
+            ),
+        ]:
+            with self.subTest(action=action):
+                page, queries = self.get_queries(
+                    CompanyViewSet,
+                    url,
+                    self.regular,
+                    action,
+                )
+                self.assertTrue(page)
+                for sql in queries:
+                    self.assertUsesIndexes(sql)
+
+    def test_review_filter_query_plans(self):
+        companies = [company.pk for company in self.companies]
+        reviewers = [reviewer.pk for reviewer in self.reviewers]
+        recent = (self.timestamp - timedelta(minutes=10)).isoformat()
+        older = (self.timestamp - timedelta(hours=1)).isoformat()
+
+        for filters in [
+            {'company': companies[0]},
+            {'company__in': f'{companies[0]},{companies[1]}'},
+            {'reviewer': reviewers[0]},
+            {'reviewer__in': f'{reviewers[0]},{reviewers[1]}'},
+            {'rating': 5},
+            {'rating__in': '1,5'},
+            {'rating__gte': 2, 'rating__lte': 4},
+            {'created__gte': recent},
+            {'created__lt': older},
+            {'modified__gte': recent},
+            {'company': companies[0], 'rating__gte': 4},
+            {'reviewer': reviewers[0], 'created__lt': older},
+            {'rating': 5, 'created__gte': recent, 'modified__gte': recent},
+        ]:
+            for user in [self.staff, self.regular]:
+                with self.subTest(filters=filters, staff=user.is_staff):
+                    url = (
+                        reverse(f'{self.version}:review-list') + '?' +
+                        urlencode(filters)
+                    )
+                    for _ in range(2):
+                        page, queries = self.get_queries(
+                            ReviewViewSet,
+                            url,
+                            user,
+                        )
+                        for sql in queries:
+                            self.assertUsesIndexes(sql)
+
+                        url = page['next']
+                        if not url:
+                            break
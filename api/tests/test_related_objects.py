@@ -0,0 +1,128 @@
+from json import dumps
+
+from api.serializers import related_object_cache, resolve_path
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+@override_settings(
+    REVIEW_SUBMISSIONS={
+        **settings.REVIEW_SUBMISSIONS,
+        'ASYNC': False,
+    },
+)
+class RelatedObjectTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        related_object_cache.clear()
+        resolve_path.cache_clear()
+
+        self.user = User.objects.create(
+            username='test_related_objects',
+        )
+        self.companies = [
+            Company.objects.create(name=f'Company {index}')
+            for index in range(3)
+        ]
+        self.reviewers = [
+            Reviewer.objects.create(email=f'reviewer{index}@example.com')
+            for index in range(3)
+        ]
+        self.client.force_login(self.user)
+
+    def review(self, index):
+        return {
+            'company': reverse(
+                f'{self.version}:company-detail',
+                args=[self.companies[index % 3].pk],
+            ),
+            'reviewer': reverse(
+                f'{self.version}:reviewer-detail',
+                args=[self.reviewers[index % 3].email],
+            ),
+            'rating': 1 + index % 5,
+            'title': f'Review {index}',
+        }
+
+    def submit(self, count):
+        '''
+        Submit a batch of reviews, and return the queries that selected
+        companies and reviewers.
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse(f'{self.version}:review-list'),
+                dumps([self.review(index) for index in range(count)]),
+                content_type='application/json',
+                HTTP_ACCEPT='application/json',
+                HTTP_X_FORWARDED_FOR='192.0.2.1',
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return {
+            model: [
+                query['sql']
+                for query in queries
+                if query['sql'].startswith('SELECT')
+                and f'FROM "{model._meta.db_table}"' in query['sql']
+            ]
+            for model in [Company, Reviewer]
+        }
+
+    def cached(self, instance):
+        return related_object_cache.get((type(instance), instance.pk))
+
+    def test_batched_lookups(self):
+        # Related objects of each model are fetched with a single query,
+        # regardless of the size of the batch:
+        for count in [3, 30]:
+            with self.subTest(count=count):
+                related_object_cache.clear()
+                queries = self.submit(count)
+                for model, selects in queries.items():
+                    self.assertEqual(len(selects), 1, selects)
+                    self.assertIn(' IN (', selects[0])
+        self.assertEqual(Review.objects.count(), 33)
+
+        # Links resolve to the same views every time, so each one is only
+        # resolved once:
+        info = resolve_path.cache_info()
+        self.assertEqual(info.misses, 6)
+        self.assertGreater(info.hits, 0)
+
+        # Recently used related objects are served from the cache:
+        queries = self.submit(30)
+        self.assertEqual(queries, {Company: [], Reviewer: []})
+        with self.assertNumQueries(0):
+            for instance in self.companies + self.reviewers:
+                self.assertEqual(self.cached(instance), instance)
+
+    def test_discarded_objects(self):
+        # Saved objects are discarded:
+        self.submit(3)
+        for instance in [self.companies[0], self.reviewers[0]]:
+            with self.subTest(instance=instance):
+                self.assertIsNotNone(self.cached(instance))
+                instance.save()
+                self.assertIsNone(self.cached(instance))
+
+        # Deleted objects are discarded too:
+        self.submit(3)
+        Review.objects.all().delete()
+        for instance in [self.companies[1], self.reviewers[1]]:
+            with self.subTest(instance=instance):
+                key = (type(instance), instance.pk)
+                self.assertIsNotNone(related_object_cache.get(key))
+                instance.delete()
+                self.assertIsNone(related_object_cache.get(key))
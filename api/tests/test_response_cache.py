@@ -0,0 +1,125 @@
+from os import environ
+from os.path import join
+from runpy import run_path
+from unittest.mock import patch
+
+from api.views import response_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class ResponseCacheTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        caches[response_cache.alias].clear()
+
+        self.user = User.objects.create(
+            username='test_response_cache',
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        self.client.force_login(self.user)
+
+    def get(self, url):
+        hits = response_cache.hits
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), response_cache.hits > hits
+
+    def test_cached_resources(self):
+        for resource, instance, field in [
+            ('company', self.company, 'name'),
+            ('reviewer', self.reviewer, 'name'),
+        ]:
+            for url in [
+                reverse(f'{self.version}:{resource}-list'),
+                reverse(
+                    f'{self.version}:{resource}-detail',
+                    args=[instance.pk],
+                ),
+            ]:
+                with self.subTest(url=url):
+                    first, hit = self.get(url)
+                    self.assertFalse(hit)
+
+                    second, hit = self.get(url)
+                    self.assertTrue(hit)
+                    self.assertEqual(first, second)
+
+                    # Changes must show immediately:
+                    setattr(instance, field, f'Changed for {url}')
+                    instance.save()
+                    third, hit = self.get(url)
+                    self.assertFalse(hit)
+                    self.assertIn(f'Changed for {url}', str(third))
+
+    def test_uncached_resources(self):
+        other = User.objects.create(
+            username='test_response_cache_other',
+        )
+        Review.objects.create(
+            submitter=other,
+            company=self.company,
+            reviewer=self.reviewer,
+            rating=5,
+            ip_address='192.0.2.1',
+        )
+
+        # Reviews are only visible to their submitters, so they're never served
+        # from a cache shared by all users:
+        for user, count in [(other, 1), (self.user, 0), (other, 1)]:
+            self.client.force_login(user)
+            page, hit = self.get(reverse(f'{self.version}:review-list'))
+            self.assertFalse(hit)
+            self.assertEqual(len(page['results']), count)
+
+        # Embedded statistics change along with reviews:
+        page, hit = self.get(
+            reverse(f'{self.version}:company-list') + '?embed=stats',
+        )
+        self.assertFalse(hit)
+
+
+class GunicornResponseCacheTestSuite(SimpleTestCase):
+
+    def configure(self, **variables):
+        '''
+        Load the gunicorn configuration with the given environment variables,
+        and return whether it leaves response caching enabled.
+        '''
+        with patch.dict(environ, {'METRICS_DIRECTORY': '', **variables}):
+            environ.pop('RESPONSE_CACHE', None)
+            run_path(join(settings.BASE_DIR, 'config', 'gunicorn.py'))
+            return environ.get('RESPONSE_CACHE') != 'False'
+
+    def test_shared_cache(self):
+        # Several workers may only cache responses in a shared backend that
+        # adds keys atomically:
+        for workers, backend, enabled in [
+            ('1', None, True),
+            ('4', None, False),
+            ('4', 'filebased.FileBasedCache', False),
+            ('4', 'memcached.PyLibMCCache', True),
+        ]:
+            with self.subTest(workers=workers, backend=backend):
+                variables = {'GUNICORN_WORKERS': workers}
+                if backend is not None:
+                    variables['RESPONSE_CACHE_BACKEND'] = (
+                        f'django.core.cache.backends.{backend}'
+                    )
+                self.assertEqual(self.configure(**variables), enabled)
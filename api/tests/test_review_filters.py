@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.timezone import now
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class ReviewFilterTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.staff = User.objects.create(
+            username='test_review_filters_staff',
+            is_staff=True,
+        )
+        self.user = User.objects.create(
+            username='test_review_filters',
+        )
+        self.companies = [
+            Company.objects.create(name=f'Company {index}')
+            for index in range(3)
+        ]
+        self.reviewers = [
+            Reviewer.objects.create(email=f'reviewer{index}@example.com')
+            for index in range(3)
+        ]
+
+        self.start = now()
+        for index in range(30):
+            Review.objects.create(
+                submitter=self.user if index % 2 else self.staff,
+                company=self.companies[index % 3],
+                reviewer=self.reviewers[index // 10],
+                rating=1 + index % 5,
+                ip_address='192.0.2.1',
+                created=self.start + timedelta(days=index),
+            )
+
+    def filter(self, user, **filters):
+        '''
+        List reviews matching filters as a user, following every page, and
+        return the matching reviews from the database.
+        '''
+
+        self.client.force_login(user)
+        url = (
+            reverse(f'{self.version}:review-list') + '?' + urlencode(filters)
+        )
+        links = []
+        while url:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            links.extend(review['self'] for review in page['results'])
+            url = page['next']
+
+        self.assertEqual(len(links), len(set(links)))
+        return len(links)
+
+    def test_filters(self):
+        company, reviewer = self.companies[0], self.reviewers[0]
+        for filters, queryset in [
+            ({'company': company.pk}, {'company': company}),
+            (
+                {'company__in': f'{company.pk},{self.companies[1].pk}'},
+                {'company__in': self.companies[:2]},
+            ),
+            ({'reviewer': reviewer.email}, {'reviewer': reviewer}),
+            (
+                {'reviewer__in': f'{reviewer.email},{self.reviewers[2].email}'},
+                {'reviewer__in': [self.reviewers[0], self.reviewers[2]]},
+            ),
+            ({'rating': 5}, {'rating': 5}),
+            ({'rating__in': '1,5'}, {'rating__in': [1, 5]}),
+            (
+                {'rating__gte': 2, 'rating__lte': 3},
+                {'rating__gte': 2, 'rating__lte': 3},
+            ),
+            (
+                {
+                    'created__gte': (self.start + timedelta(days=5)).isoformat(),
+                    'created__lt': (self.start + timedelta(days=25)).isoformat(),
+                },
+                {
+                    'created__gte': self.start + timedelta(days=5),
+                    'created__lt': self.start + timedelta(days=25),
+                },
+            ),
+            (
+                {'company': company.pk, 'rating__gte': 3},
+                {'company': company, 'rating__gte': 3},
+            ),
+        ]:
+            for user in [self.staff, self.user]:
+                with self.subTest(filters=filters, staff=user.is_staff):
+                    expected = Review.objects.filter(**queryset)
+                    if not user.is_staff:
+                        expected = expected.filter(submitter=user)
+                    self.assertTrue(expected.exists())
+                    self.assertEqual(
+                        self.filter(user, **filters),
+                        expected.count(),
+                    )
+
+    def test_invalid_filters(self):
+        self.client.force_login(self.staff)
+        for filters in [
+            {'company': 'ACME'},
+            {'company__in': '1,ACME'},
+            {'rating__gte': 'high'},
+            {'created__gte': 'yesterday'},
+        ]:
+            with self.subTest(filters=filters):
+                response = self.client.get(
+                    reverse(f'{self.version}:review-list'),
+                    filters,
+                    HTTP_ACCEPT='application/json',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(list(filters)[0], response.json())
@@ -0,0 +1,150 @@
+from api.testcase import GabbiHypothesisTestCase
+from api.utils.database import load_fixtures
+from django.urls import reverse
+
+from hypothesis import (
+    Verbosity,
+    given,
+    settings,
+)
+
+from hypothesis.strategies import (
+    integers,
+    lists,
+)
+
+from requests.auth import _basic_auth_str
+
+
+class ReviewTestSuite(GabbiHypothesisTestCase):
+
+    version = 'v1'
+
+    # Users with known passwords:
+    @classmethod
+    def setUpTestData(cls):
+        load_fixtures('test_nonadmin')
+
+    @given(
+        ratings=lists(
+            integers(min_value=0, max_value=6),
+            min_size=1,
+            max_size=20,
+        ),
+    )
+    @settings(
+        max_examples=10,
+        verbosity=Verbosity.verbose,
+    )
+    def test_bulk_submit_reviews(self, ratings):
+
+        auth_string = _basic_auth_str(
+            username='test_nonadmin',
+            password='xyzzy',
+        )
+
+        valid_ratings = [
+            rating
+            for rating in ratings
+            if 1 <= rating <= 5
+        ]
+
+        def reviews(ratings):
+            return [
+                {
+                    # Double quotes would be escaped in the JSON request
+                    # entity, which breaks substitution:
+                    'company': "$HISTORY['create company'].$LOCATION",
+                    'reviewer': "$HISTORY['create reviewer'].$LOCATION",
+                    'rating': rating,
+                }
+                for rating in ratings
+            ]
+
+        self.run_gabbi(
+            {
+                'defaults': {
+                    'request_headers': {
+                        'content-type': 'application/json',
+                        'authorization': auth_string,
+                    },
+                },
+                'tests': [
+
+                    {
+                        'name': 'create company',
+                        'url': reverse(self.version + ':company-list'),
+                        'method': 'POST',
+                        'data': {
+                            'name': 'ACME, Inc.',
+                        },
+                        'status': 201,
+                    },
+
+                    {
+                        'name': 'create reviewer',
+                        'url': reverse(self.version + ':reviewer-list'),
+                        'method': 'POST',
+                        'data': {
+                            'email': 'john.doe@example.com',
+                        },
+                        'status': 201,
+                    },
+
+                    # A batch with any invalid review is rejected as a whole,
+                    # with errors reported for each review:
+                    {
+                        'name': 'submit reviews',
+                        'url': reverse(self.version + ':review-list'),
+                        'method': 'POST',
+                        'data': reviews(ratings),
+                        'status': (
+                            201
+                            if valid_ratings == ratings
+                            else 400
+                        ),
+                        'response_json_paths': {
+                            f'$[{index}]': (
+                                {}
+                                if 1 <= rating <= 5
+                                else {
+                                    'rating': [
+                                        f'"{rating}" is not a valid choice.',
+                                    ],
+                                }
+                            )
+                            for index, rating in enumerate(ratings)
+                        } if valid_ratings != ratings else {
+                            f'$[{index}].rating': rating
+                            for index, rating in enumerate(ratings)
+                        },
+                    },
+
+                    # Valid batches are accepted:
+                    {
+                        'name': 'submit valid reviews',
+                        'url': reverse(self.version + ':review-list'),
+                        'method': 'POST',
+                        'data': reviews(valid_ratings),
+                        'status': 201,
+                        'response_json_paths': {
+                            '$.`len`': len(valid_ratings),
+                        },
+                    },
+
+                    {
+                        'name': 'fetch company stats',
+                        'url': '$HISTORY["create company"].$LOCATION/stats',
+                        'status': 200,
+                        'response_json_paths': {
+                            '$.count': len(valid_ratings) * (
+                                2
+                                if valid_ratings == ratings
+                                else 1
+                            ),
+                        },
+                    },
+
+                ],
+            },
+        )
@@ -0,0 +1,91 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+class SearchTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.staff = User.objects.create(
+            username='test_search_staff',
+            is_staff=True,
+        )
+        self.user = User.objects.create(
+            username='test_search',
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+
+    def submit_review(self, title, summary='', submitter=None):
+        return Review.objects.create(
+            submitter=submitter or self.staff,
+            company=self.company,
+            reviewer=self.reviewer,
+            rating=5,
+            title=title,
+            summary=summary,
+            ip_address='192.0.2.1',
+        )
+
+    def search(self, user, terms):
+        '''
+        Search reviews as a user, following every page of results, and return
+        the titles of the reviews found in order.
+        '''
+
+        self.client.force_login(user)
+        url = reverse(f'{self.version}:review-list') + f'?q={terms}'
+        titles = []
+        while url:
+            page = self.client.get(url, HTTP_ACCEPT='application/json').json()
+            titles.extend(review['title'] for review in page['results'])
+            url = page['next']
+        return titles
+
+    def test_search_ranking(self):
+        self.submit_review('Average', 'The staff was friendly')
+        self.submit_review('Friendly staff', 'Nothing else to say')
+        self.submit_review('Unrelated', 'Nothing to see here')
+        self.submit_review('Great people', 'Friendly, friendly staff!')
+
+        self.assertEqual(
+            self.search(self.staff, 'friendly+staff'),
+            ['Friendly staff', 'Great people', 'Average'],
+        )
+
+        # Search documents must follow changes to reviews:
+        review = Review.objects.get(title='Unrelated')
+        review.summary = 'Friendly staff'
+        review.save()
+        self.assertIn('Unrelated', self.search(self.staff, 'friendly+staff'))
+
+    def test_search_pagination(self):
+        for index in range(25):
+            self.submit_review(
+                f'Review {index}',
+                'Excellent ' * (1 + index % 3),
+            )
+        self.submit_review('Not a match')
+
+        titles = self.search(self.staff, 'excellent')
+        self.assertEqual(len(titles), 25)
+        self.assertEqual(len(set(titles)), 25)
+
+    def test_search_visibility(self):
+        self.submit_review('Excellent', submitter=self.staff)
+        self.submit_review('Excellent too', submitter=self.user)
+
+        self.assertEqual(len(self.search(self.staff, 'excellent')), 2)
+        self.assertEqual(self.search(self.user, 'excellent'), ['Excellent too'])
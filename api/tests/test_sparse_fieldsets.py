@@ -0,0 +1,149 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    Review,
+    Reviewer,
+    User,
+)
+
+
+# Check the queries that serve responses rather than cached responses:
+@override_settings(
+    RESPONSE_CACHE={
+        'ALIAS': 'responses',
+        'ENABLED': False,
+    },
+)
+class SparseFieldsetTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_sparse_fieldsets',
+            is_staff=True,
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        self.review = Review.objects.create(
+            submitter=self.user,
+            company=self.company,
+            reviewer=self.reviewer,
+            rating=5,
+            title='Great',
+            summary='Lorem ipsum dolor sit amet. ' * 100,
+            ip_address='192.0.2.1',
+        )
+        self.client.force_login(self.user)
+
+        self.resources = [
+            ('user', self.user.username),
+            ('company', self.company.pk),
+            ('reviewer', self.reviewer.email),
+            ('review', self.review.pk),
+        ]
+
+    def get(self, url, status=200):
+        '''
+        Get a resource and return its representation, or for lists, that of
+        its first item, along with the SQL of every query performed.
+        '''
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, status, response.content)
+
+        data = response.json()
+        if 'results' in data:
+            [data] = data['results']
+        return data, [query['sql'] for query in queries]
+
+    def urls(self, resource, lookup):
+        yield reverse(f'{self.version}:{resource}-list')
+        yield reverse(f'{self.version}:{resource}-detail', args=[lookup])
+
+    def test_sparse_fieldsets(self):
+        for compiled in [False, True]:
+            for resource, lookup in self.resources:
+                for url in self.urls(resource, lookup):
+                    with self.subTest(
+                        compiled=compiled,
+                        url=url,
+                    ), override_settings(COMPILED_SERIALIZERS=compiled):
+                        full, _ = self.get(url)
+
+                        data, _ = self.get(f'{url}?fields=self,created')
+                        self.assertEqual(
+                            data,
+                            {
+                                'self': full['self'],
+                                'created': full['created'],
+                            },
+                        )
+
+                        data, _ = self.get(f'{url}?exclude=self,created')
+                        self.assertEqual(
+                            data,
+                            {
+                                name: value
+                                for name, value in full.items()
+                                if name not in ('self', 'created')
+                            },
+                        )
+
+    def test_deferred_columns(self):
+        for compiled in [False, True]:
+            for url in self.urls('review', self.review.pk):
+                with self.subTest(
+                    compiled=compiled,
+                    url=url,
+                ), override_settings(COMPILED_SERIALIZERS=compiled):
+                    for query in ['fields=self,title,rating', 'exclude=summary']:
+                        data, queries = self.get(f'{url}?{query}')
+                        self.assertNotIn('summary', data)
+                        for sql in queries:
+                            self.assertNotIn('"summary"', sql)
+
+    def test_unknown_fields(self):
+        for resource, lookup in self.resources:
+            for url in self.urls(resource, lookup):
+                with self.subTest(url=url):
+                    errors, _ = self.get(
+                        f'{url}?fields=self,bogus&exclude=password',
+                        status=400,
+                    )
+                    self.assertEqual(
+                        errors,
+                        {
+                            'fields': ['Unknown field: bogus'],
+                            'exclude': ['Unknown field: password'],
+                        },
+                    )
+
+    def test_embedded_stats(self):
+        url = reverse(f'{self.version}:company-detail', args=[self.company.pk])
+
+        data, _ = self.get(f'{url}?embed=stats&fields=name,stats')
+        self.assertEqual(set(data), {'name', 'stats'})
+        self.assertEqual(data['stats']['count'], 1)
+
+        data, _ = self.get(f'{url}?embed=stats&exclude=stats')
+        self.assertNotIn('stats', data)
+
+    def test_submissions(self):
+        # Submissions are validated with every field, whatever the query:
+        response = self.client.post(
+            reverse(f'{self.version}:company-list') + '?fields=self',
+            {'url': 'http://example.com/'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.json())
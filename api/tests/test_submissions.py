@@ -0,0 +1,179 @@
+from io import StringIO
+from json import dumps
+
+from api.serializers import related_object_cache
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from reviews.models import (
+    Company,
+    CompanyStats,
+    Review,
+    ReviewSubmission,
+    Reviewer,
+    User,
+)
+
+
+@override_settings(
+    REVIEW_SUBMISSIONS={
+        **settings.REVIEW_SUBMISSIONS,
+        'ASYNC': True,
+    },
+)
+class ReviewSubmissionTestSuite(TestCase):
+
+    version = 'v1'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test_submissions',
+        )
+        self.other = User.objects.create(
+            username='test_submissions_other',
+        )
+        self.company = Company.objects.create(
+            name='ACME, Inc.',
+        )
+        self.reviewer = Reviewer.objects.create(
+            email='john.doe@example.com',
+        )
+        self.client.force_login(self.user)
+
+    def review(self, index):
+        return {
+            'company': reverse(
+                f'{self.version}:company-detail',
+                args=[self.company.pk],
+            ),
+            'reviewer': reverse(
+                f'{self.version}:reviewer-detail',
+                args=[self.reviewer.email],
+            ),
+            'rating': 1 + index % 5,
+            'title': f'Review {index}',
+        }
+
+    def submit(self, data, status=202):
+        response = self.client.post(
+            reverse(f'{self.version}:review-list'),
+            dumps(data),
+            content_type='application/json',
+            HTTP_ACCEPT='application/json',
+            HTTP_X_FORWARDED_FOR='192.0.2.1',
+        )
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def get(self, url, status=200):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json() if status == 200 else None
+
+    def test_submission(self):
+        response = self.submit(self.review(0))
+        submission = response.json()
+        self.assertEqual(response['Location'], submission['self'])
+        self.assertEqual(submission['status'], 'pending')
+        self.assertIsNone(submission['review'])
+        self.assertFalse(Review.objects.exists())
+
+        call_command('flush_review_submissions', once=True, stdout=StringIO())
+
+        submission = self.get(submission['self'])
+        self.assertEqual(submission['status'], 'stored')
+        review = self.get(submission['review'])
+        self.assertEqual(review['title'], 'Review 0')
+        self.assertEqual(review['created'], submission['created'])
+
+        # Submitters and addresses are assigned as in synchronous submissions:
+        review = Review.objects.get()
+        self.assertEqual(review.submitter, self.user)
+        self.assertEqual(review.ip_address, '192.0.2.1')
+        self.assertEqual(review.submission, ReviewSubmission.objects.get())
+
+        # Only submitters and administrators can see submissions:
+        self.client.force_login(self.other)
+        self.get(submission['self'], status=403)
+        page = self.get(reverse(f'{self.version}:reviewsubmission-list'))
+        self.assertEqual(page['results'], [])
+
+    def test_batch_submission(self):
+        submissions = self.submit([self.review(index) for index in range(25)])
+        self.assertEqual(len(submissions.json()), 25)
+
+        # Batches are stored in order with a constant number of queries, i.e.
+        # a savepoint and its release, and the selection, insertion, company
+        # statistics update and submission update for the batch:
+        with self.assertNumQueries(6):
+            self.assertEqual(ReviewSubmission.flush(batch_size=20), 20)
+        self.assertEqual(ReviewSubmission.flush(batch_size=20), 5)
+        self.assertEqual(ReviewSubmission.flush(batch_size=20), 0)
+
+        self.assertEqual(
+            list(
+                Review.objects
+                .order_by('submission__pk')
+                .values_list('title', flat=True)
+            ),
+            [f'Review {index}' for index in range(25)],
+        )
+        stats = CompanyStats.objects.get(company=self.company)
+        self.assertEqual(stats.count, 25)
+        self.assertEqual(stats.total, 75)
+
+    def test_indexes(self):
+        # Only the review link is indexed, to keep appending to the queue cheap:
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor,
+                ReviewSubmission._meta.db_table,
+            )
+        self.assertEqual(
+            [
+                constraint['columns']
+                for constraint in constraints.values()
+                if (constraint['index'] or constraint['unique'])
+                and not constraint['primary_key']
+            ],
+            [['review_id']],
+        )
+
+    def test_invalid_submission(self):
+        self.submit({**self.review(0), 'rating': 6}, status=400)
+        self.submit([self.review(0), {}], status=400)
+        self.assertFalse(ReviewSubmission.objects.exists())
+
+    def test_stale_related_objects(self):
+        review = {
+            **self.review(0),
+            'company': reverse(f'{self.version}:company-detail', args=[0]),
+        }
+
+        # Foreign keys are checked as rows are inserted, as they are when
+        # transactions are committed outside of tests:
+        with connection.cursor() as cursor:
+            cursor.execute('set constraints all immediate')
+
+        # Companies deleted by other processes may still be cached by this one,
+        # like this one that never existed:
+        for asynchronous in [True, False]:
+            with self.subTest(asynchronous=asynchronous), override_settings(
+                REVIEW_SUBMISSIONS={
+                    **settings.REVIEW_SUBMISSIONS,
+                    'ASYNC': asynchronous,
+                },
+            ):
+                related_object_cache.set(
+                    (Company, 0),
+                    Company(pk=0, name='Deleted'),
+                )
+                response = self.submit(review, status=400)
+                self.assertIn('company', response.json())
+                self.assertIsNone(related_object_cache.get((Company, 0)))
+
+        self.assertFalse(ReviewSubmission.objects.exists())
+        self.assertFalse(Review.objects.exists())
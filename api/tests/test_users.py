@@ -5,8 +5,7 @@ from api.strategies import (
 )
 
 from api.testcase import GabbiHypothesisTestCase
-from api.utils.database import delete_all
-from django.db.transaction import commit
+from api.utils.database import load_fixtures
 from django.urls import reverse
 
 from hypothesis import (
@@ -18,23 +17,16 @@ from hypothesis import (
 
 from hypothesis.strategies import booleans
 from requests.auth import _basic_auth_str
-from rest_framework.authtoken.models import Token
-from reviews.models import User
 
 
 class UserTestSuite(GabbiHypothesisTestCase):
-    fixtures = [
-        'test_admin',
-        'test_nonadmin',
-    ]
 
     version = 'v1'
 
-    # For performance, disable truncation of the entire database and clear only
-    # modified tables here:
-    def _fixture_teardown(self):
-        delete_all(Token)
-        delete_all(User)
+    # Users with known passwords:
+    @classmethod
+    def setUpTestData(cls):
+        load_fixtures('test_admin', 'test_nonadmin')
 
     @given(
         username=usernames,
@@ -84,10 +76,6 @@ class UserTestSuite(GabbiHypothesisTestCase):
             password=password,
         )
 
-        # This ensures the admin user provided by fixtures is actually available
-        # to other requests:
-        commit()
-
         self.run_gabbi(
             {
                 'tests': [
@@ -4,6 +4,7 @@ from api.views import (
     UserViewSet,
     CompanyViewSet,
     ReviewViewSet,
+    ReviewSubmissionViewSet,
     ReviewerViewSet,
 )
 
@@ -25,3 +26,4 @@ router.register('user', UserViewSet)
 router.register('company', CompanyViewSet)
 router.register('reviewer', ReviewerViewSet)
 router.register('review', ReviewViewSet)
+router.register('submission', ReviewSubmissionViewSet)
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.core.cache import caches
+
+
+class LRUCache:
+    '''
+    Bounded in-memory mapping that evicts its least recently used entries when
+    full.  Entries may optionally expire after a fixed time to live, given as a
+    timedelta.  Access is serialized with a lock, so a single cache can be
+    shared by the threads of a worker process.  Hit and miss counters are kept
+    for monitoring.
+    '''
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl.total_seconds() if ttl else None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expiration = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expiration is not None and expiration <= monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        expiration = None if self.ttl is None else monotonic() + self.ttl
+
+        with self._lock:
+            self._entries[key] = (value, expiration)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate):
+        '''
+        Discard all entries for which predicate(key, value) is true.
+        '''
+        with self._lock:
+            for key in [
+                key
+                for key, (value, _) in self._entries.items()
+                if predicate(key, value)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    '''
+    Cache of rendered API responses stored in a Django cache backend, which
+    may be shared by several processes.  Entries for each model are keyed by
+    versions that are replaced when objects of the model change: one version
+    for all lists of the model, and one for each individual object, so that
+    changes to an object only invalidate lists and that object's own entries.
+    Stale entries are never deleted explicitly; they're left to expire or be
+    evicted by the cache backend.  Hit and miss counters are kept for
+    monitoring.
+    '''
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def hit_ratio(self):
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else None
+
+    @staticmethod
+    def make_key(*parts):
+        # Hash key parts to keep keys short and safe for any cache backend:
+        return 'response:' + md5(repr(parts).encode()).hexdigest()
+
+    def version_key(self, model, lookup_value=None):
+        return self.make_key('version', model._meta.label, lookup_value)
+
+    def version(self, model, lookup_value=None):
+        key = self.version_key(model, lookup_value)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, uuid4().hex, timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    def key(self, model, variant, lookup_value=None):
+        '''
+        Get the key for a response representing either a list of objects of a
+        model, or an individual object identified by a lookup value, in a
+        variant given by a string such as the request URL.
+        '''
+        return self.make_key(
+            model._meta.label,
+            self.version(model, lookup_value),
+            variant,
+        )
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        self.cache.set(key, entry)
+
+    def invalidate(self, model, lookup_value):
+        '''
+        Invalidate cached lists of a model and responses for an object.
+        '''
+        self.cache.delete_many([
+            self.version_key(model),
+            self.version_key(model, lookup_value),
+        ])
+
+
+def clear_caches():
+    '''
+    Clear the per-process caches of verified credentials, tokens and related
+    objects, and the response cache, e.g. after changing the database without
+    sending the signals that keep them up to date.
+    '''
+
+    # Imported here, as these modules depend on this one:
+    from api.authentication import basic_credentials_cache, token_cache
+    from api.serializers import related_object_cache
+    from api.views import response_cache
+
+    basic_credentials_cache.clear()
+    token_cache.clear()
+    related_object_cache.clear()
+    response_cache.cache.clear()
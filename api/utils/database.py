@@ -1,4 +1,17 @@
-from django.db import connection
+from functools import lru_cache
+from io import BytesIO
+from itertools import islice
+from os.path import exists, join
+from uuid import uuid4
+
+from api.utils.cache import clear_caches
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Func
+from django.db.transaction import atomic
 
 
 def delete_all(model):
@@ -14,3 +27,362 @@ def delete_all(model):
     cursor.execute(
         f'delete from "{model._meta.db_table}"',
     )
+
+
+@lru_cache()
+def has_extension(name, using=DEFAULT_DB_ALIAS):
+    '''
+    Tell whether a PostgreSQL extension is installed in a database.  Extensions
+    aren't installed or removed while the application runs, so the answer is
+    remembered for the life of the process.
+    '''
+
+    cursor = connections[using].cursor()
+    cursor.execute(
+        'select exists (select 1 from pg_extension where extname = %s)',
+        [name],
+    )
+    [[installed]] = cursor.fetchall()
+    return installed
+
+
+class Collate(Func):
+    '''
+    Apply a collation to a text expression, e.g. Collate(Upper('name'), 'C'),
+    to compare and order it as an index built with that collation does.
+    '''
+
+    template = '(%(expressions)s collate "%(collation)s")'
+
+    def __init__(self, expression, collation, **extra):
+        super().__init__(expression, collation=collation, **extra)
+
+
+def query_plan(sql, params=None):
+    '''
+    Get the plan the database would use to execute a query, as the top plan
+    node of the JSON output of the PostgreSQL EXPLAIN statement.
+    '''
+
+    cursor = connection.cursor()
+    cursor.execute(
+        f'explain (format json) {sql}',
+        params,
+    )
+    [[[plan]]] = cursor.fetchall()
+    return plan['Plan']
+
+
+def plan_nodes(plan):
+    '''
+    Iterate over every node in a query plan, depth first.
+    '''
+
+    yield plan
+    for subplan in plan.get('Plans', []):
+        yield from plan_nodes(subplan)
+
+
+def stream_values(queryset, chunk_size=2000, idle_timeout=None):
+    '''
+    Iterate over the rows of a QuerySet.values() queryset as dictionaries, read
+    in chunks through a server-side cursor.  Unlike QuerySet.iterator(), this
+    never holds more than one chunk of rows in memory, however many rows the
+    query produces.  Server-side cursors only exist within transactions, so
+    the rows are read inside one; the transaction ends when the iteration
+    finishes or the iterator is closed.  If an idle timeout is given as a
+    timedelta, the database also ends it, closing the connection, when the
+    iteration stalls for longer than that between chunks.
+    '''
+
+    query = queryset.query
+    compiler = query.get_compiler(queryset.db)
+    sql, params = compiler.as_sql()
+    names = (
+        list(query.extra_select) +
+        list(query.values_select) +
+        list(query.annotation_select)
+    )
+
+    database = connections[queryset.db]
+    with atomic(using=queryset.db):
+        if idle_timeout is not None:
+            with database.cursor() as cursor:
+                cursor.execute(
+                    'set local idle_in_transaction_session_timeout = %s',
+                    [int(idle_timeout.total_seconds() * 1000)],
+                )
+
+        with database.connection.cursor(
+            name=f'stream_{uuid4().hex}',
+        ) as cursor:
+            cursor.execute(sql, params)
+
+            def chunks():
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield rows
+
+            # Convert column values just like QuerySet.values() does:
+            for row in compiler.results_iter(chunks()):
+                yield dict(zip(names, row))
+
+
+def _copy_csv_value(value):
+    '''
+    Encode a value for COPY in CSV format.  Strings are always quoted, so that
+    empty strings aren't confused with unquoted empty values, which are NULL.
+    '''
+
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+class _RowsFile:
+    '''
+    Read-only file-like object producing the CSV encoding of an iterable of
+    rows on demand, for COPY statements to consume as they go.
+    '''
+
+    def __init__(self, rows, chunk_size):
+        self.rows = iter(rows)
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+
+    def read(self, size=-1):
+        # Encode the next chunk of rows once the previous one was consumed:
+        if self.position >= len(self.buffer):
+            self.buffer = ''.join(
+                ','.join(map(_copy_csv_value, row)) + '\n'
+                for row in islice(self.rows, self.chunk_size)
+            )
+            self.position = 0
+
+        end = len(self.buffer) if size < 0 else self.position + size
+        data = self.buffer[self.position:end]
+        self.position += len(data)
+        return data
+
+
+def copy_rows(table, columns, rows, chunk_size=1000):
+    '''
+    Quickly insert rows given as tuples of column values into a database table
+    with a single COPY FROM STDIN statement.  Rows are read from the iterable
+    and sent to the database as they're needed, so they can come from a stream
+    of any length, and None values are stored as SQL NULL.  Like delete_all,
+    this bypasses the ORM entirely: no signals are sent and no field validation
+    takes place.
+    '''
+
+    cursor = connection.cursor()
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    cursor.copy_expert(
+        f'copy "{table}" ({column_list}) from stdin with (format csv)',
+        _RowsFile(rows, chunk_size),
+        size=1 << 16,
+    )
+
+
+def dependency_order(models):
+    '''
+    Sort models so that each comes after every other given model it refers to
+    through foreign keys, keeping their given order otherwise.  Rows can then be
+    inserted into their tables in this order, and deleted in reverse.
+    '''
+
+    models = list(models)
+    ordered = []
+
+    def visit(model, path):
+        if model in ordered or model in path:
+            return
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model in models:
+                visit(field.related_model, path | {model})
+        ordered.append(model)
+
+    for model in models:
+        visit(model, frozenset())
+    return ordered
+
+
+def truncate(*models):
+    '''
+    Delete all rows from the database tables of several models at once with a
+    single TRUNCATE statement, and reset their primary key sequences.  Unlike
+    delete_all, this doesn't scan the tables nor fire row-level triggers on
+    them, so it takes the same time regardless of their sizes.  Tables with
+    foreign keys to them are emptied as well, even if their models aren't
+    given.  No signals are sent, so caches of objects are cleared instead.
+    '''
+
+    tables = ', '.join(
+        f'"{model._meta.db_table}"'
+        for model in reversed(dependency_order(models))
+    )
+    cursor = connection.cursor()
+
+    # Tables can't be truncated with foreign key checks pending on them, as
+    # they are after changes to them within a transaction, since Django makes
+    # foreign key constraints deferred:
+    cursor.execute('set constraints all immediate')
+    cursor.execute(
+        f'truncate {tables} restart identity cascade',
+    )
+    cursor.execute('set constraints all deferred')
+    clear_caches()
+
+
+def reset_sequences(*models):
+    '''
+    Set the primary key sequences of models past the largest primary keys in
+    their tables, as needed after inserting rows with explicit primary keys.
+    '''
+
+    cursor = connection.cursor()
+    for statement in connection.ops.sequence_reset_sql(no_style(), models):
+        cursor.execute(statement)
+
+
+class Snapshot:
+    '''
+    Contents of the database tables of several models, copied into in-memory
+    buffers in the binary COPY format of PostgreSQL.  Snapshots of data seeded
+    once can be restored repeatedly much faster than the data could be seeded
+    again through the ORM, with a TRUNCATE and a COPY statement for each table.
+    Like copy_rows, restoring a snapshot sends no signals, but fires database
+    triggers on each row.
+    '''
+
+    def __init__(self, *models):
+        self.models = dependency_order(models)
+        self.buffers = {}
+        cursor = connection.cursor()
+        for model in self.models:
+            buffer = BytesIO()
+            cursor.copy_expert(
+                f'copy "{model._meta.db_table}" to stdout '
+                'with (format binary)',
+                buffer,
+            )
+            self.buffers[model] = buffer
+
+    def restore(self):
+        '''
+        Replace the contents of the tables with those in the snapshot.  Tables
+        with foreign keys to them are emptied, so they should be included in
+        the snapshot as well.
+        '''
+
+        truncate(*self.models)
+        cursor = connection.cursor()
+        for model in self.models:
+            buffer = self.buffers[model]
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'copy "{model._meta.db_table}" from stdin '
+                'with (format binary)',
+                buffer,
+            )
+        reset_sequences(*self.models)
+
+
+def fixture_path(name):
+    '''
+    Find a JSON fixture file by name in the fixtures directories of installed
+    applications or in FIXTURE_DIRS, as the loaddata command does.
+    '''
+
+    for directory in [
+        *(
+            join(app_config.path, 'fixtures')
+            for app_config in apps.get_app_configs()
+        ),
+        *settings.FIXTURE_DIRS,
+    ]:
+        path = join(directory, f'{name}.json')
+        if exists(path):
+            return path
+    raise ValueError(f'Fixture {name} not found')
+
+
+def load_fixtures(*names):
+    '''
+    Load JSON fixtures like the loaddata command, but with a single COPY
+    statement for each table rather than saving every object through the ORM.
+    Field values are stored as given in the fixtures, and no signals are sent,
+    so objects that post_save receivers would create along with new users and
+    companies are created here instead, unless they exist already, and caches
+    of objects are cleared.  Primary key sequences are reset afterwards.
+    '''
+
+    # Imported here, so that this module can be imported before applications
+    # are loaded:
+    from rest_framework.authtoken.models import Token
+    from reviews.models import Company, CompanyStats, User
+
+    objects = {}
+    relations = {}
+    for name in names:
+        with open(fixture_path(name)) as file:
+            for deserialized in serializers.deserialize('json', file):
+                instance = deserialized.object
+                objects.setdefault(type(instance), []).append(instance)
+
+                # Rows of many-to-many relations go into their own tables:
+                for field_name, values in deserialized.m2m_data.items():
+                    field = instance._meta.get_field(field_name)
+                    through = field.remote_field.through
+                    relations.setdefault(through, []).extend(
+                        through(**{
+                            f'{field.m2m_field_name()}_id': instance.pk,
+                            f'{field.m2m_reverse_field_name()}_id': value,
+                        })
+                        for value in values
+                    )
+
+    objects.update(relations)
+    models = dependency_order(objects)
+    for model in models:
+        fields = model._meta.concrete_fields
+        copy_rows(
+            model._meta.db_table,
+            [field.column for field in fields],
+            (
+                [
+                    field.get_db_prep_save(
+                        getattr(instance, field.attname),
+                        connection=connection,
+                    )
+                    for field in fields
+                ]
+                for instance in objects[model]
+            ),
+        )
+    reset_sequences(*models)
+
+    # See create_auth_token and create_company_stats in reviews.models:
+    users = {user.pk for user in objects.get(User, [])}
+    if users:
+        users -= set(
+            Token.objects
+            .filter(user__in=users)
+            .values_list('user', flat=True)
+        )
+        Token.objects.bulk_create(
+            Token(key=Token().generate_key(), user_id=user)
+            for user in sorted(users)
+        )
+    if Company in objects:
+        CompanyStats.create_missing(
+            company.pk
+            for company in objects[Company]
+        )
+
+    clear_caches()
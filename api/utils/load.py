@@ -0,0 +1,190 @@
+'''
+HTTP load generation against the application running under gunicorn: start a
+server on a local address, send requests to it from concurrent clients over
+keep-alive connections, and summarize the latencies and errors of the
+responses by operation.  Used by the loadtest command and the server
+benchmark.
+'''
+
+from collections import namedtuple
+from contextlib import contextmanager
+from http.client import HTTPConnection, HTTPException
+from os import environ
+from socket import create_connection
+from subprocess import DEVNULL, Popen
+from sys import executable
+from threading import Thread
+from time import monotonic, perf_counter, sleep
+
+
+# Requests are made of an operation name, under which their responses are
+# summarized, an HTTP method, a path, headers and an optional body:
+Request = namedtuple('Request', 'operation method path headers body')
+
+# Responses carry the operation of their request, their latency in seconds,
+# and their status code, or None if the request failed before a response:
+Sample = namedtuple('Sample', 'operation latency status')
+
+
+@contextmanager
+def serve(address, **environment):
+    '''
+    Run the application under gunicorn with its configuration file, listening
+    on a local (host, port) address, with additional environment variables,
+    e.g. GUNICORN_WORKERS, until the block exits.
+    '''
+
+    server = Popen(
+        [
+            executable,
+            '-c',
+            'from gunicorn.app.wsgiapp import run; run()',
+            '--config=config/gunicorn.py',
+            'reviews.wsgi',
+        ],
+        env={
+            **environ,
+            'GUNICORN_BIND': '{}:{}'.format(*address),
+            **environment,
+        },
+        stdout=DEVNULL,
+    )
+
+    try:
+        deadline = monotonic() + 60
+        while True:
+            try:
+                create_connection(address).close()
+                break
+            except OSError:
+                if server.poll() is not None or monotonic() > deadline:
+                    raise RuntimeError('The server did not start')
+                sleep(0.1)
+
+        yield server
+
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def generate(address, clients, duration, requests):
+    '''
+    Send requests from concurrent clients, each with a connection of its own,
+    for a duration in seconds, and return a sample for each response.  The
+    requests of each client are taken from the iterator returned by calling
+    requests with the index of the client.
+    '''
+
+    samples = []
+    deadline = monotonic() + duration
+
+    def client(index):
+        connection = HTTPConnection(*address)
+        for request in requests(index):
+            if monotonic() >= deadline:
+                break
+            start = perf_counter()
+            try:
+                connection.request(
+                    request.method,
+                    request.path,
+                    body=request.body,
+                    headers=request.headers,
+                )
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (HTTPException, OSError):
+                connection.close()
+                status = None
+            samples.append(Sample(
+                request.operation,
+                perf_counter() - start,
+                status,
+            ))
+        connection.close()
+
+    threads = [
+        Thread(target=client, args=[index])
+        for index in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples
+
+
+def percentile(latencies, fraction):
+    '''
+    Get a percentile of sorted latencies, by the nearest rank method.
+    '''
+    if not latencies:
+        return None
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def successful(status):
+    return 200 <= status < 300
+
+
+def summarize(samples, duration, successful=successful):
+    '''
+    Summarize samples by operation, and for every operation together, as rows
+    with the operation name, number of requests, throughput of successful
+    responses per second, the median, 95th and 99th percentile latencies of
+    successful responses in milliseconds, and the percentage of errors, i.e.
+    failed requests and unsuccessful responses.
+    '''
+
+    operations = sorted({sample.operation for sample in samples})
+    rows = []
+
+    for operation, selected in [
+        *(
+            (
+                operation,
+                [
+                    sample
+                    for sample in samples
+                    if sample.operation == operation
+                ],
+            )
+            for operation in operations
+        ),
+        ('total', samples),
+    ]:
+        latencies = sorted(
+            sample.latency
+            for sample in selected
+            if sample.status is not None and successful(sample.status)
+        )
+        errors = len(selected) - len(latencies)
+        rows.append([
+            operation,
+            len(selected),
+            f'{len(latencies) / duration:.1f}',
+            *(
+                '' if latency is None else f'{latency * 1000:.1f}'
+                for latency in (
+                    percentile(latencies, fraction)
+                    for fraction in [0.5, 0.95, 0.99]
+                )
+            ),
+            f'{100 * errors / len(selected):.1f}' if selected else '',
+        ])
+
+    return rows
+
+
+summary_headers = [
+    'operation',
+    'requests',
+    'ok/s',
+    'p50 ms',
+    'p95 ms',
+    'p99 ms',
+    'errors %',
+]
@@ -1,29 +1,424 @@
+from api.authentication import get_user
+from api.compiled import CompiledSerializer
+
 from api.filters import (
+    CompanyNameFilterBackend,
     ReviewFilterBackend,
+    ReviewFilterSet,
+    ReviewSearchFilterBackend,
     UserFilterBackend,
+    ValidatingFilterBackend,
 )
 
+from api.metrics import exposition, get_timings, metrics
+from api.renderers import CSVRenderer, NDJSONRenderer
+from api.utils.cache import ResponseCache
+from api.utils.database import has_extension, stream_values
+
 from api.serializers import (
     CompanySerializer,
+    CompanyStatsSerializer,
     ReviewSerializer,
+    ReviewSubmissionSerializer,
     ReviewerSerializer,
     UserSerializer,
 )
 
+from calendar import timegm
+from copy import copy
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramDistance
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Count, F, Max
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.db.transaction import atomic, on_commit
+from django.dispatch import receiver
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag,
+)
 from dry_rest_permissions.generics import DRYPermissions, DRYObjectPermissions
 from ipware.ip import get_ip
 
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from rest_framework.status import HTTP_202_ACCEPTED
+from rest_framework.views import APIView
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from reviews.models import (
     Company,
+    CompanyStats,
     Review,
+    ReviewSubmission,
     Reviewer,
     User,
 )
 
 
-class UserViewSet(ModelViewSet):
+def ordering_fields(view, queryset):
+    '''
+    Get the names of the fields a view's paginator orders a list by, whose
+    values it needs in order to build cursors when pages are read with
+    QuerySet.values().
+    '''
+    paginator = view.paginator
+    if hasattr(paginator, 'get_ordering'):
+        ordering = paginator.get_ordering(view.request, queryset, view)
+    else:
+        ordering = getattr(paginator, 'ordering', ())
+    if isinstance(ordering, str):
+        ordering = (ordering, )
+    return [field.lstrip('-') for field in ordering]
+
+
+class TimedViewMixin:
+    '''
+    Time the authentication, permission checks, serialization and rendering of
+    requests for api.metrics.MetricsMiddleware.  Serialization covers the work
+    of view handlers other than permission checks, from validation and
+    queries to representation.  Responses are rendered here instead of after
+    the view returns, so that rendering can be timed.
+    '''
+
+    def perform_authentication(self, request):
+        with get_timings(request).timing('authentication'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with get_timings(request).timing('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with get_timings(request).timing('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        get_timings(request).switch('serialization')
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timings = get_timings(request)
+        timings.switch('rendering')
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs
+        )
+        if isinstance(response, SimpleTemplateResponse):
+            response.render()
+        timings.switch(None)
+        return response
+
+
+class CompiledListModelMixin:
+    '''
+    Serve list pages through a compiled serializer when enabled with the
+    COMPILED_SERIALIZERS setting.  Rows are read with QuerySet.values() and
+    serialized without building model instances; the output is the same as
+    that of the regular serializer.  Lists that can't be compiled are served
+    by the regular serializer.
+    '''
+
+    def list(self, request, *args, **kwargs):
+
+        if not settings.COMPILED_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        serializer = CompiledSerializer.compile(
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+        )
+        if serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = serializer.values(
+            queryset,
+            *ordering_fields(self, queryset)
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.represent(page))
+
+        return Response(serializer.represent(queryset))
+
+
+class ConditionalGetMixin:
+    '''
+    Support conditional requests for individual resources and lists with
+    validators derived from modification times.  Individual resources are
+    validated by their primary key and modification time, with ETag and
+    Last-Modified.  List pages are validated by the primary keys and latest
+    modification time of the objects in the page, which are read with a single
+    query over the same index range as the page itself, so validation stays
+    cheap however long the list is; unpaginated lists are validated by the
+    latest modification time and number of objects in the list.  Lists are
+    only validated with ETag, as the latest modification time of the objects
+    in a list goes back when objects are removed from it.  Requests with
+    matching If-None-Match or If-Modified-Since headers are answered with 304
+    Not Modified before resources are serialized, and for lists, before full
+    rows are loaded.
+    '''
+
+    # Get the time an object was last modified as far as its representation is
+    # concerned, as an expression for lists and from an instance for details:
+
+    def get_last_modified_expression(self):
+        return F('modified')
+
+    def get_last_modified(self, instance):
+        return instance.modified
+
+    def get_validators(self, last_modified, *values):
+        # Representations also vary with the exact URL requested, which covers
+        # pagination cursors, embedding and format suffixes, as well as with the
+        # negotiated media type and the requesting user:
+        request = self.request
+        etag = md5(repr((
+            last_modified,
+            *values,
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            request.version,
+            request.user.pk,
+        )).encode()).hexdigest()
+
+        if last_modified is not None:
+            last_modified = timegm(last_modified.utctimetuple())
+
+        return etag, last_modified
+
+    def conditional_response(self, etag, last_modified, get_response):
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is None:
+            response = get_response()
+
+        response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_validators(
+            self.get_last_modified(instance),
+            instance.pk,
+        )
+        return self.conditional_response(
+            etag,
+            last_modified,
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).annotate(
+            validator_last_modified=self.get_last_modified_expression(),
+        )
+
+        page = self.paginate_queryset(queryset.values(
+            'pk',
+            'validator_last_modified',
+            *ordering_fields(self, queryset)
+        ))
+
+        if page is None:
+            summary = queryset.aggregate(
+                last_modified=Max('validator_last_modified'),
+                count=Count('pk'),
+            )
+            etag, _ = self.get_validators(
+                summary['last_modified'],
+                summary['count'],
+            )
+
+        else:
+            # Pages also change when objects are added or removed around them,
+            # which shows in their links to adjacent pages:
+            etag, _ = self.get_validators(
+                max(
+                    (row['validator_last_modified'] for row in page),
+                    default=None,
+                ),
+                [row['pk'] for row in page],
+                self.paginator.get_next_link(),
+                self.paginator.get_previous_link(),
+            )
+
+        return self.conditional_response(
+            etag,
+            None,
+            lambda: super(ConditionalGetMixin, self).list(
+                request,
+                *args,
+                **kwargs
+            ),
+        )
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE['ALIAS'])
+
+
+class CachedResponseMixin:
+    '''
+    Cache rendered JSON list pages and individual resources in the response
+    cache when enabled with the RESPONSE_CACHE setting.  Entries are keyed by
+    the absolute request URL, which includes pagination cursors, along with
+    the API version, and they're invalidated as objects are saved or deleted;
+    see invalidate_cached_responses.  This must only be used for resources
+    that every user may read and that are represented the same way for every
+    user, as cached responses are shared by all users.  The viewset lookup
+    field must be the model primary key.  Conditional requests are answered
+    from the validators of cached responses.
+    '''
+
+    response_cache_validators = ['ETag', 'Last-Modified']
+
+    def is_response_cacheable(self):
+        return (
+            settings.RESPONSE_CACHE['ENABLED']
+            and self.request.accepted_renderer.format == 'json'
+        )
+
+    def get_response_cache_key(self):
+        model = self.get_queryset().model
+        lookup_value = None
+
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                lookup_value = model._meta.pk.to_python(
+                    self.kwargs[lookup_url_kwarg],
+                )
+            except ValidationError:
+                return None
+
+        return response_cache.key(
+            model,
+            (
+                self.request.build_absolute_uri(),
+                self.request.version,
+                self.request.accepted_media_type,
+            ),
+            lookup_value,
+        )
+
+    def cached_response(self, get_response, request, *args, **kwargs):
+        self.response_cache_key = (
+            self.get_response_cache_key()
+            if self.is_response_cacheable()
+            else None
+        )
+        if self.response_cache_key is None:
+            return get_response(request, *args, **kwargs)
+
+        entry = response_cache.get(self.response_cache_key)
+        if entry is None:
+            return get_response(request, *args, **kwargs)
+
+        content, content_type, validators = entry
+        etags = parse_etags(validators.get('ETag', ''))
+        response = get_conditional_response(
+            request,
+            etag=etags[0] if etags else None,
+            last_modified=parse_http_date_safe(
+                validators.get('Last-Modified', ''),
+            ),
+        ) or HttpResponse(content, content_type=content_type)
+
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs
+        )
+
+    # Store responses once they're ready to be rendered:
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs
+        )
+
+        if (
+            getattr(self, 'response_cache_key', None) is not None
+            and isinstance(response, Response)
+            and response.status_code == 200
+        ):
+            response.render()
+            response_cache.set(
+                self.response_cache_key,
+                (
+                    response.content,
+                    response['Content-Type'],
+                    {
+                        header: response[header]
+                        for header in self.response_cache_validators
+                        if response.has_header(header)
+                    },
+                ),
+            )
+
+        return response
+
+
+class SparseQuerysetMixin:
+    '''
+    Load only the model fields needed to represent objects when lists and
+    individual resources are narrowed to sparse fieldsets with the fields and
+    exclude query parameters; see api.serializers.SparseFieldsetMixin.  Model
+    fields used by views themselves, e.g. for conditional requests, cursors
+    and permission checks, are listed in sparse_fieldset_columns.
+    '''
+
+    sparse_fieldset_columns = ('created', 'modified')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            columns = self.get_serializer().sparse_columns
+            if columns is not None:
+                queryset = queryset.only(
+                    *columns,
+                    *self.sparse_fieldset_columns
+                )
+        return queryset
+
+
+class UserViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    SparseQuerysetMixin,
+    ModelViewSet,
+):
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -43,14 +438,122 @@ class UserViewSet(ModelViewSet):
     lookup_value_regex = '[^/?]+'
 
 
-class CompanyViewSet(ModelViewSet):
+class CompanyViewSet(
+    TimedViewMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    CompiledListModelMixin,
+    SparseQuerysetMixin,
+    ModelViewSet,
+):
 
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     __doc__ = serializer_class.Meta.model.__doc__
 
+    filter_backends = (CompanyNameFilterBackend, )
+
+    # Fetch statistics along with companies when they're requested or embedded
+    # in company representations with ?embed=stats to avoid extra queries:
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if (
+            self.action == 'stats' or
+            self.serializer_class.embeds_stats(self.request)
+        ):
+            queryset = queryset.select_related('stats')
+        return queryset
+
+    # Embedded statistics change without modifying their company, so responses
+    # with them aren't cached, and their modification times are validated too:
+
+    def is_response_cacheable(self):
+        return (
+            super().is_response_cacheable()
+            and not self.serializer_class.embeds_stats(self.request)
+        )
+
+    def get_last_modified_expression(self):
+        if self.serializer_class.embeds_stats(self.request):
+            return Greatest('modified', 'stats__modified')
+        return super().get_last_modified_expression()
+
+    def get_last_modified(self, instance):
+        if self.serializer_class.embeds_stats(self.request):
+            return max(
+                instance.modified,
+                CompanyStats.get_for(instance).modified,
+            )
+        return super().get_last_modified(instance)
+
+    # Rating statistics for the reviews of a company:
+    @detail_route(
+        methods=['get'],
+    )
+    def stats(self, request, *args, **kwargs):
+        serializer = CompanyStatsSerializer(
+            CompanyStats.get_for(self.get_object()),
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
+    # Suggest companies whose names start with the given text for choosing a
+    # company as its name is typed, e.g. /v1/company/autocomplete?prefix=acm.
+    # Suggestions are compact, with just the hyperlink and name of each company.
+    # They're read in alphabetical order from the company name prefix index,
+    # and if too few names start with the given text and the database supports
+    # trigram matching, they're followed by the closest similar names:
+    @list_route(
+        methods=['get'],
+    )
+    def autocomplete(self, request, *args, **kwargs):
+        prefix = request.query_params.get('prefix', '').strip()
+        size = self.autocomplete_size
+        suggestions = []
+
+        if prefix:
+            queryset = self.get_queryset()
+            suggestions = list(
+                CompanyNameFilterBackend.annotate_name_key(queryset)
+                .filter(name_key__startswith=prefix.upper())
+                .order_by('name_key')
+                .values('pk', 'name')
+                [:size]
+            )
+
+            if len(suggestions) < size and has_extension('pg_trgm'):
+                suggestions.extend(
+                    queryset
+                    .filter(name__trigram_similar=prefix)
+                    .exclude(pk__in=[company['pk'] for company in suggestions])
+                    .order_by(TrigramDistance('name', prefix))
+                    .values('pk', 'name')
+                    [:size - len(suggestions)]
+                )
 
-class ReviewerViewSet(ModelViewSet):
+        return Response([
+            {
+                'self': reverse(
+                    'company-detail',
+                    args=[company['pk']],
+                    request=request,
+                ),
+                'name': company['name'],
+            }
+            for company in suggestions
+        ])
+
+    autocomplete_size = 10
+
+
+class ReviewerViewSet(
+    TimedViewMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    CompiledListModelMixin,
+    SparseQuerysetMixin,
+    ModelViewSet,
+):
 
     queryset = Reviewer.objects.all()
     serializer_class = ReviewerSerializer
@@ -70,24 +573,211 @@ class ReviewerViewSet(ModelViewSet):
     lookup_value_regex = '[^/?]+'
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    CompiledListModelMixin,
+    SparseQuerysetMixin,
+    ModelViewSet,
+):
 
-    queryset = Review.objects.all()
+    # Search documents are only needed in queries, not in responses:
+    queryset = Review.objects.defer('search')
     serializer_class = ReviewSerializer
     __doc__ = serializer_class.Meta.model.__doc__
 
-    filter_backends = (ReviewFilterBackend, )
+    # Visibility rules apply before any filters requested by clients:
+    filter_backends = (
+        ReviewFilterBackend,
+        ReviewSearchFilterBackend,
+        ValidatingFilterBackend,
+    )
+    filter_class = ReviewFilterSet
+
+    # Permissions to read reviews depend on their submitters:
+    sparse_fieldset_columns = (
+        SparseQuerysetMixin.sparse_fieldset_columns + ('submitter', )
+    )
     permission_classes = (DRYObjectPermissions, )
 
+    # Accept submission of either a single review or a list of reviews.  Lists
+    # of reviews are validated and inserted in bulk, and validation errors are
+    # reported for each item in a list of the same length as the submission:
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'create' and isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
     # Customize new review submission:
-    def perform_create(self, serializer):
-        serializer.save(
+    def get_submission_attributes(self):
+        return {
 
             # Get the IP address from request headers; see
             # https://github.com/un33k/django-ipware
-            ip_address=get_ip(self.request),
+            'ip_address': get_ip(self.request),
 
             # Auto-assign review submitter from the submission request user:
-            submitter=self.request.user,
+            'submitter': get_user(self.request.user),
+
+        }
+
+    def perform_create(self, serializer):
+        serializer.save(**self.get_submission_attributes())
+
+    # Companies and reviewers referred to by submissions may be served from the
+    # per-process related object cache after another process deleted them, so
+    # that storing the submission violates a foreign key constraint.  The cached
+    # objects used by the request are then discarded and the submission handled
+    # again, so that it's rejected for referring to objects that don't exist:
+    def create(self, request, *args, **kwargs):
+        try:
+            with atomic():
+                return self.submit(request, *args, **kwargs)
+        except IntegrityError:
+            resolver = getattr(request, 'related_object_resolver', None)
+            if resolver is None or not resolver.discard_cached():
+                raise
+
+        del request.related_object_resolver
+        with atomic():
+            return self.submit(request, *args, **kwargs)
 
+    # With asynchronous submission enabled by the REVIEW_SUBMISSIONS setting,
+    # reviews are validated and queued with a single insertion, and stored
+    # later in batches; see ReviewSubmission.  The response carries the status
+    # of each submission, which links to its review once it's stored:
+    def submit(self, request, *args, **kwargs):
+
+        if not settings.REVIEW_SUBMISSIONS['ASYNC']:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        many = isinstance(serializer.validated_data, list)
+        attributes = self.get_submission_attributes()
+        submissions = ReviewSubmission.objects.bulk_create([
+            ReviewSubmission(**attrs, **attributes)
+            for attrs in (
+                serializer.validated_data
+                if many
+                else [serializer.validated_data]
+            )
+        ])
+
+        submitted = ReviewSubmissionSerializer(
+            submissions if many else submissions[0],
+            many=many,
+            context=self.get_serializer_context(),
+        )
+        return Response(
+            submitted.data,
+            status=HTTP_202_ACCEPTED,
+            headers={} if many else {'Location': submitted.data['self']},
+        )
+
+    # Export every review visible to the requesting user in a single response,
+    # e.g. /v1/review/export?format=csv, as newline-delimited JSON by default.
+    # Reviews are read from the database in chunks through a server-side cursor
+    # and serialized by a compiled serializer as the response is streamed, so
+    # memory use stays flat regardless of the number of exported reviews.  The
+    # cursor holds a transaction and a database connection open until the
+    # response is sent, so exports to clients that stop reading are ended after
+    # a while; see EXPORTS in reviews/settings.py:
+    @list_route(
+        methods=['get'],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request, *args, **kwargs):
+
+        # Review serializers are always compilable; see api.compiled:
+        serializer = CompiledSerializer.compile(
+            self.get_serializer_class(),
+            self.get_serializer_context(),
         )
+
+        rows = stream_values(
+            serializer.values(
+                self.filter_queryset(self.get_queryset()).order_by('-created'),
+            ),
+            chunk_size=self.export_chunk_size,
+            idle_timeout=settings.EXPORTS['IDLE_TIMEOUT'],
+        )
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(
+                serializer.to_representation(row)
+                for row in rows
+            ),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="reviews.{renderer.format}"'
+        )
+        return response
+
+    export_chunk_size = 2000
+
+    # Hyperlinks in exports refer to the regular representations of resources,
+    # so they mustn't carry over the format query parameter that selects the
+    # export format:
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'export':
+            # Hyperlinks are reversed with the underlying Django request, which
+            # only needs to carry versioning information in addition:
+            request = copy(self.request._request)
+            request.GET = request.GET.copy()
+            request.GET.pop(api_settings.URL_FORMAT_OVERRIDE, None)
+            request.version = self.request.version
+            request.versioning_scheme = self.request.versioning_scheme
+            context['request'] = request
+        return context
+
+
+class ReviewSubmissionViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    ReadOnlyModelViewSet,
+):
+
+    queryset = ReviewSubmission.objects.all()
+    serializer_class = ReviewSubmissionSerializer
+    __doc__ = serializer_class.Meta.model.__doc__
+
+    # Submissions are visible to the same users as the reviews they become:
+    filter_backends = (ReviewFilterBackend, )
+    permission_classes = (DRYObjectPermissions, )
+
+
+class MetricsView(APIView):
+    '''
+    Request latency histograms by view and phase, database query counts, and
+    database connection pool and response cache counters of every server
+    process, in the Prometheus text format; see api.metrics.
+    '''
+
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            exposition(metrics.collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+# Invalidate cached responses for companies and reviewers as they change, both
+# right away and once the change is committed, so that responses cached from
+# the previous state by concurrent requests in the meantime are discarded too:
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Reviewer)
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Reviewer)
+def invalidate_cached_responses(sender, instance=None, **kwargs):
+
+    def invalidate():
+        response_cache.invalidate(sender, instance.pk)
+
+    invalidate()
+    on_commit(invalidate)
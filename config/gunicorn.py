@@ -1,2 +1,98 @@
-bind = ['0.0.0.0:80']
+from os import environ, getpid, sched_getaffinity
+from shutil import rmtree
+from tempfile import mkdtemp
+
+
+bind = [environ.get('GUNICORN_BIND', '0.0.0.0:80')]
 logconfig = 'config/logging.conf'
+
+
+# Requests spend most of their time waiting for the database, so each worker
+# process serves several requests at once with threads, and there are a couple
+# of workers per processor core available to this container to use the cores
+# while other workers wait.  Each worker keeps a database connection pool that
+# must have room for a connection per thread; see DATABASE_POOL_SIZE in
+# reviews/settings.py.
+cores = len(sched_getaffinity(0))
+workers = int(environ.get('GUNICORN_WORKERS', 2 * cores + 1))
+worker_class = environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(environ.get('GUNICORN_THREADS', 4))
+
+# Threaded workers keep client connections open between requests:
+keepalive = int(environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+
+# Import the application once before forking workers, so they start faster and
+# share the memory of the imported code:
+preload_app = environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+# Replace each worker after it serves a number of requests, to bound memory
+# growth from fragmentation and per-process caches.  The limit varies randomly
+# by worker so that workers aren't all replaced at the same time:
+max_requests = int(environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+
+# Workers must not inherit database connections opened by the server process
+# while the application was preloaded, as connections can't be shared across
+# processes:
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        from django.db import connections
+        from reviews.backends.postgresql_pool.base import clear_pools
+        connections.close_all()
+        clear_pools()
+
+
+# Workers share their metrics through files in a directory (see api.metrics),
+# which is a temporary one unless METRICS_DIRECTORY is given.  Files left over
+# from previous runs are removed on start, and each worker merges its metrics
+# into those of exited workers as it exits.  The server process reads the
+# settings for that even if it doesn't load the application:
+
+environ.setdefault('DJANGO_SETTINGS_MODULE', 'reviews.settings')
+
+if 'METRICS_DIRECTORY' not in environ:
+    environ['METRICS_DIRECTORY'] = mkdtemp(prefix='reviews-metrics-')
+    temporary_metrics_directory = environ['METRICS_DIRECTORY']
+else:
+    temporary_metrics_directory = None
+
+
+# Workers can only share the response cache (see RESPONSE_CACHE in
+# reviews/settings.py) through a backend that adds keys atomically, such as
+# memcached, as they must agree on the versions under which responses are
+# cached; see api.utils.cache.ResponseCache.  A cache in the memory of each
+# worker would only be invalidated by changes made through that worker, so
+# response caching is disabled when there's more than one worker and no such
+# backend is given with RESPONSE_CACHE_BACKEND:
+
+shared_response_cache_backends = (
+    'django.core.cache.backends.memcached.',
+    'django_redis.',
+)
+
+if workers > 1 and not environ.get('RESPONSE_CACHE_BACKEND', '').startswith(
+    shared_response_cache_backends,
+):
+    environ['RESPONSE_CACHE'] = 'False'
+
+
+def on_starting(server):
+    from api.metrics import metrics
+    metrics.clear()
+
+
+# This is also called by the server process for workers that are already gone:
+def worker_exit(server, worker):
+    if worker.pid == getpid():
+        from api.metrics import metrics
+        metrics.archive()
+
+
+def on_exit(server):
+    if temporary_metrics_directory is not None:
+        rmtree(temporary_metrics_directory, ignore_errors=True)
@@ -0,0 +1,393 @@
+'''
+PostgreSQL database backend that keeps a bounded pool of open connections in
+each process and hands them out to the database connections of its threads,
+instead of connecting to the database for every request and disconnecting
+afterwards.  Pool options are given in the POOL key of the database settings:
+
+*   MAX_SIZE: maximum number of connections open at once by each process;
+    zero disables pooling, so connections are opened and closed as usual;
+*   MAX_AGE: timedelta after which connections are closed instead of reused;
+*   CHECK_AFTER: timedelta after which idle connections are checked with a
+    query before they're reused;
+*   TIMEOUT: timedelta to wait for a connection when all of them are in use,
+    after which an OperationalError is raised.
+
+Connections are returned to the pool whenever Django closes them, which with
+the default CONN_MAX_AGE of zero happens at the end of every request.
+
+Queries run through Django cursors are also counted and timed, in the
+query_count and query_time attributes of database connections, for
+per-request instrumentation; see api.metrics.
+'''
+
+from collections import deque
+from os import getpid
+from threading import Condition, Lock
+from time import monotonic, perf_counter
+
+from django.db.backends.postgresql.base import (
+    DatabaseWrapper as PostgreSQLDatabaseWrapper,
+)
+from django.db.backends.postgresql.creation import (
+    DatabaseCreation as PostgreSQLDatabaseCreation,
+)
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+from django.db.utils import OperationalError
+from psycopg2 import Error
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class ConnectionPool:
+    '''
+    Bounded pool of psycopg2 connections with the same connection parameters,
+    shared by the threads of a process.  Connections are checked when taken
+    from the pool and recycled once they reach a maximum age.  Counters of
+    connections opened, reused, closed and waited for are kept for monitoring.
+    '''
+
+    def __init__(self, connect, max_size, max_age, check_after, timeout):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_age = max_age.total_seconds()
+        self.check_after = check_after.total_seconds()
+        self.timeout = timeout.total_seconds()
+
+        # Number of connections open, idle or in use, and when each of them was
+        # opened.  Idle connections are reused last in, first out, so that the
+        # connections left over after load peaks stay idle until recycled:
+        self.size = 0
+        self.opened_at = {}
+        self._idle = deque()
+        self._condition = Condition(Lock())
+
+        self.opened = 0
+        self.reused = 0
+        self.recycled = 0
+        self.discarded = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    @property
+    def in_use(self):
+        return self.size - len(self._idle)
+
+    @property
+    def stats(self):
+        return {
+            'max_size': self.max_size,
+            'size': self.size,
+            'idle': self.idle,
+            'in_use': self.in_use,
+            'opened': self.opened,
+            'reused': self.reused,
+            'recycled': self.recycled,
+            'discarded': self.discarded,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+        }
+
+    def get(self):
+        '''
+        Take a healthy connection from the pool, or open a new one if there
+        are none and the pool isn't full, or otherwise wait for one to be
+        returned.
+        '''
+
+        deadline = monotonic() + self.timeout
+        while True:
+            with self._condition:
+                idle = self._take(deadline)
+            if idle is None:
+                break
+
+            # Connections are checked outside of the lock, so that a slow or
+            # dead one doesn't hold up other threads taking connections:
+            connection, returned_at = idle
+            expired = self.expired(connection)
+            if not expired and self.healthy(connection, returned_at):
+                with self._condition:
+                    self.reused += 1
+                return connection
+
+            with self._condition:
+                if expired:
+                    self.recycled += 1
+                else:
+                    self.discarded += 1
+                self._close(connection)
+                self._condition.notify()
+
+        # Connect outside of the lock, so other threads may use the pool:
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.opened += 1
+            self.opened_at[connection] = monotonic()
+        return connection
+
+    def put(self, connection):
+        '''
+        Return a connection to the pool, rolling back any transaction left
+        open on it.  Broken and expired connections are closed instead.
+        '''
+
+        try:
+            if connection.closed:
+                raise Error
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            # Leave connections as psycopg2 opens them:
+            connection.autocommit = False
+        except Error:
+            self.discard(connection)
+            return
+
+        with self._condition:
+            if self.expired(connection):
+                self.recycled += 1
+                self._close(connection)
+            else:
+                self._idle.append((connection, monotonic()))
+
+            # Connections left idle at the bottom of the stack are recycled
+            # here, as they may not be taken again for a long time:
+            while self._idle and self.expired(self._idle[0][0]):
+                self.recycled += 1
+                self._close(self._idle.popleft()[0])
+
+            self._condition.notify()
+
+    def discard(self, connection):
+        '''
+        Close a connection taken from the pool instead of returning it.
+        '''
+        with self._condition:
+            self.discarded += 1
+            self._close(connection)
+            self._condition.notify()
+
+    def clear(self):
+        '''
+        Close every idle connection in the pool.
+        '''
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._close(connection)
+            self._condition.notify_all()
+
+    def expired(self, connection):
+        return monotonic() - self.opened_at[connection] >= self.max_age
+
+    # Connections that have been idle for a while may have been closed by the
+    # server or the network in the meantime, so they're checked with a query
+    # before they're reused; recently used connections are known to be fine:
+    def healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if monotonic() - returned_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('select 1')
+            connection.rollback()
+        except Error:
+            return False
+        return True
+
+    # Called with the lock held:
+    def _take(self, deadline):
+        '''
+        Take the most recently returned idle connection along with the time it
+        was returned, or if there are none, make room for a new connection and
+        return None, waiting until either is possible.
+        '''
+
+        while True:
+            if self._idle:
+                return self._idle.pop()
+
+            if self.size < self.max_size:
+                self.size += 1
+                return None
+
+            self.waits += 1
+            remaining = deadline - monotonic()
+            if remaining <= 0 or not self._condition.wait(remaining):
+                if not self._idle and self.size >= self.max_size:
+                    self.timeouts += 1
+                    raise OperationalError(
+                        f'No database connection became available in '
+                        f'{self.timeout:g}s; all {self.max_size} '
+                        f'connections in the pool are in use',
+                    )
+
+    # Called with the lock held:
+    def _close(self, connection):
+        self.size -= 1
+        self.opened_at.pop(connection, None)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+# Pools by process and connection parameters.  Processes forked from another
+# one, such as server workers, start with pools of their own, since connections
+# can't be shared across processes:
+pools = {}
+pools_lock = Lock()
+
+
+def get_pool(connect, conn_params, options):
+    key = (getpid(), tuple(sorted(conn_params.items())))
+    with pools_lock:
+        try:
+            return pools[key]
+        except KeyError:
+            pool = pools[key] = ConnectionPool(
+                connect=connect,
+                max_size=options['MAX_SIZE'],
+                max_age=options['MAX_AGE'],
+                check_after=options['CHECK_AFTER'],
+                timeout=options['TIMEOUT'],
+            )
+            return pool
+
+
+def clear_pools(database=None):
+    '''
+    Close the idle connections in every pool of this process, or only those to
+    the given database, e.g. before the database is dropped.
+    '''
+    pid = getpid()
+    with pools_lock:
+        matching = [
+            pool
+            for (owner, params), pool in pools.items()
+            if owner == pid and database in (None, dict(params)['database'])
+        ]
+    for pool in matching:
+        pool.clear()
+
+
+class TimedCursorMixin:
+    '''
+    Count the statements executed through a cursor and the time they take in
+    the query_count and query_time attributes of its database connection.
+    '''
+
+    def execute(self, sql, params=None):
+        start = perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self.db.query_count += 1
+            self.db.query_time += perf_counter() - start
+
+    def executemany(self, sql, param_list):
+        start = perf_counter()
+        try:
+            return super().executemany(sql, param_list)
+        finally:
+            self.db.query_count += 1
+            self.db.query_time += perf_counter() - start
+
+
+class TimedCursorWrapper(TimedCursorMixin, CursorWrapper):
+    pass
+
+
+class TimedCursorDebugWrapper(TimedCursorMixin, CursorDebugWrapper):
+    pass
+
+
+class DatabaseCreation(PostgreSQLDatabaseCreation):
+
+    # Test databases can't be dropped while pooled connections to them are open:
+    def _destroy_test_db(self, test_database_name, verbosity):
+        clear_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+    # Nor can they be used as templates while connections to them are open, as
+    # they are when cloned for each process running tests in parallel:
+    def _clone_test_db(self, number, verbosity, keepdb=False):
+        self.connection.close()
+        clear_pools(self.connection.settings_dict['NAME'])
+        super()._clone_test_db(number, verbosity, keepdb)
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.creation = DatabaseCreation(self)
+
+        # Statements executed and time spent executing them, in seconds:
+        self.query_count = 0
+        self.query_time = 0.0
+
+    @property
+    def pool_options(self):
+        return self.settings_dict.get('POOL', {'MAX_SIZE': 0})
+
+    @property
+    def pool(self):
+        '''
+        Get the pool this connection takes connections from in this process,
+        or None if pooling is disabled.
+        '''
+
+        if self.pool_options['MAX_SIZE'] <= 0:
+            return None
+        conn_params = self.get_connection_params()
+        return get_pool(
+            lambda: self.Database.connect(**conn_params),
+            conn_params,
+            self.pool_options,
+        )
+
+    def make_cursor(self, cursor):
+        return TimedCursorWrapper(cursor, self)
+
+    def make_debug_cursor(self, cursor):
+        return TimedCursorDebugWrapper(cursor, self)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        # Pooled connections are set up like new ones; see the base class:
+        connection = pool.get()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        # Connections closed within transactions are left in an unknown state
+        # and might still be used by this wrapper, so they aren't shared:
+        if self.in_atomic_block:
+            pool.discard(self.connection)
+        else:
+            pool.put(self.connection)
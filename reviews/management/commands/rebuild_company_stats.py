@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.transaction import atomic
+
+from reviews.models import CompanyStats
+
+
+class Command(BaseCommand):
+
+    help = '''
+        Recompute the rating statistics of every company from scratch.  This \
+        repairs any drift between the incrementally maintained statistics and \
+        the reviews actually stored in the database.
+    '''
+
+    @atomic
+    def handle(self, *args, **options):
+
+        # Block concurrent incremental updates to the statistics until these
+        # are replaced.  Reviews committed before the lock is acquired are
+        # counted here, and updates waiting on the lock apply on top of the
+        # rebuilt statistics:
+        connection.cursor().execute(
+            f'lock table "{CompanyStats._meta.db_table}" in exclusive mode',
+        )
+
+        # Statistics are computed from the stored reviews the same way as for
+        # companies that have none:
+        CompanyStats.objects.all().delete()
+        companies = CompanyStats.create_missing()
+
+        self.stdout.write(
+            f'Rebuilt statistics for {len(companies)} companies',
+        )
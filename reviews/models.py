@@ -1,19 +1,37 @@
+from collections import defaultdict
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import ASCIIUsernameValidator
-from django.db.models.signals import post_save
+from django.contrib.postgres.search import SearchVectorField
+from django.db import DatabaseError, connections
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save,
+)
+from django.db.transaction import atomic
 from django.dispatch import receiver
+from django.utils.timezone import now
+from django.utils.translation import ugettext_lazy as _
 from django.db.models import (
     CASCADE,
     CharField,
     DateTimeField,
     EmailField,
+    F,
     ForeignKey,
     GenericIPAddressField,
     IntegerField,
+    Max,
+    OneToOneField,
     PROTECT,
+    PositiveIntegerField,
     TextField,
     URLField,
+    Value,
 )
 
 from dry_rest_permissions.generics import (
@@ -21,6 +39,7 @@ from dry_rest_permissions.generics import (
     authenticated_users,
 )
 
+from model_utils.fields import AutoCreatedField, AutoLastModifiedField
 from model_utils.models import TimeStampedModel
 from rest_framework.authtoken.models import Token
 
@@ -29,6 +48,17 @@ from rest_framework.authtoken.models import Token
 # abstract base model class, as well as ordering based on creation timestamp.
 class Model(TimeStampedModel):
 
+    # Lists are paginated by creation time, and clients may look for recently
+    # modified objects, so both timestamps are indexed:
+    created = AutoCreatedField(
+        _('created'),
+        db_index=True,
+    )
+    modified = AutoLastModifiedField(
+        _('modified'),
+        db_index=True,
+    )
+
     class Meta:
         abstract = True
         get_latest_by = 'created'
@@ -66,7 +96,7 @@ class User(AbstractUser, Model):
     @authenticated_users
     @allow_staff_or_superuser
     def has_object_read_permission(self, request):
-        return self == request.user
+        return self.pk == request.user.pk
 
     # Only administrators can create users:
     @staticmethod
@@ -80,7 +110,9 @@ class User(AbstractUser, Model):
         return False
 
 
-# Create authentication tokens for users automatically after saving new Users:
+# Create authentication tokens for users automatically after saving new Users.
+# Users loaded without signals by api.utils.database.load_fixtures get theirs
+# there likewise:
 @receiver(
     post_save,
     sender=User,
@@ -121,6 +153,220 @@ class Company(Model):
         return f'{self.name} ({self.pk})'
 
 
+class CompanyStats(Model):
+    '''
+    Aggregate rating statistics for the reviews of a company.  These are kept \
+    up to date incrementally as reviews are created, updated and deleted, so \
+    reading them costs the same regardless of how many reviews a company has.
+    '''
+
+    ratings = range(1, 6)
+
+    company = OneToOneField(
+        to=Company,
+        on_delete=CASCADE,
+        primary_key=True,
+        related_name='stats',
+        help_text='Company whose reviews are summarized',
+    )
+
+    count = PositiveIntegerField(
+        default=0,
+        help_text='Number of reviews submitted for the company',
+    )
+
+    total = PositiveIntegerField(
+        default=0,
+        help_text='Sum of the ratings of all reviews submitted for the company',
+    )
+
+    rating_1 = PositiveIntegerField(default=0)
+    rating_2 = PositiveIntegerField(default=0)
+    rating_3 = PositiveIntegerField(default=0)
+    rating_4 = PositiveIntegerField(default=0)
+    rating_5 = PositiveIntegerField(default=0)
+
+    last_review = DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Submission time of the latest review for the company',
+    )
+
+    class Meta:
+        verbose_name_plural = 'company stats'
+
+    def __str__(self):
+        return f'{self.company_id}: {self.count} reviews'
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def histogram(self):
+        return {
+            str(rating): getattr(self, f'rating_{rating}')
+            for rating in self.ratings
+        }
+
+    @classmethod
+    def add(cls, reviews):
+        '''
+        Account for new reviews given as (company_id, rating, created) tuples.
+        This issues a single update statement per affected company.
+        '''
+        cls._apply(reviews, sign=1)
+
+    @classmethod
+    def remove(cls, reviews):
+        '''
+        Discount removed reviews given as (company_id, rating, created) tuples.
+        The latest review time of each affected company is recomputed.
+        '''
+        cls._apply(reviews, sign=-1)
+
+    @classmethod
+    def create_missing(cls, company_ids=None, using='default'):
+        '''
+        Create statistics from the stored reviews of companies that have none,
+        such as companies inserted in bulk or registered before statistics
+        were kept, among the given companies or all of them.  This issues a
+        single statement, and returns the set of companies whose statistics
+        were created.
+        '''
+
+        cursor = connections[using].cursor()
+        cursor.execute(
+            f'''
+                insert into "{cls._meta.db_table}" (
+                    "company_id", "created", "modified", "count", "total",
+                    {', '.join(f'"rating_{rating}"' for rating in cls.ratings)},
+                    "last_review"
+                )
+                select
+                    c."id", %(timestamp)s, %(timestamp)s,
+                    count(r."id"), coalesce(sum(r."rating"), 0),
+                    {', '.join(
+                        f'count(*) filter (where r."rating" = {rating})'
+                        for rating in cls.ratings
+                    )},
+                    max(r."created")
+                from "{Company._meta.db_table}" as c
+                left join "{Review._meta.db_table}" as r
+                    on r."company_id" = c."id"
+                where
+                    not exists (
+                        select 1 from "{cls._meta.db_table}" as s
+                        where s."company_id" = c."id"
+                    )
+                    and (
+                        %(company_ids)s::integer[] is null
+                        or c."id" = any(%(company_ids)s::integer[])
+                    )
+                group by c."id"
+                on conflict ("company_id") do nothing
+                returning "company_id"
+            ''',
+            {
+                'timestamp': now(),
+                'company_ids': (
+                    None if company_ids is None else list(company_ids)
+                ),
+            },
+        )
+        return {company_id for [company_id] in cursor.fetchall()}
+
+    @classmethod
+    def get_for(cls, company):
+        '''
+        Get the statistics of a company, creating them if it has none.
+        '''
+        try:
+            return company.stats
+        except cls.DoesNotExist:
+            cls.create_missing([company.pk])
+            company.stats = cls.objects.get(company=company)
+            return company.stats
+
+    @classmethod
+    def _apply(cls, reviews, sign):
+
+        deltas = defaultdict(lambda: defaultdict(int))
+        latest = {}
+
+        for company_id, rating, created in reviews:
+            delta = deltas[company_id]
+            delta['count'] += sign
+            delta['total'] += sign * rating
+            delta[f'rating_{rating}'] += sign
+            if created is not None and (
+                company_id not in latest or latest[company_id] < created
+            ):
+                latest[company_id] = created
+
+        missing = {}
+        for company_id, delta in deltas.items():
+
+            updates = {
+                field: F(field) + value
+                for field, value in delta.items()
+                if value
+            }
+
+            if sign > 0:
+                if company_id in latest:
+                    updates['last_review'] = Greatest(
+                        'last_review',
+                        Value(latest[company_id]),
+                    )
+            else:
+                updates['last_review'] = (
+                    Review.objects
+                    .filter(company_id=company_id)
+                    .aggregate(last_review=Max('created'))
+                    ['last_review']
+                )
+
+            if not cls.objects.filter(company_id=company_id).update(
+                modified=now(),
+                **updates
+            ):
+                missing[company_id] = updates
+
+        # Companies without statistics get them from their stored reviews,
+        # which already include new ones.  Statistics created concurrently in
+        # the meantime don't include them, so they're updated after all.
+        # Removed reviews are left alone, as companies being deleted have their
+        # statistics deleted first:
+        if sign > 0 and missing:
+            created = cls.create_missing(missing)
+            for company_id, updates in missing.items():
+                if company_id not in created:
+                    cls.objects.filter(company_id=company_id).update(
+                        modified=now(),
+                        **updates
+                    )
+
+
+# Create empty statistics for companies automatically after saving new
+# Companies.  Companies stored without signals get theirs from
+# CompanyStats.create_missing instead:
+@receiver(
+    post_save,
+    sender=Company,
+)
+def create_company_stats(
+    sender,
+    instance=None,
+    created=False,
+    **kwargs
+):
+    if created:
+        CompanyStats.objects.create(
+            company=instance,
+        )
+
+
 class Reviewer(Model):
     '''
     Reviewers who may author reviews tracked by this system.  Reviewers may be \
@@ -151,9 +397,14 @@ class Review(Model):
     interact with reviews they submitted themselves.
     '''
 
+    # Reviews are listed by submitter, company or reviewer in creation order, so
+    # each of these foreign keys is indexed together with the creation time (see
+    # Meta.index_together below) instead of on its own:
+
     submitter = ForeignKey(
         to=settings.AUTH_USER_MODEL,
         on_delete=CASCADE,
+        db_index=False,
         help_text='User that submitted the review into this system',
     )
 
@@ -192,18 +443,53 @@ class Review(Model):
     company = ForeignKey(
         to=Company,
         on_delete=PROTECT,
+        db_index=False,
         help_text='Company to whom this review applies',
     )
 
     reviewer = ForeignKey(
         to=Reviewer,
         on_delete=PROTECT,
+        db_index=False,
         help_text='Reviewer who authored this review',
     )
 
+    # Full-text search document over the title and summary, maintained by the
+    # database on every write; see create_review_search_trigger below.  Title
+    # matches are weighted over summary matches for ranking search results:
+    search_config = 'english'
+    search = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text='Full-text search document of the review',
+    )
+
+    class Meta(Model.Meta):
+        index_together = [
+            ('submitter', 'created'),
+            ('company', 'created'),
+            ('reviewer', 'created'),
+        ]
+
     def __str__(self):
         return f'{self.title} ({self.pk})'
 
+    # Remember the values that company statistics were last computed from, so
+    # that updates can be applied to the statistics incrementally without
+    # querying the previous state of the review:
+    stats_fields = ('company_id', 'rating', 'created')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.stats_fields):
+            instance._stats_key = instance.stats_key
+        return instance
+
+    @property
+    def stats_key(self):
+        return (self.company_id, self.rating, self.created)
+
     # Allow only administrators to interact with reviews submitted by other
     # users.  Non-administrator users can only interact with reviews they
     # submitted themselves.
@@ -211,9 +497,335 @@ class Review(Model):
     @authenticated_users
     @allow_staff_or_superuser
     def has_object_read_permission(self, request):
-        return self.submitter == request.user
+        return self.submitter_id == request.user.pk
 
     @authenticated_users
     @allow_staff_or_superuser
     def has_object_write_permission(self, request):
-        return self.submitter == request.user
+        return self.submitter_id == request.user.pk
+
+
+# Keep company statistics up to date as reviews are saved and deleted:
+
+@receiver(
+    pre_save,
+    sender=Review,
+)
+def load_company_stats_key(
+    sender,
+    instance=None,
+    **kwargs
+):
+    # Reviews not loaded from the database with all the relevant fields don't
+    # know what values were previously accounted for in company statistics:
+    if instance.pk is not None and not hasattr(instance, '_stats_key'):
+        instance._stats_key = (
+            Review.objects
+            .filter(pk=instance.pk)
+            .values_list(*Review.stats_fields)
+            .first()
+        )
+
+
+@receiver(
+    post_save,
+    sender=Review,
+)
+def update_company_stats(
+    sender,
+    instance=None,
+    created=False,
+    **kwargs
+):
+    previous = getattr(instance, '_stats_key', None)
+    current = instance.stats_key
+
+    if created or previous is None:
+        CompanyStats.add([current])
+    elif previous[:2] != current[:2]:
+        CompanyStats.remove([previous])
+        CompanyStats.add([current])
+
+    instance._stats_key = current
+
+
+@receiver(
+    post_delete,
+    sender=Review,
+)
+def discount_company_stats(
+    sender,
+    instance=None,
+    **kwargs
+):
+    CompanyStats.remove([
+        getattr(instance, '_stats_key', instance.stats_key),
+    ])
+
+
+class ReviewSubmission(Model):
+    '''
+    Reviews accepted for asynchronous submission and queued until they're \
+    stored in batches by the flush_review_submissions command.  Queued \
+    submissions are already validated, so each of them eventually becomes a \
+    review; the review is linked to the submission once it's stored.
+    '''
+
+    # Appending to the queue should be as cheap as possible, so only the review
+    # link is indexed, and the timestamps inherited from the base model aren't.
+    # The queue is drained promptly and stored submissions are purged after a
+    # while, so it stays small:
+
+    created = AutoCreatedField(
+        _('created'),
+    )
+
+    modified = AutoLastModifiedField(
+        _('modified'),
+    )
+
+    submitter = ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=CASCADE,
+        db_index=False,
+        help_text='User that submitted the review into this system',
+    )
+
+    rating = IntegerField(
+        help_text='Numeric rating between 1 (worst) and 5 (best)',
+    )
+
+    title = CharField(
+        max_length=Review.title_max_length,
+        blank=True,
+        help_text='Review title',
+    )
+
+    summary = TextField(
+        max_length=Review.summary_max_length,
+        blank=True,
+        help_text='Summary of the reviewer\'s experience with the company',
+    )
+
+    ip_address = GenericIPAddressField(
+        help_text='Internet network address that provided this review',
+    )
+
+    company = ForeignKey(
+        to=Company,
+        on_delete=PROTECT,
+        db_index=False,
+        help_text='Company to whom this review applies',
+    )
+
+    reviewer = ForeignKey(
+        to=Reviewer,
+        on_delete=PROTECT,
+        db_index=False,
+        help_text='Reviewer who authored this review',
+    )
+
+    review = OneToOneField(
+        to=Review,
+        on_delete=CASCADE,
+        null=True,
+        blank=True,
+        related_name='submission',
+        help_text='Review stored from this submission, once it is stored',
+    )
+
+    review_fields = (
+        'submitter_id',
+        'rating',
+        'title',
+        'summary',
+        'ip_address',
+        'company_id',
+        'reviewer_id',
+    )
+
+    def __str__(self):
+        return f'{self.title} ({self.pk})'
+
+    @property
+    def status(self):
+        return 'pending' if self.review_id is None else 'stored'
+
+    @classmethod
+    def flush(cls, batch_size, using='default'):
+        '''
+        Store a batch of up to batch_size queued submissions as reviews with a
+        single bulk insertion, and return the number of reviews stored.
+        Reviews keep the submission time of their submissions.  Submissions
+        being flushed are locked and skipped by concurrent flushes, so any
+        number of flushers may run at once.
+        '''
+
+        table = cls._meta.db_table
+        with atomic(using=using):
+            submissions = list(cls.objects.using(using).raw(
+                f'''
+                    select * from "{table}"
+                    where "review_id" is null
+                    order by "id"
+                    limit %s
+                    for update skip locked
+                ''',
+                [batch_size],
+            ))
+            if not submissions:
+                return 0
+
+            reviews = Review.objects.using(using).bulk_create([
+                Review(
+                    created=submission.created,
+                    **{
+                        field: getattr(submission, field)
+                        for field in cls.review_fields
+                    }
+                )
+                for submission in submissions
+            ])
+
+            # Bulk insertion emits no signals, so company statistics are
+            # updated here:
+            CompanyStats.add(review.stats_key for review in reviews)
+
+            connections[using].cursor().execute(
+                f'''
+                    update "{table}" as s
+                    set "review_id" = f."review_id", "modified" = now()
+                    from unnest(%s::integer[], %s::integer[])
+                        as f("id", "review_id")
+                    where s."id" = f."id"
+                ''',
+                [
+                    [submission.pk for submission in submissions],
+                    [review.pk for review in reviews],
+                ],
+            )
+
+        return len(reviews)
+
+    @classmethod
+    def purge(cls, retention, using='default'):
+        '''
+        Delete submissions stored as reviews longer ago than the given
+        retention period, and return the number of submissions deleted.
+        '''
+        return cls.objects.using(using).filter(
+            review__isnull=False,
+            modified__lt=now() - retention,
+        ).delete()[0]
+
+    # Allow only administrators to inspect submissions by other users.  Queued
+    # submissions can't be modified through the API.
+
+    @authenticated_users
+    @allow_staff_or_superuser
+    def has_object_read_permission(self, request):
+        return self.submitter_id == request.user.pk
+
+    @staticmethod
+    def has_write_permission(request):
+        return False
+
+
+# Maintain review search documents with a database trigger, so that they're kept
+# up to date by every kind of write, including bulk inserts, queryset updates
+# and imports with SQL, and index them for full-text search.  Search documents
+# of existing reviews are filled in by the trigger as they're updated here:
+@receiver(post_migrate)
+def create_review_search_trigger(
+    sender,
+    using='default',
+    **kwargs
+):
+    if sender.name != Review._meta.app_label:
+        return
+
+    table = Review._meta.db_table
+    cursor = connections[using].cursor()
+    cursor.execute(f'''
+        create or replace function "{table}_search_update"() returns trigger
+        as $$
+        begin
+            new."search" :=
+                setweight(
+                    to_tsvector('{Review.search_config}', new."title"),
+                    'A'
+                ) ||
+                setweight(
+                    to_tsvector('{Review.search_config}', new."summary"),
+                    'B'
+                );
+            return new;
+        end
+        $$ language plpgsql;
+
+        drop trigger if exists "{table}_search_update" on "{table}";
+        create trigger "{table}_search_update"
+        before insert or update on "{table}"
+        for each row execute procedure "{table}_search_update"();
+
+        create index if not exists "{table}_search"
+        on "{table}" using gin ("search");
+
+        update "{table}" set "search" = null where "search" is null;
+    ''')
+
+
+# Create statistics for companies that have none whenever migrations are
+# applied, e.g. after upgrading from versions that didn't keep them:
+@receiver(post_migrate)
+def create_missing_company_stats(
+    sender,
+    using='default',
+    **kwargs
+):
+    if sender.name != CompanyStats._meta.app_label:
+        return
+
+    CompanyStats.create_missing(using=using)
+
+
+# Index company names for lookups by prefix regardless of case, in the C
+# collation so that prefix matches can be read from the index in order under any
+# database locale, and if the pg_trgm extension is installed, for lookups of
+# similar names by trigram similarity and distance as well.  Installing the
+# extension usually requires a superuser, so it's only attempted here in a
+# savepoint, and skipped if the extension is unavailable or can't be installed:
+@receiver(post_migrate)
+def create_company_name_indexes(
+    sender,
+    using='default',
+    **kwargs
+):
+    if sender.name != Company._meta.app_label:
+        return
+
+    table = Company._meta.db_table
+    cursor = connections[using].cursor()
+    cursor.execute(f'''
+        create index if not exists "{table}_name_prefix"
+        on "{table}" ((upper("name") collate "C"))
+    ''')
+
+    cursor.execute('''
+        select exists (select 1 from pg_extension where extname = 'pg_trgm')
+    ''')
+    [[trigrams]] = cursor.fetchall()
+    if not trigrams:
+        try:
+            with atomic(using=using):
+                cursor.execute('create extension pg_trgm')
+        except DatabaseError:
+            pass
+        else:
+            trigrams = True
+
+    if trigrams:
+        cursor.execute(f'''
+            create index if not exists "{table}_name_trigram"
+            on "{table}" using gist ("name" gist_trgm_ops);
+        ''')
@@ -47,6 +47,7 @@ PROJECT_ROOT = dirname(abspath(__file__))
 # Basic application definition:
 ROOT_URLCONF = 'reviews.urls'
 WSGI_APPLICATION = 'reviews.wsgi.application'
+TEST_RUNNER = 'api.testrunner.TestRunner'
 
 
 # Despite this project being mostly a REST API, the Django Debug Toolbar,
@@ -92,15 +93,35 @@ SECURE_PROXY_SSL_HEADER = (
 )
 
 
+# Database connections are taken from a pool of open connections kept by each
+# process and returned to it at the end of each request, instead of opening a
+# new connection for every request; see reviews.backends.postgresql_pool.  Each
+# process keeps up to DATABASE_POOL_SIZE connections open, which should be at
+# least the number of threads serving requests in a process; zero disables
+# pooling.  Connections are closed after DATABASE_POOL_MAX_AGE seconds,
+# checked before reuse when idle for DATABASE_POOL_CHECK_AFTER seconds, and
+# waited for up to DATABASE_POOL_TIMEOUT seconds when all are in use.
 DATABASES = {
 
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'reviews.backends.postgresql_pool',
         'NAME': environ.get('DATABASE_NAME', 'reviews'),
         'USER': environ.get('DATABASE_USER', 'reviews'),
         'PASSWORD': environ.get('DATABASE_PASSWORD', 'reviews'),
         'HOST': environ.get('DATABASE_HOST', 'postgres'),
         'PORT': environ.get('DATABASE_PORT', 5432),
+        'POOL': {
+            'MAX_SIZE': int(environ.get('DATABASE_POOL_SIZE', 10)),
+            'MAX_AGE': timedelta(
+                seconds=int(environ.get('DATABASE_POOL_MAX_AGE', 1800)),
+            ),
+            'CHECK_AFTER': timedelta(
+                seconds=int(environ.get('DATABASE_POOL_CHECK_AFTER', 10)),
+            ),
+            'TIMEOUT': timedelta(
+                seconds=int(environ.get('DATABASE_POOL_TIMEOUT', 10)),
+            ),
+        },
     }
 
 }
@@ -139,6 +160,9 @@ INSTALLED_APPS = [
     # Permission management library for the Django REST Framework:
     'dry_rest_permissions',
 
+    # PostgreSQL-specific lookups, such as trigram similarity of company names:
+    'django.contrib.postgres',
+
     # This project's base models and routes:
     'reviews',
 
@@ -169,6 +193,9 @@ LOGGING = {
 
 MIDDLEWARE = [
 
+    # Time requests and record their timings; see api.metrics:
+    'api.metrics.MetricsMiddleware',
+
     # Enable several HTTP-related security features:
     'django.middleware.security.SecurityMiddleware',
 
@@ -201,6 +228,31 @@ MIDDLEWARE = [
 ]
 
 
+# Stateless API requests, i.e. those for paths starting with any of
+# API_MIDDLEWARE_PATHS that carry credentials in an Authorization header, go
+# through this shorter middleware chain instead, as they need no sessions,
+# messages, CSRF protection, debugging toolbar or static files; see
+# api.handlers.WSGIHandler.  Every request goes through the full chain if
+# LEAN_API_MIDDLEWARE is a defined environment variable with the exact string
+# value False.
+API_MIDDLEWARE = [
+
+    # Time requests and record their timings:
+    'api.metrics.MetricsMiddleware',
+
+    # Enable several HTTP-related security features:
+    'django.middleware.security.SecurityMiddleware',
+
+    # Handle CORS requests and include appropriate response headers:
+    'corsheaders.middleware.CorsMiddleware',
+
+] if environ.get('LEAN_API_MIDDLEWARE', None) != 'False' else None
+
+API_MIDDLEWARE_PATHS = [
+    '/v1/',
+]
+
+
 # The Django Debug Toolbar and the admin site use Django templates:
 TEMPLATES = [
 
@@ -240,7 +292,9 @@ REST_FRAMEWORK = {
         # simple and easy way to authenticate requests to the API, but it's not
         # ideal since the client has to send full, non-expiring credentials in
         # every request to the API.  See https://tools.ietf.org/html/rfc7617
-        'rest_framework.authentication.BasicAuthentication',
+        # Verified credentials are cached briefly to avoid hashing passwords on
+        # every request.
+        'api.authentication.CachedBasicAuthentication',
 
         # Support authentication through session cookies.  This is convenient
         # for browsers, but browser-based clients should guard carefully against
@@ -253,7 +307,9 @@ REST_FRAMEWORK = {
         # and when to provide them in a request, which means more manual work is
         # required to write a client, but certain cross-site request forgery
         # pitfalls may be more easily avoided.
-        'rest_framework.authentication.TokenAuthentication',
+        # Tokens are cached briefly to avoid looking them up in the database
+        # on every request.
+        'api.authentication.CachedTokenAuthentication',
 
         # Support authentication through JSON Web Tokens in a similar way to
         # manually managed session cookies.  This scheme is very similar to the
@@ -262,12 +318,16 @@ REST_FRAMEWORK = {
         # stored in the database, and issued tokens expire promptly unless
         # renewed periodically by the client.  See https://jwt.io/ and
         # http://getblimp.github.io/django-rest-framework-jwt/
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        # Users may be authenticated from the claims in tokens without database
+        # queries; see JWT_USER_CLAIMS below.
+        'api.authentication.ClaimsJSONWebTokenAuthentication',
 
     ),
 
+    # Filter lists with the FilterSet of their views, rejecting invalid filter
+    # values:
     'DEFAULT_FILTER_BACKENDS': (
-        'django_filters.rest_framework.DjangoFilterBackend',
+        'api.filters.ValidatingFilterBackend',
     ),
 
     # This requires authentication for all API resources by default:
@@ -276,7 +336,7 @@ REST_FRAMEWORK = {
     ),
 
     # Pagination options:
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.CursorPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPagination',
     'PAGE_SIZE': 10,
 
     # The self-hyperlink in resource representations is called `url` by default,
@@ -287,9 +347,132 @@ REST_FRAMEWORK = {
 }
 
 
+# Serve lists of companies, reviewers and reviews through compiled serializers
+# that skip building model instances; see api.compiled.  This is disabled by
+# default, and enabled if COMPILED_SERIALIZERS is a defined environment variable
+# with the exact string value True.
+COMPILED_SERIALIZERS = environ.get('COMPILED_SERIALIZERS', None) == 'True'
+
+
+# Options for the per-process cache of companies and reviewers referred to by
+# hyperlinks in API requests; see api.serializers.  A maximum size of zero
+# disables the cache.
+RELATED_OBJECT_CACHE = {
+    'MAX_SIZE': int(environ.get('RELATED_OBJECT_CACHE_SIZE', 1024)),
+    'TTL': timedelta(
+        seconds=int(environ.get('RELATED_OBJECT_CACHE_TTL', 300)),
+    ),
+}
+
+
+# Cache backends.  The response cache holds rendered company and reviewer
+# resources; see api.views.CachedResponseMixin.  It's kept in the memory of
+# each process by default, in which case changes made by other processes may
+# take up to its timeout to show.  A memcached backend can be used instead by
+# setting the RESPONSE_CACHE_BACKEND and RESPONSE_CACHE_LOCATION environment
+# variables, so that all processes share a cache and see each other's
+# invalidations at once.  Shared backends must add keys atomically; the gunicorn
+# configuration disables response caching if it runs several workers without
+# such a backend.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'TIMEOUT': int(environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(environ.get('RESPONSE_CACHE_SIZE', 10000)),
+        },
+    },
+}
+
+
+# Options for caching of company and reviewer responses.  Caching is enabled
+# unless RESPONSE_CACHE is a defined environment variable with the exact string
+# value False.
+RESPONSE_CACHE = {
+    'ALIAS': 'responses',
+    'ENABLED': environ.get('RESPONSE_CACHE', None) != 'False',
+}
+
+
+# Options for review exports; see api.views.ReviewViewSet.export.  Exports read
+# reviews in a transaction that holds a database snapshot and connection until
+# the whole export is sent, so the database ends the transaction and closes the
+# connection, failing the export, if the client stops reading for longer than
+# IDLE_TIMEOUT, which can be set in seconds with the EXPORT_IDLE_TIMEOUT
+# environment variable.
+EXPORTS = {
+    'IDLE_TIMEOUT': timedelta(
+        seconds=int(environ.get('EXPORT_IDLE_TIMEOUT', 30)),
+    ),
+}
+
+
+# Options for per-request instrumentation; see api.metrics.  Requests are timed
+# unless METRICS is a defined environment variable with the exact string value
+# False.  Metrics of the server processes sharing the METRICS_DIRECTORY
+# directory are served together, and each process saves its own metrics there
+# once every INTERVAL at most; the gunicorn configuration provides a directory
+# if none is given.  Without one, each process only serves its own metrics.
+METRICS = {
+    'ENABLED': environ.get('METRICS', None) != 'False',
+    'DIRECTORY': environ.get('METRICS_DIRECTORY', None),
+    'INTERVAL': timedelta(seconds=1),
+}
+
+
+# Options for asynchronous review submission.  When enabled, review submissions
+# are validated and queued, answered with 202 Accepted and a link to the status
+# of the submission, and stored in batches of up to BATCH_SIZE reviews by the
+# flush_review_submissions command, which polls the queue every INTERVAL.
+# Stored submissions are purged after RETENTION.  This is disabled by default,
+# and enabled if ASYNC_REVIEW_SUBMISSIONS is a defined environment variable with
+# the exact string value True.
+REVIEW_SUBMISSIONS = {
+    'ASYNC': environ.get('ASYNC_REVIEW_SUBMISSIONS', None) == 'True',
+    'BATCH_SIZE': int(environ.get('REVIEW_SUBMISSION_BATCH_SIZE', 1000)),
+    'INTERVAL': timedelta(seconds=1),
+    'RETENTION': timedelta(days=1),
+}
+
+
+# Options for the per-process caches of verified credentials used by the API
+# authentication classes; see api.authentication.  Cached credentials are
+# discarded as soon as their user changes in the same process, and expire after
+# a while to bound how long changes made by other processes take to apply.  A
+# maximum size of zero disables a cache.
+AUTHENTICATION_CACHE = {
+    'BASIC_MAX_SIZE': int(environ.get('BASIC_AUTH_CACHE_SIZE', 1024)),
+    'BASIC_TTL': timedelta(
+        seconds=int(environ.get('BASIC_AUTH_CACHE_TTL', 300)),
+    ),
+    'TOKEN_MAX_SIZE': int(environ.get('TOKEN_AUTH_CACHE_SIZE', 1024)),
+    'TOKEN_TTL': timedelta(
+        seconds=int(environ.get('TOKEN_AUTH_CACHE_TTL', 300)),
+    ),
+}
+
+
 # Options for authentication via a session-like scheme using JSON Web Tokens;
 # see http://getblimp.github.io/django-rest-framework-jwt/
 JWT_AUTH = {
     'JWT_ALLOW_REFRESH': True,
     'JWT_EXPIRATION_DELTA': timedelta(hours=1),
+    'JWT_PAYLOAD_HANDLER': 'api.authentication.jwt_payload_handler',
 }
+
+
+# Authenticate requests with JSON Web Tokens from the user claims in the tokens
+# instead of loading users from the database on every request; see
+# api.authentication.  Changes to users then take up to JWT_EXPIRATION_DELTA to
+# apply to requests authenticated this way, except for tokens of administrators,
+# which are always checked against the database.  This is disabled by default,
+# and enabled if JWT_USER_CLAIMS is a defined environment variable with the
+# exact string value True.
+JWT_USER_CLAIMS = environ.get('JWT_USER_CLAIMS', None) == 'True'
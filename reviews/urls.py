@@ -1,4 +1,5 @@
 from api.urls import router
+from api.views import MetricsView
 from django.conf import settings
 from django.conf.urls import url, include
 from django.contrib import admin
@@ -50,6 +51,12 @@ urlpatterns = [
         ),
     ),
 
+    # Performance metrics for monitoring, in the Prometheus text format:
+    url(
+        regex=r'^metrics$',
+        view=MetricsView.as_view(),
+    ),
+
     # API routes proper:
     url(
         regex=r'^v1/',
@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/1.10/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "reviews.settings")
 
-application = get_wsgi_application()
+# Set up Django like django.core.wsgi.get_wsgi_application does, but serve
+# stateless API requests through a shorter middleware chain; see api.handlers.
+# Django must be set up before the handler is imported, as application modules
+# may only be imported once settings are configured and apps are loaded:
+django.setup(set_prefix=False)
+
+from api.handlers import WSGIHandler  # noqa: E402
+
+application = WSGIHandler()